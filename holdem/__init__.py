@@ -0,0 +1,6 @@
+"""
+插件中不依赖 AstrBot 的部分（牌局逻辑、牌型评价、胜率计算、持久化等），
+可单独导入用于模拟和基准测试。
+"""
+from .cards import card_str, parse_card
+from .evaluator import evaluate, hand_name
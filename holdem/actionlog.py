@@ -0,0 +1,318 @@
+"""
+事件溯源的牌局操作日志。
+
+牌局的每次状态变化都追加一行紧凑 JSON ``[群号, 牌局编号, 事件, 参数...]``：
+
+    start       [PokerGame 参数]               /poker start，开始第一局
+    join        [ID, 昵称, 私信 session, 机器人等级, 买入]
+    deal        [发牌前的牌堆, {座位 0/1 的余额}]   牌堆为 [种子, 0]；未收盲注时 start_hand 按余额收盲
+    act         [ID, 行动, 加注额, 行动前余额]
+    street      []                             发下一条街（从牌堆确定性地发出）
+    settle      []
+    next        [换庄收盲后的完整状态]          /poker continue，开始新的一局
+    checkpoint  [完整状态]
+    evict       []                             牌局已淘汰到磁盘快照（见 gamecache.py）
+    end         []                             牌局被删除
+
+余额本身由余额日志保存，这里只记录重放所需的输入，重放时用记录的余额调用同一套规则引擎，
+得到与当时完全相同的牌局状态。start 和 next 分配新的全局牌局编号。
+
+日志按段存放在 actions/ 目录下。每记录 checkpoint_every 条事件换一个新段，
+新段开头是段头和所有常驻牌局的 checkpoint，因此启动时只需重放最新一段即可恢复进行中的牌局，
+重放时间有上限。从磁盘快照恢复的牌局也会先写一条 checkpoint。
+actions.idx 是定长索引 (牌局编号, 段号, 偏移)，/poker replay 据此定位一局的第一条事件，
+向后读出这一局的全部事件并重放成文字。旧段只保留最近 keep_segments 个。
+
+写入交给 PersistenceWorker 的后台线程，处理器只把行追加到内存缓冲。
+"""
+import functools
+import json
+import os
+import struct
+
+from .cards import cards_str
+from .deck import Deck
+from .evaluator import hand_name
+from .game import GameError, Player, PokerGame
+
+INDEX_ENTRY = struct.Struct("<QII")
+HAND_STARTS = ("start", "next")
+SEGMENT = "segment"
+
+
+def apply_event(game, kind: str, data: list):
+    """把一条事件应用到 game，返回 (之后的 game, 事件结果)；牌局被移除时 game 为 None"""
+    if kind == "start":
+        return PokerGame(*data[0]), None
+    if kind in ("next", "checkpoint"):
+        return PokerGame.from_dict(data[0]), None
+    if kind in ("end", "evict"):
+        return None, None
+    if game is None:
+        raise ValueError(f"事件 {kind} 之前没有牌局")
+    if kind == "join":
+        player_id, name, private_unified, bot_level, buyin = data
+        player = Player(player_id, name, private_unified, bot_level)
+        player.contributed = buyin
+        game.pot += buyin
+        game.add_player(player)
+        return game, player
+    if kind == "deal":
+        deck, balances = data
+        game.deck = Deck.from_state(deck)
+        return game, game.start_hand(dict(balances))
+    if kind == "act":
+        player_id, action, amount, balance = data
+        return game, game.act(player_id, action, {player_id: balance}, amount)
+    if kind == "street":
+        return game, game.advance_street()
+    if kind == "settle":
+        return game, game.settle({})
+    raise ValueError(f"未知的事件: {kind}")
+
+
+def _read_lines(path: str, offset: int = 0):
+    """逐行读取一段日志，返回 (行偏移, 记录)；忽略没写完的最后一行"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            pos = f.tell()
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                return
+            yield pos, json.loads(line)
+
+
+class ActionLog:
+    def __init__(self, directory: str, persistence, checkpoint_every: int = 1000, keep_segments: int = 20,
+                 resident=None):
+        self.directory = directory
+        self.persistence = persistence
+        self.checkpoint_every = checkpoint_every
+        self.keep_segments = keep_segments
+        self.resident = resident or (lambda: [])   # 返回常驻的 [(群号, PokerGame), ...]
+        self.index_path = os.path.join(directory, "actions.idx")
+        self.next_hand_id = 1
+        self._since_checkpoint = 0
+        self._buffer = []                   # 待写入的 (牌局编号或 0, 行) 以及换段标记 (None, 段号)
+        self._segment = self._latest_segment()
+        self._file = None                   # 以下只在写入线程中使用
+        self._index = None
+        self._segment_no = self._segment
+        os.makedirs(directory, exist_ok=True)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"actions-{segment:06d}.jsonl")
+
+    def _latest_segment(self) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        segments = [int(name[8:-6]) for name in os.listdir(self.directory)
+                    if name.startswith("actions-") and name.endswith(".jsonl")]
+        return max(segments, default=0)
+
+    # ---------- 记录 ----------
+    def record(self, group_id: str, game: PokerGame, kind: str, *data):
+        """记录 game 的一次状态变化；next 和 checkpoint 的参数（完整状态）在这里生成"""
+        if kind in HAND_STARTS:
+            game.hand_id = self.next_hand_id
+            self.next_hand_id += 1
+        if kind in ("next", "checkpoint"):
+            data = (game.to_dict(),)
+        line = json.dumps([group_id, game.hand_id, kind, *data], ensure_ascii=False, separators=(",", ":"))
+        self._buffer.append((game.hand_id if kind in HAND_STARTS else 0, (line + "\n").encode("utf-8")))
+        self._since_checkpoint += 1
+        if self.checkpoint_every and self._since_checkpoint >= self.checkpoint_every:
+            self.rotate(self.resident())
+        self.persistence.mark_dirty("actions", self._prepare)
+
+    def rotate(self, games):
+        """开始新的一段：段头记录下一个牌局编号，随后是 games 中每个牌局的 checkpoint"""
+        self._segment += 1
+        self._since_checkpoint = 0
+        self._buffer.append((None, self._segment))
+        header = json.dumps(["", self.next_hand_id, SEGMENT])
+        self._buffer.append((0, (header + "\n").encode("utf-8")))
+        for group_id, game in games:
+            line = json.dumps([group_id, game.hand_id, "checkpoint", game.to_dict()],
+                              ensure_ascii=False, separators=(",", ":"))
+            self._buffer.append((0, (line + "\n").encode("utf-8")))
+        self.persistence.mark_dirty("actions", self._prepare)
+
+    def _prepare(self):
+        items, self._buffer = self._buffer, []
+        if not items:
+            return None
+        return functools.partial(self._write, items)
+
+    def _write(self, items: list) -> int:
+        written = 0
+        for hand_start, payload in items:
+            if hand_start is None:
+                self._open_segment(payload)
+                continue
+            if self._file is None:
+                self._open_segment(self._segment_no)
+            offset = self._file.tell()
+            self._file.write(payload)
+            written += len(payload)
+            if hand_start:
+                self._index.write(INDEX_ENTRY.pack(hand_start, self._segment_no, offset))
+        if self._file is not None:
+            self._file.flush()
+            self._index.flush()
+        return written
+
+    def _open_segment(self, segment: int):
+        if self._file is not None:
+            self._file.flush()
+            self._file.close()
+        self._file = open(self._segment_path(segment), "ab")
+        self._segment_no = segment
+        if self._index is None:
+            self._index = open(self.index_path, "ab")
+        # 只保留最近 keep_segments 段
+        stale = segment - self.keep_segments
+        while stale > 0 and os.path.exists(self._segment_path(stale)):
+            os.remove(self._segment_path(stale))
+            stale -= 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    # ---------- 恢复 ----------
+    def recover(self) -> dict:
+        """重放最新一段日志，返回 {群号: PokerGame}（进行中的牌局）。应在记录任何事件之前调用"""
+        games = {}
+        if not self._segment:
+            return games
+        path = self._segment_path(self._segment)
+        if not os.path.exists(path):
+            return games
+        for _, (group_id, hand_id, kind, *data) in _read_lines(path):
+            if kind == SEGMENT:
+                self.next_hand_id = max(self.next_hand_id, hand_id)
+                continue
+            if kind in HAND_STARTS:
+                self.next_hand_id = max(self.next_hand_id, hand_id + 1)
+            if group_id not in games and kind not in ("start", "next", "checkpoint"):
+                # 这张桌子的状态不在本段中（例如已损坏而被丢弃）
+                continue
+            try:
+                game, _ = apply_event(games.get(group_id), kind, data)
+            except (GameError, ValueError, KeyError, TypeError) as e:
+                print(f"重放群 {group_id} 的操作日志失败:", e)
+                games.pop(group_id, None)
+                continue
+            if game is None:
+                games.pop(group_id, None)
+            else:
+                game.hand_id = hand_id
+                games[group_id] = game
+        return games
+
+    # ---------- 回放 ----------
+    def _find_start(self, hand_id: int):
+        """在索引中二分查找牌局编号，返回 (段号, 偏移) 或 None"""
+        if not os.path.exists(self.index_path):
+            return None
+        size = INDEX_ENTRY.size
+        count = os.path.getsize(self.index_path) // size
+        with open(self.index_path, "rb") as f:
+            # 牌局编号按分配顺序写入索引，是递增的
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(mid * size)
+                if INDEX_ENTRY.unpack(f.read(size))[0] < hand_id:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == count:
+                return None
+            f.seek(lo * size)
+            found, segment, offset = INDEX_ENTRY.unpack(f.read(size))
+        return (segment, offset) if found == hand_id else None
+
+    def hand_events(self, hand_id: int):
+        """
+        读出一局的全部事件，返回 (群号, [(事件, 参数), ...], 是否已结算)；找不到时返回 None。
+        读文件，应在线程中调用，调用前先 flush 持久化。
+        """
+        start = self._find_start(hand_id)
+        if start is None:
+            return None
+        segment, offset = start
+        group_id = None
+        events = []
+        while os.path.exists(self._segment_path(segment)):
+            for _, (gid, hid, kind, *data) in _read_lines(self._segment_path(segment), offset):
+                if hid != hand_id or kind in (SEGMENT, "evict"):
+                    continue
+                group_id = gid
+                events.append((kind, data))
+                if kind in ("settle", "end"):
+                    return group_id, events, kind == "settle"
+            segment += 1
+            offset = 0
+        if not events:
+            return None
+        return group_id, events, False
+
+
+def replay_lines(events: list) -> list:
+    """把一局的事件重放成文字记录"""
+    lines = []
+    game = None
+    for kind, data in events:
+        if kind == "checkpoint" and game is not None:
+            continue
+        game, result = apply_event(game, kind, data)
+        if game is None:
+            lines.append("牌局被结束。")
+            break
+        if kind == "start":
+            lines.append(f"开局：买入 {game.buyin}，小盲 {game.small_blind}，大盲 {game.big_blind}")
+        elif kind in ("next", "checkpoint"):
+            names = "、".join(p.name for p in game.players)
+            lines.append(f"玩家：{names}，彩池 {game.pot}")
+            if game.blinds:
+                lines.append(f"盲注：{game.blinds.small_player.name} 小盲 {game.blinds.small}" +
+                             (f"，{game.blinds.big_player.name} 大盲 {game.blinds.big}" if game.blinds.big_player else ""))
+        elif kind == "join":
+            lines.append(f"{result.name} 加入，买入 {game.buyin}")
+        elif kind == "deal":
+            if game.deck.seed is not None:
+                lines.append(f"牌堆承诺：{game.deck.commitment}")
+            lines.append("发牌：" + "，".join(f"{p.name} {cards_str(p.cards)}" for p in game.players))
+            if data[1]:
+                lines.append(f"盲注：{result.small_player.name} 小盲 {result.small}" +
+                             (f"，{result.big_player.name} 大盲 {result.big}" if result.big_player else ""))
+        elif kind == "act":
+            name = game.find_player(data[0]).name
+            action = data[1]
+            lines.append({
+                "fold": f"{name} 弃牌",
+                "check": f"{name} 看牌",
+                "call": f"{name} 跟注 {result}",
+                "raise": f"{name} 加注 {data[2]}，共支付 {result}",
+                "allin": f"{name} 全压 {result}",
+            }.get(action, f"{name} {action}"))
+        elif kind == "street":
+            label = {"flop": "翻牌", "turn": "转牌", "river": "河牌"}[game.phase]
+            lines.append(f"{label}：{cards_str(result)}")
+        elif kind == "settle":
+            for p in game.players:
+                if p.id in result.scores:
+                    lines.append(f"{p.name} 亮牌 {cards_str(p.cards)}：{hand_name(result.scores[p.id])}")
+            for p in game.players:
+                if result.payouts.get(p.id):
+                    lines.append(f"{p.name} 赢得 {result.payouts[p.id]} 代币")
+            if game.deck.seed is not None:
+                lines.append(f"牌堆种子：{game.deck.seed.hex()}")
+    return lines
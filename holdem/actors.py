@@ -0,0 +1,108 @@
+"""
+每张牌桌一个指令邮箱（actor）。
+
+同一个群的指令按到达顺序逐条执行，一条指令（包括其中的 await）执行完才开始下一条；
+不同群各有自己的后台任务，互不等待。邮箱为空时后台任务退出，下次有指令时再创建。
+
+处理器本身是异步生成器，``run`` 把它放进邮箱，执行过程中产生的结果原样转发给调用方。
+在某张桌子的任务中再次调用同一张桌子的处理器（如 next 调用 showdown）会直接执行，不会死锁。
+"""
+import asyncio
+import contextvars
+import time
+from collections import deque
+
+_current_table = contextvars.ContextVar("current_table", default=None)
+
+_RESULT, _DONE, _ERROR = range(3)
+
+
+class TableStats:
+    __slots__ = ("processed", "total_wait", "max_wait", "last_wait", "total_busy")
+
+    def __init__(self):
+        self.processed = 0          # 已处理的指令数
+        self.total_wait = 0.0       # 指令在邮箱中排队的总时间（秒）
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.total_busy = 0.0       # 执行指令的总时间（秒）
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.processed if self.processed else 0.0
+
+
+class TableActors:
+    def __init__(self):
+        self._mailboxes = {}        # group_id -> deque[(生成器, 输出队列, 入队时间)]
+        self._workers = {}          # group_id -> asyncio.Task
+        self._running = set()       # 正在执行指令的 group_id
+        self.stats = {}             # group_id -> TableStats
+
+    def depth(self, group_id: str) -> int:
+        """排队中的指令数，包括正在执行的一条"""
+        mailbox = self._mailboxes.get(group_id)
+        return (len(mailbox) if mailbox else 0) + (group_id in self._running)
+
+    def hot_tables(self, n: int = 10) -> list:
+        """按排队深度、平均等待时间从高到低返回 [(group_id, 深度, TableStats), ...]"""
+        tables = [(group_id, self.depth(group_id), stats) for group_id, stats in self.stats.items()]
+        tables.sort(key=lambda t: (t[1], t[2].avg_wait), reverse=True)
+        return tables[:n]
+
+    async def run(self, group_id: str, gen):
+        """在 group_id 的邮箱中执行异步生成器 gen，并转发它产生的结果"""
+        if _current_table.get() == group_id:
+            async for result in gen:
+                yield result
+            return
+        out = asyncio.Queue()
+        mailbox = self._mailboxes.get(group_id)
+        if mailbox is None:
+            mailbox = self._mailboxes[group_id] = deque()
+        mailbox.append((gen, out, time.perf_counter()))
+        if group_id not in self._workers:
+            self._workers[group_id] = asyncio.get_running_loop().create_task(self._work(group_id))
+        while True:
+            kind, value = await out.get()
+            if kind == _RESULT:
+                yield value
+            elif kind == _DONE:
+                return
+            else:
+                raise value
+
+    async def _work(self, group_id: str):
+        _current_table.set(group_id)
+        mailbox = self._mailboxes[group_id]
+        stats = self.stats.get(group_id)
+        if stats is None:
+            stats = self.stats[group_id] = TableStats()
+        try:
+            while mailbox:
+                gen, out, enqueued = mailbox.popleft()
+                start = time.perf_counter()
+                wait = start - enqueued
+                stats.processed += 1
+                stats.total_wait += wait
+                stats.last_wait = wait
+                stats.max_wait = max(stats.max_wait, wait)
+                self._running.add(group_id)
+                try:
+                    async for result in gen:
+                        out.put_nowait((_RESULT, result))
+                    out.put_nowait((_DONE, None))
+                except BaseException as e:
+                    out.put_nowait((_ERROR, e))
+                    if not isinstance(e, Exception):
+                        # 任务被取消（如插件卸载）：排队中的指令也不会再执行，通知它们的调用方后再向上抛出
+                        while mailbox:
+                            mailbox.popleft()[1].put_nowait((_ERROR, asyncio.CancelledError()))
+                        raise
+                finally:
+                    self._running.discard(group_id)
+                    stats.total_busy += time.perf_counter() - start
+        finally:
+            del self._workers[group_id]
+            if not mailbox:
+                del self._mailboxes[group_id]
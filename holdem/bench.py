@@ -0,0 +1,405 @@
+"""
+微基准测试：牌型评价、摊牌结算、牌堆和持久化路径。
+
+不依赖 AstrBot，在插件目录下运行：
+
+    python -m holdem.bench                          # 运行全部用例并打印结果
+    python -m holdem.bench --save bench_baseline.json
+    python -m holdem.bench --compare bench_baseline.json
+
+    git show 8bec34e:main.py > /tmp/legacy_main.py       # 改造前的单文件插件
+    python -m holdem.bench --legacy /tmp/legacy_main.py --save bench_baseline.json
+
+每个用例报告 ops/sec 以及单次操作耗时的 p50 / p99（微秒）。
+很快的操作按批计时，分位数取自每批的平均单次耗时；持久化用例逐次计时。
+--compare 会把吞吐量与基线比较，下降超过 --threshold 的用例标记为回退，进程以状态码 1 退出。
+--legacy 用改造前的实现执行同名用例（见 legacy_cases），仓库里的基线就是这样记录的。
+
+持久化用例对应插件中的 save_tokens（余额日志：一次变动 + 一次提交）和
+save_game_records（追加一局记录）。--sizes 是计时前预先写入的用户数 / 记录数，默认 10k / 100k / 1M；
+每个规模计时 PERSIST_OPS 次操作，累计超过 PERSIST_MAX_TIME 秒时提前停止。
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+from .cards import CARD_STRINGS, FULL_DECK
+from .evaluator import evaluate, np
+from .game import Player, PokerGame
+from .history import HandHistory
+from .journal import BalanceBook, TokenJournal
+from .settlement import award_pots, build_pots
+from .sqlite_store import SQLiteStore
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+PERSIST_OPS = 10_000            # 与余额日志默认的压缩阈值相同，计时中包含一次压缩
+PERSIST_MAX_TIME = 10.0
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[k]
+
+
+def _result(total_ops: int, total_time: float, per_op: list) -> dict:
+    per_op.sort()
+    return {
+        "ops": total_ops,
+        "ops_per_sec": total_ops / total_time if total_time > 0 else 0.0,
+        "p50_us": _percentile(per_op, 0.50) * 1e6,
+        "p99_us": _percentile(per_op, 0.99) * 1e6,
+    }
+
+
+def bench_batched(fn, inputs: list, batch: int, min_time: float) -> dict:
+    """对 inputs 中的参数循环调用 fn，每 batch 次计一次时，至少运行 min_time 秒"""
+    per_op = []
+    total_ops = 0
+    total_time = 0.0
+    perf = time.perf_counter
+    n = len(inputs)
+    i = 0
+    while total_time < min_time:
+        chunk = [inputs[(i + k) % n] for k in range(batch)]
+        i += batch
+        start = perf()
+        for args in chunk:
+            fn(*args)
+        elapsed = perf() - start
+        per_op.append(elapsed / batch)
+        total_ops += batch
+        total_time += elapsed
+    return _result(total_ops, total_time, per_op)
+
+
+def bench_each(fn, count: int, max_time: float = None) -> dict:
+    """逐次调用 fn(i) 并计时，共 count 次；累计超过 max_time 秒时提前停止"""
+    per_op = []
+    perf = time.perf_counter
+    start_all = perf()
+    for i in range(count):
+        start = perf()
+        fn(i)
+        end = perf()
+        per_op.append(end - start)
+        if max_time is not None and end - start_all >= max_time:
+            break
+    return _result(len(per_op), perf() - start_all, per_op)
+
+
+# ---------- 用例 ----------
+def _random_hands(size: int, count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [(rng.sample(FULL_DECK, size),) for _ in range(count)]
+
+
+def case_evaluate_5cards(min_time: float) -> dict:
+    return bench_batched(evaluate, _random_hands(5, 10000, 1), 1000, min_time)
+
+
+def case_evaluate_hand(min_time: float) -> dict:
+    return bench_batched(evaluate, _random_hands(7, 10000, 2), 1000, min_time)
+
+
+def _showdown_9(deck: list):
+    """9 人摊牌：逐人评价 7 张牌，再按投入额拆池、分池"""
+    board = deck[:5]
+    scores = {}
+    contributions = []
+    for k in range(9):
+        pid = str(k)
+        scores[pid] = evaluate(deck[5 + 2 * k:7 + 2 * k] + board)
+        # 三档全下金额，保证有主池和两个边池
+        contributions.append((pid, (1, 2, 3)[k % 3] * 100))
+    pots = build_pots(contributions, set(scores))
+    return award_pots(pots, scores)
+
+
+def case_showdown_9(min_time: float) -> dict:
+    rng = random.Random(3)
+    inputs = [(rng.sample(FULL_DECK, 23),) for _ in range(2000)]
+    return bench_batched(_showdown_9, inputs, 100, min_time)
+
+
+def case_create_deck(min_time: float) -> dict:
+    """洗出整副 52 张牌的顺序（改造前每局开始时都要这样洗一遍）"""
+    deck = PokerGame(100, 10, 20, 20, 9).deck
+
+    def create_deck():
+        deck.shuffle()
+        return deck.order()
+    return bench_batched(create_deck, [()], 1000, min_time)
+
+
+def case_reseed_deck(min_time: float) -> dict:
+    """惰性牌堆每局开始时的重置：换种子，牌堆恢复初始顺序，不洗牌"""
+    game = PokerGame(100, 10, 20, 20, 9)
+    return bench_batched(game.deck.shuffle, [()], 1000, min_time)
+
+
+def case_deal_card(min_time: float) -> dict:
+    """从新牌堆发出一局 9 人所需的 23 张牌（含准备新牌堆）"""
+    game = PokerGame(100, 10, 20, 20, 9)
+
+    def deal_hand():
+        game.deck.shuffle()
+        for _ in range(23):
+            game.deal_card()
+    return bench_batched(deal_hand, [()], 100, min_time)
+
+
+def _hand_record(i: int) -> dict:
+    return {
+        "group_id": f"g{i % 50}",
+        "phase": "river",
+        "pot": 400 + i % 1000,
+        "community_cards": ["A♠", "K♥", "7♦", "7♣", "2♠"],
+        "players": [
+            {"id": f"u{(i + k) % 1000}", "name": f"玩家{k}", "final_bet": 20, "hand": ["Q♠", "Q♥"],
+             "active": True, "hand_rank": 1 << 21}
+            for k in range(6)
+        ],
+        "winners": [[f"u{i % 1000}", "玩家0"]],
+        "payouts": {f"u{i % 1000}": 400 + i % 1000},
+        "timestamp": 1700000000 + i,
+    }
+
+
+def case_save_tokens(count: int, workdir: str, backend: str) -> dict:
+    """已有 count 名用户时，一次余额变动 + 一次提交（即插件里每条指令末尾的 save_tokens）"""
+    if backend == "sqlite":
+        store = SQLiteStore(os.path.join(workdir, "bench.db"))
+    else:
+        store = TokenJournal(os.path.join(workdir, "tokens.json"), os.path.join(workdir, "tokens.journal"))
+    book = BalanceBook(store, store.load())
+    book["g"] = {f"u{i}": 1000 for i in range(count)}
+    if backend == "sqlite":
+        store.commit()
+    else:
+        store.compact()
+    group = book["g"]
+
+    def op(i):
+        group[f"u{i % count}"] = i
+        store.commit()
+    try:
+        return bench_each(op, PERSIST_OPS, PERSIST_MAX_TIME)
+    finally:
+        store.close()
+
+
+def case_save_game_records(count: int, workdir: str, backend: str) -> dict:
+    """已有 count 局记录时，追加一局牌局记录（即插件里摊牌后的 record_game）"""
+    records = [_hand_record(i) for i in range(min(count, 1000))]
+    if backend == "sqlite":
+        store = SQLiteStore(os.path.join(workdir, "bench.db"))
+        with store.lock, store.conn:
+            for i in range(count):
+                store._insert_hand(records[i % len(records)])
+        append, close = store.append_hand, store.close
+    else:
+        history = HandHistory(os.path.join(workdir, "game_records.jsonl"), os.path.join(workdir, "game_records.idx"))
+        for i in range(count):
+            history.append(records[i % len(records)])
+        append, close = history.append, history.close
+    try:
+        return bench_each(lambda i: append(records[i % len(records)]), PERSIST_OPS, PERSIST_MAX_TIME)
+    finally:
+        close()
+
+
+def load_legacy(path: str) -> dict:
+    """
+    从改造前的单文件插件中取出 PokerGame、牌型评价函数和插件的 save_* 方法，不导入 AstrBot：
+    只执行模块顶层的 import、函数和没有装饰器的类，插件类中的方法作为普通函数取出（self 由调用方提供）。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    keep = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.FunctionDef)) or (isinstance(node, ast.ClassDef) and not node.decorator_list):
+            keep.append(node)
+        elif isinstance(node, ast.ClassDef):
+            keep.extend(n for n in node.body if isinstance(n, ast.FunctionDef) and n.name.startswith("save_"))
+    namespace = {}
+    exec(compile(ast.Module(body=keep, type_ignores=[]), path, "exec"), namespace)
+    return namespace
+
+
+def legacy_cases(legacy: dict) -> tuple:
+    """
+    用改造前的实现执行同名用例，返回 (微基准用例, 持久化用例)。
+    牌是 "10♠" 这样的字符串；摊牌没有边池，最大者平分彩池；
+    save_tokens / save_game_records 每次把整个文件重写一遍，只有 JSON 后端。
+    """
+    evaluate_5cards, evaluate_hand = legacy["evaluate_5cards"], legacy["evaluate_hand"]
+
+    def strings(hands: list) -> list:
+        return [([CARD_STRINGS[c] for c in cards],) for cards, in hands]
+
+    def showdown_9(deck: list):
+        board = deck[:5]
+        scores = {str(k): evaluate_hand(deck[5 + 2 * k:7 + 2 * k] + board) for k in range(9)}
+        best = max(scores.values())
+        winners = [pid for pid, score in scores.items() if score == best]
+        return {pid: 1800 // len(winners) for pid in winners}
+
+    def case_showdown_9(min_time):
+        rng = random.Random(3)
+        inputs = strings([(rng.sample(FULL_DECK, 23),) for _ in range(2000)])
+        return bench_batched(showdown_9, inputs, 10, min_time)
+
+    def case_create_deck(min_time):
+        game = legacy["PokerGame"](100, 10, 20, 20, 9)
+        return bench_batched(game.create_deck, [()], 1000, min_time)
+
+    def case_deal_card(min_time):
+        game = legacy["PokerGame"](100, 10, 20, 20, 9)
+
+        def deal_hand():
+            game.deck = game.create_deck()
+            for _ in range(23):
+                game.deal_card()
+        return bench_batched(deal_hand, [()], 100, min_time)
+
+    def case_save_tokens(count, workdir, backend):
+        plugin = types.SimpleNamespace(tokens={"g": {f"u{i}": 1000 for i in range(count)}},
+                                       tokens_file=os.path.join(workdir, "tokens.json"))
+
+        def op(i):
+            plugin.tokens["g"][f"u{i % count}"] = i
+            legacy["save_tokens"](plugin)
+        return bench_each(op, PERSIST_OPS, PERSIST_MAX_TIME)
+
+    def case_save_game_records(count, workdir, backend):
+        records = [_hand_record(i) for i in range(min(count, 1000))]
+        plugin = types.SimpleNamespace(game_records=[records[i % len(records)] for i in range(count)],
+                                       game_records_file=os.path.join(workdir, "game_records.json"))
+
+        def op(i):
+            plugin.game_records.append(records[i % len(records)])
+            legacy["save_game_records"](plugin)
+        return bench_each(op, PERSIST_OPS, PERSIST_MAX_TIME)
+
+    micro = {
+        "evaluate_5cards": lambda min_time: bench_batched(
+            evaluate_5cards, strings(_random_hands(5, 10000, 1)), 1000, min_time),
+        "evaluate_hand": lambda min_time: bench_batched(
+            evaluate_hand, strings(_random_hands(7, 10000, 2)), 100, min_time),
+        "showdown_9": case_showdown_9,
+        "create_deck": case_create_deck,
+        "deal_card": case_deal_card,
+    }
+    persist = {"save_tokens": case_save_tokens, "save_game_records": case_save_game_records}
+    return micro, persist
+
+
+MICRO_CASES = {
+    "evaluate_5cards": case_evaluate_5cards,
+    "evaluate_hand": case_evaluate_hand,
+    "showdown_9": case_showdown_9,
+    "create_deck": case_create_deck,
+    "reseed_deck": case_reseed_deck,
+    "deal_card": case_deal_card,
+}
+
+PERSIST_CASES = {
+    "save_tokens": case_save_tokens,
+    "save_game_records": case_save_game_records,
+}
+
+
+def run(min_time: float = 1.0, sizes=DEFAULT_SIZES, backends=("json",), only=None, legacy: str = None) -> dict:
+    micro, persist = MICRO_CASES, PERSIST_CASES
+    if legacy:
+        micro, persist = legacy_cases(load_legacy(legacy))
+        backends = ("json",)
+    results = {}
+    for name, case in micro.items():
+        if only and not any(o in name for o in only):
+            continue
+        results[name] = case(min_time)
+        _print_row(name, results[name])
+    for backend in backends:
+        for name, case in persist.items():
+            for size in sizes:
+                key = f"{name}[{backend},{size}]"
+                if only and not any(o in key for o in only):
+                    continue
+                workdir = tempfile.mkdtemp(prefix="poker-bench-")
+                try:
+                    results[key] = case(size, workdir, backend)
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+                _print_row(key, results[key])
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np is not None and not legacy,
+            "legacy": bool(legacy),
+            "timestamp": int(time.time()),
+        },
+        "results": results,
+    }
+
+
+def _print_row(name: str, r: dict):
+    print(f"{name:<40} {r['ops_per_sec']:>14,.0f} ops/s   p50 {r['p50_us']:>9.2f}us   p99 {r['p99_us']:>9.2f}us")
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """返回吞吐量下降超过 threshold（比例）的用例 [(名称, 基线 ops/s, 当前 ops/s), ...]"""
+    regressions = []
+    print(f"\n与基线比较（{baseline['meta'].get('platform', '?')}，Python {baseline['meta'].get('python', '?')}）：")
+    for name, r in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["ops_per_sec"]:
+            continue
+        ratio = r["ops_per_sec"] / base["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  <-- 回退"
+            regressions.append((name, base["ops_per_sec"], r["ops_per_sec"]))
+        print(f"{name:<40} {ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holdem.bench", description="德州扑克插件微基准测试")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每个微基准用例至少运行的秒数")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="持久化用例的记录数")
+    parser.add_argument("--sqlite", action="store_true", help="同时测试 SQLite 存储后端")
+    parser.add_argument("--only", nargs="+", help="只运行名称包含这些字符串的用例")
+    parser.add_argument("--save", metavar="PATH", help="把结果保存为 JSON 基线")
+    parser.add_argument("--compare", metavar="PATH", help="与 JSON 基线比较")
+    parser.add_argument("--legacy", metavar="PATH", help="用改造前的单文件插件（main.py）执行用例")
+    parser.add_argument("--threshold", type=float, default=0.2, help="吞吐量下降超过该比例视为回退")
+    args = parser.parse_args(argv)
+
+    backends = ("json", "sqlite") if args.sqlite else ("json",)
+    current = run(args.min_time, args.sizes, backends, args.only, args.legacy)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print("已保存基线:", args.save)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
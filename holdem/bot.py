@@ -0,0 +1,89 @@
+"""
+机器人玩家的决策。
+
+decide 只接收可序列化的局面（BotView），不访问 PokerGame，可以放进线程或进程池执行。
+决策是随时可停的：在时间预算内反复随机补齐对手手牌和剩余公共牌来估计胜率，
+到点立即停止，用已有样本的胜率与底池赔率比较，决定弃牌、看牌、跟注、加注或全下。
+预算再短也至少完成一小批样本，因此总能给出决策。
+
+等级越高，使用的预算比例越大（样本越多）、对胜率的误判越小、强牌时加注越积极。
+"""
+import random
+import time
+from collections import namedtuple
+
+from .evaluator import evaluate
+
+# cards / board: 整数牌元组；opponents: 未弃牌的对手数；to_call: 跟注还需支付的筹码；
+# stack: 机器人余额；can_raise: 本轮是否还允许机器人加注
+BotView = namedtuple("BotView", ["cards", "board", "opponents", "to_call", "pot", "stack",
+                                 "big_blind", "can_raise"])
+# action 为 PokerGame.act 接受的行动，amount 为加注额；equity、samples 为决策依据
+Decision = namedtuple("Decision", ["action", "amount", "equity", "samples"])
+
+# 等级 -> (使用的预算比例, 胜率噪声幅度, 加注所需的胜率优势, 诈唬概率)
+LEVELS = {
+    1: (0.2, 0.15, 0.30, 0.00),
+    2: (0.6, 0.05, 0.20, 0.03),
+    3: (1.0, 0.00, 0.12, 0.06),
+}
+
+BATCH = 16      # 每批样本数，批与批之间检查是否超时
+
+
+def sample_equity(cards, board, opponents: int, deadline: float, rng) -> tuple:
+    """在 deadline（perf_counter 时刻）前估计对 opponents 名随机对手的胜率，返回 (胜率, 样本数)"""
+    if opponents <= 0:
+        return 1.0, 0
+    dead = set(cards) | set(board)
+    remaining = [c for c in range(52) if c not in dead]
+    need = 5 - len(board)
+    draw = need + 2 * opponents
+    hero = list(cards)
+    board = list(board)
+    share = 0.0
+    samples = 0
+    while True:
+        for _ in range(BATCH):
+            drawn = rng.sample(remaining, draw)
+            common = board + drawn[:need]
+            mine = evaluate(hero + common)
+            ties = 1
+            for k in range(need, draw, 2):
+                score = evaluate(drawn[k:k + 2] + common)
+                if score > mine:
+                    break
+                if score == mine:
+                    ties += 1
+            else:
+                share += 1.0 / ties
+        samples += BATCH
+        if time.perf_counter() >= deadline:
+            return share / samples, samples
+
+
+def decide(view: BotView, level: int, budget: float, seed=None) -> Decision:
+    """在 budget 秒内给出一个合法的行动"""
+    fraction, noise, margin, bluff = LEVELS[level]
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + budget * fraction
+    equity, samples = sample_equity(view.cards, view.board, view.opponents, deadline, rng)
+    if noise:
+        equity = min(max(equity + rng.uniform(-noise, noise), 0.0), 1.0)
+    # 平均分到的份额；胜率高出 margin 才加注
+    fair = 1.0 / (view.opponents + 1)
+    strong = equity >= fair + margin or rng.random() < bluff
+    to_call = min(view.to_call, view.stack)
+    if strong and view.can_raise:
+        amount = max(view.big_blind, (view.pot + to_call) // 2)
+        if view.stack <= view.to_call + amount:
+            return Decision("allin", 0, equity, samples)
+        return Decision("raise", amount, equity, samples)
+    if view.to_call == 0:
+        return Decision("check", 0, equity, samples)
+    # 底池赔率：跟注额占跟注后彩池的比例
+    if equity < to_call / (view.pot + to_call):
+        return Decision("fold", 0, equity, samples)
+    if view.stack <= view.to_call:
+        return Decision("allin", 0, equity, samples)
+    return Decision("call", 0, equity, samples)
@@ -0,0 +1,43 @@
+"""
+扑克牌的整数编码。
+
+每张牌编码为 0–51 的整数：``card = rank * 4 + suit``，
+rank 0–12 依次对应 2…A，suit 0–3 依次对应 ♠ ♥ ♦ ♣。
+"""
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+SUITS = ['♠', '♥', '♦', '♣']
+
+# 整数 -> 字符串（如 "10♠"），以及反向查找表
+CARD_STRINGS = [f"{RANKS[c >> 2]}{SUITS[c & 3]}" for c in range(52)]
+CARD_INDEX = {s: c for c, s in enumerate(CARD_STRINGS)}
+
+
+def make_card(rank: int, suit: int) -> int:
+    """由 rank（0–12）和 suit（0–3）构造整数牌。"""
+    return rank * 4 + suit
+
+
+def card_rank(card: int) -> int:
+    return card >> 2
+
+
+def card_suit(card: int) -> int:
+    return card & 3
+
+
+def parse_card(text: str) -> int:
+    """将 "10♠" 这样的字符串解析为整数牌。"""
+    return CARD_INDEX[text]
+
+
+def card_str(card: int) -> str:
+    return CARD_STRINGS[card]
+
+
+def cards_str(cards) -> str:
+    """渲染一组牌，例如 "A♠ 10♥"。"""
+    return ' '.join(CARD_STRINGS[c] for c in cards)
+
+
+# 按编码顺序排列的一副牌，每张牌占一个字节（洗牌见 deck.py）
+FULL_DECK = bytes(range(52))
@@ -0,0 +1,146 @@
+"""
+牌堆：按需的部分 Fisher–Yates 洗牌，每局一个可公开验证的随机种子。
+
+每局开始时从 SeedSource 取一个 32 字节种子（默认来自 os.urandom，一次读取一批再切开使用）。
+随机数流为以种子为密钥的 BLAKE2b(块号)，每块 64 字节供 16 次抽牌，用到时才计算。
+draw() 每次只从尚未发出的部分随机选一张换到已发部分的末尾，发多少张就只洗多少张：
+翻牌前就结束的一局不需要洗整副牌。同一个种子总是得到同一个发牌顺序。
+
+开局时公布承诺 sha256(种子)，结算后公布种子本身，任何人都可以核对承诺并重现整副牌的顺序：
+
+    python -m holdem.deck <种子> [承诺]
+
+牌堆的 52 字节缓冲区在各局之间复用，新一局只把它恢复成初始顺序。
+"""
+import hashlib
+import os
+import sys
+import threading
+from array import array
+
+from .cards import FULL_DECK, cards_str
+
+SEED_BYTES = 32
+
+
+class SeedSource:
+    """把 entropy(n) 一次取出的 batch 个种子的随机字节切开使用，减少系统调用"""
+
+    def __init__(self, entropy=os.urandom, batch: int = 64):
+        self.entropy = entropy
+        self.batch = batch
+        self._buffer = b""
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def seed(self) -> bytes:
+        with self._lock:
+            if self._pos >= len(self._buffer):
+                self._buffer = self.entropy(SEED_BYTES * self.batch)
+                self._pos = 0
+            seed = self._buffer[self._pos:self._pos + SEED_BYTES]
+            self._pos += SEED_BYTES
+        return seed
+
+
+SYSTEM_SEEDS = SeedSource()
+
+
+def commitment(seed: bytes) -> str:
+    return hashlib.sha256(seed).hexdigest()
+
+
+class Deck:
+    __slots__ = ("cards", "drawn", "seed", "_stream", "_source")
+
+    def __init__(self, source: SeedSource = None, seed: bytes = None):
+        self.cards = bytearray(FULL_DECK)   # 前 drawn 张为已发出的牌，按发出顺序
+        self.drawn = 0
+        self.seed = None
+        self._stream = array("I")           # 已计算的随机数（每次抽牌用一个 32 位整数）
+        self._source = source or SYSTEM_SEEDS
+        self.shuffle(seed)
+
+    def shuffle(self, seed: bytes = None):
+        """开始新的一局：换一个种子（默认从 SeedSource 取），牌堆恢复初始顺序"""
+        self.seed = seed if seed is not None else self._source.seed()
+        del self._stream[:]
+        self.cards[:] = FULL_DECK
+        self.drawn = 0
+
+    @property
+    def commitment(self) -> str:
+        return commitment(self.seed) if self.seed is not None else ""
+
+    def __len__(self) -> int:
+        return len(self.cards) - self.drawn
+
+    def draw(self) -> int:
+        n = self.drawn
+        cards = self.cards
+        left = len(cards) - n
+        if left <= 0:
+            raise IndexError("牌堆已空")
+        if self.seed is not None:
+            stream = self._stream
+            if n == len(stream):
+                stream.frombytes(hashlib.blake2b(bytes((n >> 4,)), key=self.seed).digest())
+            # 32 位随机数乘以剩余张数取高位，偏差不超过 52 / 2**32
+            j = n + (stream[n] * left >> 32)
+            cards[n], cards[j] = cards[j], cards[n]
+        self.drawn = n + 1
+        return cards[n]
+
+    def order(self) -> list:
+        """整副牌的发出顺序（会发完牌堆，用于验证）；与逐张 draw 的结果相同，只是一次算完"""
+        cards = self.cards
+        total = len(cards)
+        if self.seed is not None:
+            stream = self._stream
+            while len(stream) < total:
+                stream.frombytes(hashlib.blake2b(bytes((len(stream) >> 4,)), key=self.seed).digest())
+            for n in range(self.drawn, total):
+                j = n + (stream[n] * (total - n) >> 32)
+                cards[n], cards[j] = cards[j], cards[n]
+        self.drawn = total
+        return list(cards)
+
+    # ---------- 快照 ----------
+    def state(self):
+        """可 JSON 序列化的状态 [种子, 已发张数]；由旧版快照恢复的牌堆返回剩余牌的十六进制串"""
+        if self.seed is None:
+            return bytes(reversed(self.cards[self.drawn:])).hex()
+        return [self.seed.hex(), self.drawn]
+
+    @classmethod
+    def from_state(cls, state, source: SeedSource = None):
+        if isinstance(state, str):
+            # 旧版快照保存洗好的剩余牌，从末尾依次发出
+            deck = cls(source, seed=b"")
+            deck.cards = bytearray(reversed(bytes.fromhex(state)))
+            deck.seed = None
+            return deck
+        seed, drawn = state
+        deck = cls(source, seed=bytes.fromhex(seed))
+        for _ in range(drawn):
+            deck.draw()
+        return deck
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("用法: python -m holdem.deck <种子> [承诺]")
+        return 2
+    seed = bytes.fromhex(argv[0])
+    if len(argv) > 1:
+        ok = commitment(seed) == argv[1].lower()
+        print("承诺一致" if ok else f"承诺不一致：sha256(种子) = {commitment(seed)}")
+        if not ok:
+            return 1
+    print("发牌顺序：" + cards_str(Deck(seed=seed).order()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
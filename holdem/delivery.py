@@ -0,0 +1,83 @@
+"""
+并发发送私信（发手牌）。
+
+所有玩家的私信同时发出，用信号量限制并发数；每次发送有超时，失败后按指数退避重试。
+返回的 DeliveryReport 记录每位玩家是否送达、尝试次数和耗时。
+FakeClient 与平台客户端的 post_text 接口相同，可以在没有平台连接时模拟延迟和失败。
+"""
+import asyncio
+import time
+from collections import namedtuple
+
+SendResult = namedtuple("SendResult", ["player_id", "ok", "attempts", "latency", "error"])
+
+
+class DeliveryReport:
+    __slots__ = ("results", "elapsed")
+
+    def __init__(self, results: list, elapsed: float):
+        self.results = results      # SendResult 列表，与发送顺序相同
+        self.elapsed = elapsed      # 全部发送完成的总耗时（秒）
+
+    @property
+    def failed(self) -> list:
+        return [r for r in self.results if not r.ok]
+
+    def summary(self) -> str:
+        lines = [f"私信发送 {len(self.results)} 条，失败 {len(self.failed)} 条，总耗时 {self.elapsed * 1000:.0f}ms"]
+        for r in self.results:
+            status = "成功" if r.ok else f"失败（{r.error}）"
+            lines.append(f"  {r.player_id}: {status}，尝试 {r.attempts} 次，耗时 {r.latency * 1000:.0f}ms")
+        return "\n".join(lines)
+
+
+async def _send_one(send, semaphore, player_id: str, content: str, timeout: float, retries: int,
+                    backoff: float) -> SendResult:
+    start = time.perf_counter()
+    error = None
+    for attempt in range(1, retries + 2):
+        async with semaphore:
+            try:
+                await asyncio.wait_for(send(player_id, content), timeout)
+                return SendResult(player_id, True, attempt, time.perf_counter() - start, None)
+            except asyncio.TimeoutError:
+                error = "超时"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        if attempt <= retries:
+            # 退避期间不占用并发名额
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+    return SendResult(player_id, False, retries + 1, time.perf_counter() - start, error)
+
+
+async def deliver(send, messages: list, concurrency: int = 4, timeout: float = 5.0, retries: int = 2,
+                  backoff: float = 0.5) -> DeliveryReport:
+    """
+    并发发送 messages（[(player_id, content), ...]），send 为 ``async send(player_id, content)``。
+    每条最多尝试 retries + 1 次，单次超过 timeout 秒视为失败。
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        _send_one(send, semaphore, player_id, content, timeout, retries, backoff)
+        for player_id, content in messages))
+    return DeliveryReport(list(results), time.perf_counter() - start)
+
+
+class FakeClient:
+    """
+    模拟平台客户端：post_text 等待 delay 秒后记录消息。
+    failures 为 {player_id: 失败次数}，对应玩家的前几次发送会抛出异常。
+    """
+
+    def __init__(self, delay: float = 0.0, failures: dict = None):
+        self.delay = delay
+        self.failures = dict(failures or {})
+        self.sent = []              # [(player_id, content), ...]
+
+    async def post_text(self, to_wxid: str, content: str):
+        await asyncio.sleep(self.delay)
+        if self.failures.get(to_wxid, 0) > 0:
+            self.failures[to_wxid] -= 1
+            raise ConnectionError("模拟发送失败")
+        self.sent.append((to_wxid, content))
@@ -0,0 +1,189 @@
+"""
+蒙特卡洛胜率计算。
+
+给定各玩家的两张整数手牌和已发出的公共牌，随机补齐公共牌并统计每位玩家的
+独赢/平局概率。安装了 numpy 时一次性批量抽样、批量查表；否则退回逐次标量评价。
+样本可以拆成多块交给进程池并行计算。
+
+可穷举的局面（例如单挑的翻牌/转牌、全下后的剩余公共牌）改用精确枚举，
+按部分公共牌缓存中间结果，翻牌的结果由各张转牌的缓存结果平均得到。
+"""
+import functools
+import math
+import random
+from collections import namedtuple
+
+from .evaluator import accumulate_batch, evaluate, lookup_batch, np
+
+# win: 独赢概率；tie: 与他人平分的概率；equity: 期望分得的彩池比例
+Equity = namedtuple("Equity", ["win", "tie", "equity"])
+
+
+def _remaining_cards(hands, board) -> list:
+    dead = set(board)
+    for hand in hands:
+        dead.update(hand)
+    return [c for c in range(52) if c not in dead]
+
+
+def _best_indices(scores) -> list:
+    """返回牌力最大（可能并列）的玩家下标。"""
+    best = max(scores)
+    return [i for i, s in enumerate(scores) if s == best]
+
+
+def _simulate_python(hands, board, samples: int, seed):
+    rng = random.Random(seed)
+    remaining = _remaining_cards(hands, board)
+    need = 5 - len(board)
+    n = len(hands)
+    wins = [0] * n
+    ties = [0] * n
+    shares = [0.0] * n
+    bases = [list(hand) + list(board) for hand in hands]
+    for _ in range(samples):
+        runout = rng.sample(remaining, need)
+        scores = [evaluate(base + runout) for base in bases]
+        top = _best_indices(scores)
+        if len(top) == 1:
+            wins[top[0]] += 1
+            shares[top[0]] += 1.0
+        else:
+            share = 1.0 / len(top)
+            for i in top:
+                ties[i] += 1
+                shares[i] += share
+    return wins, ties, shares, samples
+
+
+def _simulate_numpy(hands, board, samples: int, seed):
+    rng = np.random.default_rng(seed)
+    remaining = np.array(_remaining_cards(hands, board), dtype=np.int64)
+    need = 5 - len(board)
+
+    # 每行从剩余牌中无放回抽取 need 张：对随机键做 argpartition 取最小的 need 个
+    keys = rng.random((samples, remaining.size))
+    drawn = accumulate_batch(remaining[np.argpartition(keys, need - 1, axis=1)[:, :need]])
+
+    scores = np.empty((len(hands), samples), dtype=np.int32)
+    for i, hand in enumerate(hands):
+        fixed = accumulate_batch(np.array([hand + board], dtype=np.int64))
+        scores[i] = lookup_batch(*(d + f for d, f in zip(drawn, fixed)))
+
+    is_best = scores == scores.max(axis=0)
+    n_best = is_best.sum(axis=0)
+    wins = (is_best & (n_best == 1)).sum(axis=1)
+    ties = (is_best & (n_best > 1)).sum(axis=1)
+    shares = (is_best / n_best).sum(axis=1)
+    return wins.tolist(), ties.tolist(), shares.tolist(), samples
+
+
+def simulate_chunk(hands, board, samples: int, seed=None):
+    """
+    计算一块样本，返回 (独赢次数, 平局次数, 彩池份额之和, 样本数)，可直接交给进程池。
+    """
+    hands = [tuple(h) for h in hands]
+    board = tuple(board)
+    if len(board) == 5:
+        # 公共牌已发完，结果是确定的
+        samples = 1
+    if np is not None and len(board) < 5:
+        return _simulate_numpy(hands, board, samples, seed)
+    return _simulate_python(hands, board, samples, seed)
+
+
+def combine_chunks(chunks, n_players: int) -> list:
+    wins = [0] * n_players
+    ties = [0] * n_players
+    shares = [0.0] * n_players
+    total = 0
+    for w, t, s, n in chunks:
+        total += n
+        for i in range(n_players):
+            wins[i] += w[i]
+            ties[i] += t[i]
+            shares[i] += s[i]
+    return [Equity(wins[i] / total, ties[i] / total, shares[i] / total) for i in range(n_players)]
+
+
+def monte_carlo_equity(hands, board=(), samples: int = 20000, executor=None, workers: int = 1, seed=None) -> list:
+    """
+    估算各玩家胜率，返回与 hands 顺序一致的 Equity 列表。
+
+    executor 可传入 concurrent.futures.ProcessPoolExecutor，样本会平均拆成 workers 块并行计算。
+    """
+    if len(hands) < 2:
+        raise ValueError("至少需要两名玩家")
+    if len(board) > 5:
+        raise ValueError("公共牌最多 5 张")
+    master = random.Random(seed)
+    if executor is None or workers <= 1 or len(board) == 5:
+        chunks = [simulate_chunk(hands, board, samples, master.getrandbits(63))]
+    else:
+        size = -(-samples // workers)
+        futures = [executor.submit(simulate_chunk, hands, board, min(size, samples - i * size), master.getrandbits(63))
+                   for i in range(workers) if samples - i * size > 0]
+        chunks = [f.result() for f in futures]
+    return combine_chunks(chunks, len(hands))
+
+
+# -------------------------
+# 精确枚举
+# -------------------------
+def exact_runouts(hands, board) -> int:
+    """补齐公共牌的所有可能数量"""
+    return math.comb(len(_remaining_cards(hands, board)), 5 - len(board))
+
+
+def _tally_river(hands, board):
+    scores = [evaluate(hand + board) for hand in hands]
+    top = _best_indices(scores)
+    n = len(hands)
+    if len(top) == 1:
+        win = [0.0] * n
+        win[top[0]] = 1.0
+        return tuple(win), (0.0,) * n, tuple(win)
+    tie = [0.0] * n
+    share = [0.0] * n
+    for i in top:
+        tie[i] = 1.0
+        share[i] = 1.0 / len(top)
+    return (0.0,) * n, tuple(tie), tuple(share)
+
+
+def _average(results, n: int):
+    count = len(results)
+    return tuple(tuple(sum(r[k][i] for r in results) / count for i in range(n)) for k in range(3))
+
+
+@functools.lru_cache(maxsize=4096)
+def _exact_cached(hands: tuple, board: tuple):
+    """board 为排好序的部分公共牌；返回 (独赢, 平局, 份额) 三组概率"""
+    n = len(hands)
+    if len(board) == 5:
+        return _tally_river(hands, board)
+    remaining = _remaining_cards(hands, board)
+    if len(board) == 4:
+        # 最后一张牌直接枚举，不为每个河牌单独占用缓存
+        return _average([_tally_river(hands, board + (c,)) for c in remaining], n)
+    return _average([_exact_cached(hands, tuple(sorted(board + (c,)))) for c in remaining], n)
+
+
+def exact_equity(hands, board=()) -> list:
+    """穷举所有剩余公共牌，返回精确的 Equity 列表（调用方应先用 exact_runouts 判断规模）"""
+    if len(hands) < 2:
+        raise ValueError("至少需要两名玩家")
+    hands = tuple(tuple(h) for h in hands)
+    win, tie, share = _exact_cached(hands, tuple(sorted(board)))
+    return [Equity(win[i], tie[i], share[i]) for i in range(len(hands))]
+
+
+def estimate_equity(hands, board=(), samples: int = 20000, exact_limit: int = 20000,
+                    executor=None, workers: int = 1):
+    """
+    可穷举（剩余公共牌组合数不超过 exact_limit）时精确计算，否则蒙特卡洛估算。
+    返回 (Equity 列表, 是否精确)。
+    """
+    if exact_runouts(hands, board) <= exact_limit:
+        return exact_equity(hands, board), True
+    return monte_carlo_equity(hands, board, samples, executor=executor, workers=workers), False
@@ -0,0 +1,237 @@
+"""
+查表式 5–7 张牌型评价器。
+
+牌为 0–51 的整数（见 cards.py）。评价只需对手牌遍历一次：
+累加点数的五进制键、花色计数和每种花色的点数位掩码，
+然后查同花表或非同花表，返回一个可直接比较大小的整数。
+
+牌力整数的布局：``category << 20 | r1 << 16 | r2 << 12 | r3 << 8 | r4 << 4 | r5``，
+category 沿用原有定义（8 同花顺 … 0 高牌），r1…r5 为依次比较的点数（2–14）。
+"""
+
+# 牌型类别
+HIGH_CARD = 0
+ONE_PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+
+CATEGORY_NAMES = ["高牌", "一对", "两对", "三条", "顺子", "同花", "葫芦", "四条", "同花顺"]
+
+_WHEEL = 0b1000000001111  # A-2-3-4-5
+
+
+def _pack(category: int, ranks) -> int:
+    """把类别和用于比较的点数序列（2–14）压成一个整数。"""
+    value = 0
+    for r in ranks:
+        value = (value << 4) | r
+    return (category << 20) | (value << (4 * (5 - len(ranks))))
+
+
+def _straight_high(mask: int) -> int:
+    """返回点数位掩码中最大顺子的顶张点数（2–14），没有顺子返回 0。"""
+    for top in range(12, 3, -1):
+        window = 0b11111 << (top - 4)
+        if mask & window == window:
+            return top + 2
+    if mask & _WHEEL == _WHEEL:
+        return 5
+    return 0
+
+
+def _top_bits(mask: int, n: int) -> list:
+    """从高到低取位掩码中的前 n 个点数（2–14）。"""
+    ranks = []
+    for r in range(12, -1, -1):
+        if mask >> r & 1:
+            ranks.append(r + 2)
+            if len(ranks) == n:
+                break
+    return ranks
+
+
+def _score_flush(mask: int) -> int:
+    high = _straight_high(mask)
+    if high:
+        return _pack(STRAIGHT_FLUSH, [high])
+    return _pack(FLUSH, _top_bits(mask, 5))
+
+
+def _score_ranks(counts: list) -> int:
+    """对点数计数（下标 0–12）计算不考虑同花时的最佳 5 张牌力。"""
+    quads, trips, pairs, singles = [], [], [], []
+    mask = 0
+    for r in range(12, -1, -1):
+        c = counts[r]
+        if not c:
+            continue
+        mask |= 1 << r
+        v = r + 2
+        if c == 4:
+            quads.append(v)
+        elif c == 3:
+            trips.append(v)
+        elif c == 2:
+            pairs.append(v)
+        else:
+            singles.append(v)
+    if quads:
+        q = quads[0]
+        kicker = max([v for v in quads[1:] + trips + pairs + singles] or [0])
+        return _pack(FOUR_OF_A_KIND, [q, kicker])
+    if trips and (len(trips) >= 2 or pairs):
+        t = trips[0]
+        p = max(trips[1:] + pairs)
+        return _pack(FULL_HOUSE, [t, p])
+    high = _straight_high(mask)
+    if high:
+        return _pack(STRAIGHT, [high])
+    if trips:
+        kickers = sorted(singles, reverse=True)[:2]
+        return _pack(THREE_OF_A_KIND, [trips[0]] + kickers)
+    if len(pairs) >= 2:
+        rest = sorted(pairs[2:] + singles, reverse=True)
+        return _pack(TWO_PAIR, pairs[:2] + rest[:1])
+    if pairs:
+        return _pack(ONE_PAIR, [pairs[0]] + singles[:3])
+    return _pack(HIGH_CARD, singles[:5])
+
+
+def _build_tables():
+    rank_weight = [5 ** (c >> 2) for c in range(52)]
+    suit_weight = [1 << (3 * (c & 3)) for c in range(52)]
+    rank_bit = [1 << (c >> 2) for c in range(52)]
+
+    # 花色计数每种占 3 位；某花色达到 5 张时记录该花色，否则为 -1
+    flush_suit = [-1] * 4096
+    for h in range(4096):
+        for s in range(4):
+            if (h >> (3 * s)) & 7 >= 5:
+                flush_suit[h] = s
+                break
+
+    flush_table = [0] * 8192
+    for mask in range(8192):
+        if bin(mask).count("1") >= 5:
+            flush_table[mask] = _score_flush(mask)
+
+    # 非同花表：键为各点数计数的五进制编码，覆盖 5–7 张牌的所有点数组合
+    nonflush = {}
+    counts = [0] * 13
+
+    def fill(rank: int, remaining: int, key: int, total: int):
+        if rank == 13:
+            if total >= 5:
+                nonflush[key] = _score_ranks(counts)
+            return
+        for c in range(min(4, remaining) + 1):
+            counts[rank] = c
+            fill(rank + 1, remaining - c, key + c * 5 ** rank, total + c)
+        counts[rank] = 0
+
+    fill(0, 7, 0, 0)
+    return rank_weight, suit_weight, rank_bit, flush_suit, flush_table, nonflush
+
+
+RANK_WEIGHT, SUIT_WEIGHT, RANK_BIT, FLUSH_SUIT, FLUSH_TABLE, NONFLUSH = _build_tables()
+
+
+def evaluate(cards) -> int:
+    """
+    评价 5–7 张整数牌，返回最佳 5 张组合的牌力整数，数值越大越好。
+    """
+    key = 0
+    suit_hash = 0
+    masks = [0, 0, 0, 0]
+    for c in cards:
+        key += RANK_WEIGHT[c]
+        suit_hash += SUIT_WEIGHT[c]
+        masks[c & 3] |= RANK_BIT[c]
+    suit = FLUSH_SUIT[suit_hash]
+    if suit >= 0:
+        # 7 张牌内同花与四条/葫芦不可能共存，有同花时同花（顺）即为最佳
+        return FLUSH_TABLE[masks[suit]]
+    return NONFLUSH[key]
+
+
+def hand_category(score: int) -> int:
+    return score >> 20
+
+
+# 牌型名称表，按 score >> 12（类别和前两个比较点数）预先生成，如 "一对 K"、"两对 K 和 10"、"顺子 10 高"
+_NAME_FORMATS = ["高牌 {0}", "一对 {0}", "两对 {0} 和 {1}", "三条 {0}", "顺子 {0} 高", "同花 {0} 高",
+                 "葫芦 {0} 带 {1}", "四条 {0}", "同花顺 {0} 高"]
+_RANK_NAMES = ["", "", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A", ""]
+HAND_NAMES = [_NAME_FORMATS[category].format(_RANK_NAMES[r1], _RANK_NAMES[r2]) if 2 <= r1 <= 14
+              else CATEGORY_NAMES[category]
+              for category in range(len(CATEGORY_NAMES)) for r1 in range(16) for r2 in range(16)]
+for _r2 in range(16):
+    HAND_NAMES[STRAIGHT_FLUSH << 8 | 14 << 4 | _r2] = "皇家同花顺"
+
+
+def hand_name(score: int) -> str:
+    return HAND_NAMES[score >> 12]
+
+
+# -------------------------
+# NumPy 批量评价（可选依赖）
+# -------------------------
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时只提供标量评价
+    np = None
+
+_np_tables = None
+
+
+def numpy_tables() -> dict:
+    """返回评价用的 NumPy 查找表（首次调用时构建），未安装 numpy 时返回 None。"""
+    global _np_tables
+    if np is None:
+        return None
+    if _np_tables is None:
+        keys = np.array(sorted(NONFLUSH), dtype=np.int64)
+        _np_tables = {
+            "rank_weight": np.array(RANK_WEIGHT, dtype=np.int64),
+            "suit_weight": np.array(SUIT_WEIGHT, dtype=np.int64),
+            # 每张牌在 52 位掩码中的位（花色*13+点数），累加即得到四种花色的点数位掩码
+            "card_bit": np.array([1 << (13 * (c & 3) + (c >> 2)) for c in range(52)], dtype=np.int64),
+            "flush_suit": np.array(FLUSH_SUIT, dtype=np.int8),
+            "flush_table": np.array(FLUSH_TABLE, dtype=np.int32),
+            "nonflush_keys": keys,
+            "nonflush_values": np.array([NONFLUSH[k] for k in keys.tolist()], dtype=np.int32),
+        }
+    return _np_tables
+
+
+def accumulate_batch(cards):
+    """
+    把形状为 (N, k) 的整数牌逐行累加成 (点数键, 花色计数, 52 位花色点数掩码) 三个 (N,) 数组。
+    三个量都可以逐张牌相加，调用方可以把固定的牌预先累加，只对发出的牌做向量化求和。
+    """
+    t = numpy_tables()
+    return (t["rank_weight"][cards].sum(axis=1),
+            t["suit_weight"][cards].sum(axis=1),
+            t["card_bit"][cards].sum(axis=1))
+
+
+def lookup_batch(key, suit_hash, card_mask):
+    """由累加好的三个量批量查表，返回 (N,) 的牌力数组。"""
+    t = numpy_tables()
+    suit = t["flush_suit"][suit_hash]
+    scores = t["nonflush_values"][np.searchsorted(t["nonflush_keys"], key)]
+    flush_rows = np.nonzero(suit >= 0)[0]
+    if flush_rows.size:
+        masks = (card_mask[flush_rows] >> (13 * suit[flush_rows].astype(np.int64))) & 0x1FFF
+        scores[flush_rows] = t["flush_table"][masks]
+    return scores
+
+
+def evaluate_batch(cards):
+    """批量评价形状为 (N, 5–7) 的整数牌数组，返回 (N,) 的牌力数组。"""
+    return lookup_batch(*accumulate_batch(np.asarray(cards, dtype=np.int64)))
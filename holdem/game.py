@@ -0,0 +1,456 @@
+"""
+牌局状态：玩家与 PokerGame。
+
+牌一律以 0–51 的整数保存（见 cards.py），只在渲染消息时转换成字符串。
+
+PokerGame 维护几份增量索引，指令处理时不再扫描整个座位表：
+    用户 ID -> 座位号       find_player 为 O(1)
+    活跃座位的双向环        advance_turn / 弃牌为 O(1)
+    活跃人数
+    待跟注集合              本轮下注是否结束为 O(1)，已全下的玩家不在其中
+筹码变动、弃牌、换轮都要经过 PokerGame 的方法，索引才能保持一致。
+
+PokerGame 同时是不依赖 AstrBot 的规则引擎：
+    start_hand(stacks)              发手牌并收盲注，进入翻牌前
+    act(player_id, action, stacks)  call / raise / allin / check / fold
+    advance_street()                本轮下注结束后发下一条街
+    settle(stacks)                  只剩一人或河牌后结算
+    next_hand(stacks)               换庄并开始下一局
+stacks 是 {player_id: 余额} 的可变映射（插件中即本群的余额表），筹码在这里扣除和发放。
+违反规则的操作抛出 GameError，其消息可以直接回复给玩家。指令处理器和模拟器都调用这组方法。
+"""
+from collections import namedtuple
+
+from .deck import Deck
+from .evaluator import evaluate
+from .settlement import Pot, award_pots, build_pots
+
+Settlement = namedtuple("Settlement", ["pots", "payouts", "pot_winners", "scores"])
+Blinds = namedtuple("Blinds", ["small_player", "small", "big_player", "big"])
+FINISHED = "本局已结束，请使用 `/poker continue` 开始下一局。"
+
+
+class GameError(Exception):
+    """违反规则的操作"""
+
+
+class Player:
+    __slots__ = ("id", "name", "cards", "private_unified", "round_bet", "active", "contributed",
+                 "all_in", "bot_level", "voluntary", "folded_on")
+
+    def __init__(self, id: str, name: str, private_unified: str = "", bot_level: int = 0):
+        self.id = id                        # 平台用户 ID
+        self.name = name                    # 昵称
+        self.cards = []                     # 两张整数手牌
+        self.private_unified = private_unified  # 私信 session 字符串
+        self.round_bet = 0                  # 本轮已投注
+        self.active = True                  # 是否未弃牌
+        self.contributed = 0                # 本局投入彩池的总额（含买入），结算边池和统计净赢筹码都用它
+        self.all_in = False                 # 是否已全下（不再需要跟注）
+        self.bot_level = bot_level          # 机器人等级，0 表示真人玩家
+        self.voluntary = False              # 本局翻牌前是否主动入池（跟注、加注或全下，不含盲注）
+        self.folded_on = ""                 # 弃牌时所在的阶段，未弃牌为空
+
+
+class PokerGame:
+    __slots__ = ("buyin", "small_blind", "big_blind", "bet_amount", "max_players", "players",
+                 "deck", "community_cards", "phase", "pot", "_current_bet", "current_turn_index",
+                 "finished", "_seats", "_next", "_prev", "_any_active", "active_count", "to_call",
+                 "blinds", "hand_id")
+
+    def __init__(self, buyin: int, small_blind: int, big_blind: int, bet_amount: int, max_players: int,
+                 seeds=None):
+        self.buyin = buyin                  # 加入游戏时支付的买入金额
+        self.small_blind = small_blind      # 小盲注金额
+        self.big_blind = big_blind          # 大盲注金额
+        self.bet_amount = bet_amount        # 后续每轮固定跟注金额
+        self.max_players = max_players      # 最大玩家数
+        self.players = []                   # Player 列表，按座位顺序
+        self.deck = Deck(seeds)             # 牌堆，每局一个种子（seeds 为 SeedSource，默认系统随机源）
+        self.community_cards = []           # 公共牌（整数）
+        self.phase = "waiting"              # 游戏阶段：waiting, preflop, flop, turn, river, showdown
+        self.pot = 0                        # 当前彩池
+        self._current_bet = 0               # 当前轮要求的投注额度
+        self.current_turn_index = 0         # 当前行动玩家索引
+        self.finished = False               # 本局是否已摊牌结束
+        self._seats = {}                    # 用户 ID -> 座位号
+        self._next = []                     # 座位号 -> 下一个活跃座位（已弃牌的座位保留弃牌时的指向）
+        self._prev = []                     # 座位号 -> 上一个活跃座位
+        self._any_active = -1               # 环上任意一个活跃座位，没有时为 -1
+        self.active_count = 0               # 未弃牌的玩家数
+        self.to_call = set()                # 本轮还没跟满 current_bet 的活跃玩家 ID
+        self.blinds = None                  # 本局已收的盲注（Blinds），未收时为 None
+        self.hand_id = 0                    # 操作日志中的牌局编号（见 actionlog.py）
+
+    def deal_card(self) -> int:
+        try:
+            return self.deck.draw()
+        except IndexError:
+            raise GameError("牌堆已经发完。") from None
+
+    # ---------- 座位 ----------
+    def _rebuild(self):
+        """按当前座位表重建全部索引，O(n)，只在加入玩家、换庄、新一局时调用"""
+        self._seats = {p.id: i for i, p in enumerate(self.players)}
+        active = [i for i, p in enumerate(self.players) if p.active]
+        n = len(self.players)
+        self._next = list(range(n))
+        self._prev = list(range(n))
+        for k, seat in enumerate(active):
+            self._next[seat] = active[(k + 1) % len(active)]
+            self._prev[seat] = active[k - 1]
+        self._any_active = active[0] if active else -1
+        self.active_count = len(active)
+        self.to_call = {self.players[i].id for i in active
+                        if self.players[i].round_bet < self._current_bet and not self.players[i].all_in}
+
+    def add_player(self, player: Player):
+        self.players.append(player)
+        self._rebuild()
+
+    def remove_player(self, player_id: str) -> Player:
+        """两局之间让玩家离座（锦标赛淘汰、换桌），返回离座的 Player"""
+        if not (self.finished or (self.phase == "waiting" and self.blinds is None)):
+            raise GameError("本局进行中，不能离座。")
+        player = self.players.pop(self._seats[player_id])
+        self._rebuild()
+        return player
+
+    def rotate(self):
+        """庄位顺时针移动一位（座位表左移一位）"""
+        self.players = self.players[1:] + self.players[:1]
+        self._rebuild()
+
+    def find_player(self, player_id: str):
+        seat = self._seats.get(player_id)
+        return self.players[seat] if seat is not None else None
+
+    def seat_of(self, player_id: str) -> int:
+        return self._seats[player_id]
+
+    @property
+    def current_player(self):
+        return self.players[self.current_turn_index] if self.players else None
+
+    def active_players(self) -> list:
+        """按座位顺序沿活跃环返回未弃牌的玩家"""
+        if self._any_active < 0:
+            return []
+        seats = []
+        seat = self._any_active
+        for _ in range(self.active_count):
+            seats.append(seat)
+            seat = self._next[seat]
+        # 环的起点不一定是座位号最小的活跃座位，从最小处切开
+        k = seats.index(min(seats))
+        return [self.players[s] for s in seats[k:] + seats[:k]]
+
+    def _next_active(self, seat: int) -> int:
+        """seat 之后（不含 seat）的第一个活跃座位；seat 已弃牌时沿弃牌时的指向找到活跃座位"""
+        seat = self._next[seat]
+        while not self.players[seat].active:
+            seat = self._next[seat]
+        return seat
+
+    def advance_turn(self):
+        """轮转到下一个还能行动的活跃玩家（已全下的跳过；都已全下时停在下一个活跃玩家）"""
+        if self.active_count == 0:
+            return
+        seat = self._next_active(self.current_turn_index)
+        for _ in range(self.active_count - 1):
+            if not self.players[seat].all_in:
+                break
+            seat = self._next[seat]
+        self.current_turn_index = seat
+
+    # ---------- 下注 ----------
+    @property
+    def current_bet(self) -> int:
+        return self._current_bet
+
+    @current_bet.setter
+    def current_bet(self, amount: int):
+        """调整当前注额后重算待跟注集合（只在加注和换轮时发生）"""
+        self._current_bet = amount
+        self.to_call = {p.id for p in self.active_players() if p.round_bet < amount and not p.all_in}
+
+    def bet(self, player: Player, amount: int, all_in: bool = False):
+        """玩家向彩池投入 amount（同时记入本局投入额）；超过当前注额时视为加注"""
+        player.round_bet += amount
+        player.contributed += amount
+        self.pot += amount
+        if all_in:
+            player.all_in = True
+        if player.round_bet > self._current_bet:
+            self.current_bet = player.round_bet
+        elif player.round_bet == self._current_bet or all_in:
+            self.to_call.discard(player.id)
+
+    def fold(self, player: Player):
+        """弃牌，把座位从活跃环中摘除"""
+        if not player.active:
+            return
+        player.active = False
+        player.folded_on = self.phase
+        seat = self._seats[player.id]
+        self.active_count -= 1
+        self.to_call.discard(player.id)
+        if self.active_count == 0:
+            self._any_active = -1
+            return
+        nxt, prv = self._next[seat], self._prev[seat]
+        self._next[prv] = nxt
+        self._prev[nxt] = prv
+        if self._any_active == seat:
+            self._any_active = nxt
+
+    def betting_complete(self) -> bool:
+        return not self.to_call
+
+    def not_called(self) -> list:
+        """还没跟满当前注额的玩家，按座位顺序"""
+        return sorted((self.find_player(pid) for pid in self.to_call), key=lambda p: self._seats[p.id])
+
+    def new_street(self, bet: int):
+        """进入下一条街：清空本轮投注，设置新的注额"""
+        for p in self.active_players():
+            p.round_bet = 0
+        self.current_bet = bet
+        # 至多一人还有筹码时没有对手可以下注，这条街直接结束
+        if sum(1 for p in self.active_players() if not p.all_in) <= 1:
+            self.to_call.clear()
+        elif self.current_player.all_in or not self.current_player.active:
+            self.advance_turn()
+
+    def new_hand(self):
+        """开始新的一局：换种子重置牌堆，重置彩池和每位玩家的本局状态"""
+        self.deck.shuffle()
+        self.community_cards = []
+        self.phase = "waiting"
+        self.pot = 0
+        self._current_bet = 0
+        self.blinds = None
+        for p in self.players:
+            p.cards = []
+            p.round_bet = 0
+            p.contributed = 0
+            p.active = True
+            p.all_in = False
+            p.voluntary = False
+            p.folded_on = ""
+        self._rebuild()
+
+    # ---------- 快照 ----------
+    def to_dict(self) -> dict:
+        """可 JSON 序列化的完整牌局状态（牌为整数，牌堆为 [种子, 已发张数]），索引不保存"""
+        blinds = self.blinds
+        return {
+            "config": [self.buyin, self.small_blind, self.big_blind, self.bet_amount, self.max_players],
+            "players": [[p.id, p.name, p.cards, p.private_unified, p.round_bet, p.active,
+                         p.contributed, p.all_in, p.bot_level, p.voluntary, p.folded_on] for p in self.players],
+            "deck": self.deck.state(),
+            "community_cards": self.community_cards,
+            "phase": self.phase,
+            "pot": self.pot,
+            "current_bet": self._current_bet,
+            "current_turn_index": self.current_turn_index,
+            "finished": self.finished,
+            "hand_id": self.hand_id,
+            "blinds": [blinds.small_player.id, blinds.small,
+                       blinds.big_player.id if blinds.big_player else None, blinds.big] if blinds else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        game = cls(*data["config"])
+        for row in data["players"]:
+            pid, name, cards, private_unified, round_bet, active, contributed, all_in, bot_level = row[:9]
+            player = Player(pid, name, private_unified, bot_level)
+            if len(row) > 9:
+                # 旧版快照没有这两项
+                player.voluntary, player.folded_on = row[9:11]
+            player.cards = cards
+            player.round_bet = round_bet
+            player.active = active
+            player.contributed = contributed
+            player.all_in = all_in
+            game.players.append(player)
+        game.deck = Deck.from_state(data["deck"])
+        game.community_cards = data["community_cards"]
+        game.phase = data["phase"]
+        game.pot = data["pot"]
+        game._current_bet = data["current_bet"]
+        game.current_turn_index = data["current_turn_index"]
+        game.finished = data["finished"]
+        game.hand_id = data.get("hand_id", 0)
+        game._rebuild()
+        if data["blinds"]:
+            small_id, small, big_id, big = data["blinds"]
+            game.blinds = Blinds(game.find_player(small_id), small,
+                                 game.find_player(big_id) if big_id else None, big)
+        return game
+
+    # ---------- 规则引擎 ----------
+    def _first_to_act(self):
+        # 3 人及以上从大盲（索引1）之后开始（即索引2）；否则从第 0 位开始
+        self.current_turn_index = 2 if len(self.players) >= 3 else 0
+
+    def _check_blinds(self, stacks, small_player: Player, big_player):
+        if stacks.get(small_player.id, 0) < self.small_blind:
+            raise GameError(f"新小盲 {small_player.name} 余额不足。")
+        if big_player and stacks.get(big_player.id, 0) < self.big_blind:
+            raise GameError(f"新大盲 {big_player.name} 余额不足。")
+
+    def post_blinds(self, stacks, strict: bool = False) -> Blinds:
+        """
+        座位 0 付小盲、座位 1 付大盲。strict 为 False 时余额不足就付到全部余额为止，
+        为 True 时余额不足抛出 GameError 且不扣任何筹码。
+        """
+        small_player = self.players[0]
+        big_player = self.players[1] if len(self.players) >= 2 else None
+        if strict:
+            self._check_blinds(stacks, small_player, big_player)
+        sb = min(stacks.get(small_player.id, 0), self.small_blind)
+        stacks[small_player.id] = stacks.get(small_player.id, 0) - sb
+        self.bet(small_player, sb, all_in=stacks[small_player.id] == 0)
+        bb = 0
+        if big_player:
+            bb = min(stacks.get(big_player.id, 0), self.big_blind)
+            stacks[big_player.id] = stacks.get(big_player.id, 0) - bb
+            self.bet(big_player, bb, all_in=stacks[big_player.id] == 0)
+        self.blinds = Blinds(small_player, sb, big_player, bb)
+        return self.blinds
+
+    def start_hand(self, stacks) -> Blinds:
+        """给每位玩家发两张手牌，收盲注（本局已收过则不再收），进入翻牌前"""
+        if len(self.players) < 2:
+            raise GameError("至少需要2名玩家才能开始游戏。")
+        if self.phase != "waiting":
+            raise GameError("游戏已经开始发牌了。")
+        self._first_to_act()
+        for p in self.players:
+            p.cards = [self.deal_card(), self.deal_card()]
+        blinds = self.blinds or self.post_blinds(stacks)
+        self.current_bet = self.big_blind
+        self.phase = "preflop"
+        return blinds
+
+    def _acting_player(self, player_id: str) -> Player:
+        if self.current_player is None or self.current_player.id != player_id:
+            raise GameError("请等待轮到你操作。")
+        player = self.find_player(player_id)
+        if not player or not player.active:
+            raise GameError("你不在当前游戏中或已弃牌。")
+        return player
+
+    def act(self, player_id: str, action: str, stacks, amount: int = 0) -> int:
+        """
+        执行一次行动，返回本次投入彩池的筹码。action 为 call / raise / allin / check / fold，
+        raise 时 amount 为在跟注之外额外加注的数量。弃牌不要求轮到该玩家。
+        """
+        if self.finished:
+            raise GameError(FINISHED)
+        if action == "fold":
+            player = self.find_player(player_id)
+            if not player or not player.active:
+                raise GameError("你不在当前游戏中或已弃牌。")
+            self.fold(player)
+            if self.current_player is player:
+                # 轮到的玩家弃牌，行动权交给下一位
+                self.advance_turn()
+            return 0
+        player = self._acting_player(player_id)
+        balance = stacks.get(player_id, 0)
+        if action == "call":
+            if player.round_bet >= self._current_bet:
+                raise GameError("你已经跟注了。")
+            paid = self._current_bet - player.round_bet
+            if balance < paid:
+                raise GameError(f"余额不足，需跟注 {paid} 代币。你当前余额: {balance}")
+            stacks[player_id] = balance - paid
+            # 正好用完余额也算全下，之后的街不再等它跟注
+            self.bet(player, paid, all_in=balance == paid)
+        elif action == "raise":
+            paid = self._current_bet - player.round_bet + amount
+            if balance < paid:
+                raise GameError(f"余额不足，需支付 {paid} 代币（含跟注差额和加注）。你当前余额: {balance}")
+            stacks[player_id] = balance - paid
+            self.bet(player, paid, all_in=balance == paid)
+        elif action == "allin":
+            if balance == 0:
+                raise GameError("你已经没有剩余代币，全压失败。")
+            paid = balance
+            stacks[player_id] = 0
+            self.bet(player, paid, all_in=True)
+        elif action == "check":
+            if player.round_bet < self._current_bet:
+                raise GameError("你当前还未跟满注，无法看牌。")
+            paid = 0
+        else:
+            raise GameError(f"未知的行动: {action}")
+        if paid and self.phase == "preflop":
+            player.voluntary = True
+        self.advance_turn()
+        return paid
+
+    def advance_street(self):
+        """
+        本轮下注结束后发下一条街，返回新发的公共牌；河牌阶段返回 None，表示应当摊牌。
+        """
+        if not self.betting_complete():
+            raise GameError("以下玩家还未跟注: " + ", ".join(p.name for p in self.not_called()))
+        if self.phase == "river":
+            return None
+        count = {"preflop": 3, "flop": 1, "turn": 1}.get(self.phase)
+        if count is None:
+            raise GameError("游戏阶段错误。")
+        self.deal_card()  # 烧牌
+        cards = [self.deal_card() for _ in range(count)]
+        self.community_cards.extend(cards)
+        self.phase = {"preflop": "flop", "flop": "turn", "turn": "river"}[self.phase]
+        self.new_street(self.bet_amount)
+        return cards
+
+    def settle(self, stacks) -> Settlement:
+        """
+        结算本局并把筹码发到 stacks。只剩一人未弃牌时整个彩池归该玩家，无需比牌；
+        否则必须在河牌阶段，按边池规则比牌分配（见 settlement.py）。已结算的一局不能再结算。
+        """
+        if self.finished:
+            raise GameError(FINISHED)
+        if self.active_count == 1:
+            winner = self.active_players()[0]
+            pots = [Pot(self.pot, (winner.id,))]
+            payouts, pot_winners, scores = {winner.id: self.pot}, [(winner.id,)], {}
+        else:
+            if self.phase != "river":
+                raise GameError("还未到摊牌阶段。")
+            live = self.active_players()
+            if len(self.community_cards) != 5 or any(len(p.cards) != 2 for p in live):
+                raise GameError("牌数不足，无法摊牌。")
+            # 每位玩家的牌力只计算一次，所有池共用
+            scores = {p.id: evaluate(p.cards + self.community_cards) for p in live}
+            pots = build_pots([(p.id, p.contributed) for p in self.players], set(scores))
+            payouts, pot_winners = award_pots(pots, scores)
+        for pid, amount in payouts.items():
+            stacks[pid] = stacks.get(pid, 0) + amount
+        self.finished = True
+        return Settlement(pots, payouts, pot_winners, scores)
+
+    def next_hand(self, stacks, strict: bool = True) -> Blinds:
+        """
+        本局结束后重置牌局、庄位顺时针移动一位，并收新一局的盲注。
+        strict 为 True 时余额不足抛出 GameError 且牌局保持不变（仍是已结束的上一局，补足余额后可以重试），
+        为 False 时付到全部余额为止（锦标赛）。
+        """
+        if not self.finished:
+            raise GameError("当前局还未结束，请先摊牌后再决定是否继续。")
+        if strict and self.players:
+            # 按换庄后的座位先检查盲注，再修改任何状态
+            seats = self.players[1:] + self.players[:1]
+            self._check_blinds(stacks, seats[0], seats[1] if len(seats) >= 2 else None)
+        self.new_hand()
+        self.rotate()
+        self._first_to_act()
+        self.finished = False
+        return self.post_blinds(stacks, strict)
@@ -0,0 +1,206 @@
+"""
+常驻内存的牌局缓存：空闲淘汰到磁盘，下次访问时透明恢复。
+
+GameCache 用起来和 {group_id: PokerGame} 字典一样。内部按最近访问顺序保存常驻的牌局，
+每次访问后顺带检查：常驻数超过 max_resident 时淘汰最久未访问的牌局，
+空闲超过 ttl 秒的牌局也会被淘汰。淘汰时把 PokerGame.to_dict() 压成一行 JSON，
+交给后台写入线程写到 directory/<群号>.json；之后该群的任何指令访问到它时从快照恢复并删除快照。
+
+正在执行指令的牌桌（busy(group_id) 为真）不会被淘汰，避免处理器持有的对象与快照不一致。
+"""
+import functools
+import json
+import os
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from urllib.parse import quote, unquote
+
+from .game import PokerGame
+from .persistence import atomic_write
+
+SUFFIX = ".json"
+
+
+def encode_game(game: PokerGame) -> bytes:
+    return json.dumps(game.to_dict(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_game(data: bytes) -> PokerGame:
+    return PokerGame.from_dict(json.loads(data))
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class GameCache(MutableMapping):
+    def __init__(self, directory: str, persistence, ttl: float = 1800, max_resident: int = 1000,
+                 busy=None, clock=time.monotonic):
+        self.directory = directory
+        self.persistence = persistence      # PersistenceWorker，快照的写入和删除都交给它
+        self.ttl = ttl                      # 空闲多少秒后淘汰，0 表示不按时间淘汰
+        self.max_resident = max_resident    # 最多常驻的牌局数，0 表示不限
+        self.busy = busy or (lambda group_id: False)
+        self.clock = clock
+        self._games = OrderedDict()         # group_id -> PokerGame，最久未访问的在前
+        self._touched = {}                  # group_id -> 最近访问时刻
+        self._pending = {}                  # group_id -> 待写入的快照（None 表示待删除）
+        self.evictions = 0
+        self.rehydrations = 0
+        self.on_evict = None                # 可选回调 (group_id, game)，淘汰和恢复时调用
+        self.on_rehydrate = None
+        os.makedirs(directory, exist_ok=True)
+        # 已淘汰到磁盘的群
+        self._spilled = {unquote(name[:-len(SUFFIX)]) for name in os.listdir(directory) if name.endswith(SUFFIX)}
+
+    def _path(self, group_id: str) -> str:
+        return os.path.join(self.directory, quote(group_id, safe="") + SUFFIX)
+
+    @property
+    def resident(self) -> int:
+        return len(self._games)
+
+    @property
+    def spilled(self) -> int:
+        return len(self._spilled)
+
+    def resident_items(self) -> list:
+        return list(self._games.items())
+
+    def spilled_ids(self) -> list:
+        return list(self._spilled)
+
+    def peek(self, group_id: str):
+        """只读地解码已淘汰牌局的快照，不恢复为常驻、不删除快照；没有或无法解码时返回 None。可以在线程中调用"""
+        data = self._pending.get(group_id)
+        if data is None:
+            try:
+                with open(self._path(group_id), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+        try:
+            return decode_game(data)
+        except Exception as e:
+            print("读取牌局快照失败:", e)
+            return None
+
+    # ---------- 字典接口 ----------
+    def __getitem__(self, group_id: str) -> PokerGame:
+        game = self._games.get(group_id)
+        if game is None:
+            if group_id not in self._spilled:
+                raise KeyError(group_id)
+            game = self._rehydrate(group_id)
+            if game is None:
+                raise KeyError(group_id)
+            self._games[group_id] = game
+            if self.on_rehydrate is not None:
+                self.on_rehydrate(group_id, game)
+        else:
+            self._games.move_to_end(group_id)
+        self._touched[group_id] = self.clock()
+        self.sweep(keep=group_id)
+        return game
+
+    def __setitem__(self, group_id: str, game: PokerGame):
+        if group_id in self._spilled:
+            # 新牌局覆盖磁盘上的旧快照
+            self._spilled.discard(group_id)
+            self._schedule(group_id, None)
+        self._games[group_id] = game
+        self._games.move_to_end(group_id)
+        self._touched[group_id] = self.clock()
+        self.sweep(keep=group_id)
+
+    def __delitem__(self, group_id: str):
+        if group_id in self._games:
+            del self._games[group_id]
+            del self._touched[group_id]
+        elif group_id in self._spilled:
+            self._spilled.discard(group_id)
+            self._schedule(group_id, None)
+        else:
+            raise KeyError(group_id)
+
+    def __contains__(self, group_id) -> bool:
+        # 判断存在时就恢复：处理器总是先判断再取用
+        try:
+            self[group_id]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        yield from list(self._games)
+        yield from list(self._spilled)
+
+    def __len__(self) -> int:
+        return len(self._games) + len(self._spilled)
+
+    # ---------- 淘汰与恢复 ----------
+    def sweep(self, keep: str = None):
+        """淘汰超出数量上限和空闲超时的牌局，keep 为刚访问的群，不会被淘汰"""
+        over = len(self._games) - self.max_resident if self.max_resident else 0
+        cutoff = self.clock() - self.ttl if self.ttl else None
+        for group_id in list(self._games):
+            idle = cutoff is not None and self._touched[group_id] < cutoff
+            if over <= 0 and not idle:
+                # 其后的牌局访问得更晚
+                break
+            if group_id == keep or self.busy(group_id):
+                continue
+            self.evict(group_id)
+            over -= 1
+
+    def evict(self, group_id: str):
+        game = self._games.pop(group_id)
+        del self._touched[group_id]
+        self._spilled.add(group_id)
+        self._schedule(group_id, encode_game(game))
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(group_id, game)
+
+    def evict_all(self):
+        """把所有常驻牌局写成快照（插件卸载时调用）"""
+        for group_id in list(self._games):
+            self.evict(group_id)
+
+    def _rehydrate(self, group_id: str):
+        self._spilled.discard(group_id)
+        if group_id in self._pending:
+            data = self._pending[group_id]
+        else:
+            try:
+                with open(self._path(group_id), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = None
+        # 恢复后快照即作废，避免重启后读到过期状态
+        self._schedule(group_id, None)
+        if data is None:
+            return None
+        try:
+            game = decode_game(data)
+        except Exception as e:
+            print("恢复牌局失败:", e)
+            return None
+        self.rehydrations += 1
+        return game
+
+    def _schedule(self, group_id: str, data):
+        self._pending[group_id] = data
+        self.persistence.mark_dirty("game:" + group_id, functools.partial(self._prepare, group_id))
+
+    def _prepare(self, group_id: str):
+        if group_id not in self._pending:
+            return None
+        data = self._pending.pop(group_id)
+        if data is None:
+            return functools.partial(_remove, self._path(group_id))
+        return functools.partial(atomic_write, self._path(group_id), data)
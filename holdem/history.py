@@ -0,0 +1,146 @@
+"""
+追加式牌局记录（JSONL）。
+
+每局一行 JSON 追加到 game_records.jsonl，不再把全部记录读进内存。
+旁边的 game_records.idx 是定长二进制索引，每局一条
+``(群 ID 哈希, 行偏移, 行长度)``；启动时只读索引，按群整理成偏移数组，
+分页查询时直接 seek 到对应行读取。
+"""
+import hashlib
+import json
+import os
+import struct
+from array import array
+
+INDEX_ENTRY = struct.Struct("<QQI")
+
+
+def iter_jsonl(path: str):
+    """流式读取 JSONL 文件中的全部记录，忽略没写完的最后一行"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield json.loads(line)
+
+
+def group_key(group_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(group_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HandHistory:
+    def __init__(self, path: str, index_path: str):
+        self.path = path
+        self.index_path = index_path
+        self._offsets = {}      # 群 ID 哈希 -> array('Q') 行偏移，按追加顺序
+        self._count = 0
+        self._load_index()
+        self._data = open(self.path, "ab")
+        self._index = open(self.index_path, "ab")
+
+    def _add(self, key: int, offset: int):
+        offsets = self._offsets.get(key)
+        if offsets is None:
+            offsets = self._offsets[key] = array("Q")
+        offsets.append(offset)
+        self._count += 1
+
+    def _load_index(self):
+        end = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            for key, offset, length in INDEX_ENTRY.iter_unpack(data[:usable]):
+                self._add(key, offset)
+                end = offset + length
+            if usable != len(data):
+                with open(self.index_path, "r+b") as f:
+                    f.truncate(usable)
+        # 数据文件比索引长（写完数据行、还没写索引时中断），补齐索引
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size > end:
+            self._reindex_from(end)
+
+    def _reindex_from(self, start: int):
+        entries = []
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # 最后一行没写完，丢弃
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                key = group_key(record.get("group_id", ""))
+                self._add(key, offset)
+                entries.append(INDEX_ENTRY.pack(key, offset, len(line)))
+                offset += len(line)
+        with open(self.path, "r+b") as f:
+            f.truncate(offset)
+        with open(self.index_path, "ab") as f:
+            f.write(b"".join(entries))
+
+    def append(self, record: dict) -> int:
+        """追加一局记录，返回其序号（从 1 开始）"""
+        record = dict(record, hand_no=self._count + 1)
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        offset = self._data.tell()
+        self._data.write(line)
+        self._data.flush()
+        key = group_key(record["group_id"])
+        self._index.write(INDEX_ENTRY.pack(key, offset, len(line)))
+        self._index.flush()
+        self._add(key, offset)
+        return record["hand_no"]
+
+    def count(self, group_id: str) -> int:
+        offsets = self._offsets.get(group_key(group_id))
+        return len(offsets) if offsets is not None else 0
+
+    def recent(self, group_id: str, limit: int, offset: int = 0) -> list:
+        """按时间倒序返回本群第 offset 条起的 limit 条记录"""
+        offsets = self._offsets.get(group_key(group_id))
+        if not offsets:
+            return []
+        stop = len(offsets) - offset
+        start = max(stop - limit, 0)
+        records = []
+        with open(self.path, "rb") as f:
+            for pos in reversed(offsets[start:max(stop, 0)]):
+                f.seek(pos)
+                record = json.loads(f.readline())
+                # 哈希冲突时跳过其他群的记录
+                if record.get("group_id") == group_id:
+                    records.append(record)
+        return records
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def size(self) -> int:
+        """数据文件当前的字节数"""
+        return self._data.tell()
+
+    def iter_records(self):
+        """流式遍历全部记录"""
+        self._data.flush()
+        return iter_jsonl(self.path)
+
+    def import_legacy(self, legacy_file: str) -> int:
+        """把旧的 game_records.json（整体数组）逐条追加进来，返回导入条数"""
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        for record in records:
+            self.append(record)
+        return len(records)
+
+    def close(self):
+        self._data.close()
+        self._index.close()
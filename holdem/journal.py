@@ -0,0 +1,219 @@
+"""
+代币余额的追加式日志。
+
+每次余额变动只向日志追加一行 ``{"g": 群, "u": 用户, "b": 新余额}``，
+记录的是变动后的绝对余额，重放是幂等的。日志累积到一定行数后压缩为快照
+（原 tokens.json，临时文件 + 重命名写入）并清空日志；启动时读取快照再重放日志尾部。
+
+fsync 策略：
+    "hand"     只在一局结算时 fsync
+    "ops"      每累计 fsync_ops 次变动 fsync 一次
+    "interval" 距上次 fsync 超过 fsync_interval 秒时 fsync
+每次 commit 都会把缓冲写入操作系统，进程崩溃不会丢记录；策略只影响掉电时可能丢失的窗口。
+写入失败（如磁盘已满）时截掉写了一半的内容，这批记录留到下次提交时重写，需要压缩的下次再压缩。
+
+record 只把记录放进内存缓冲；prepare_commit 在调用线程中取出缓冲（需要压缩时同时复制一份余额），
+返回的函数可以交给后台写入线程执行，快照的 JSON 编码也在其中完成，见 persistence.py。
+"""
+import json
+import os
+import threading
+import time
+
+from .persistence import atomic_write
+
+FSYNC_POLICIES = ("hand", "ops", "interval")
+
+
+class TokenJournal:
+    def __init__(self, snapshot_file: str, journal_file: str, fsync_policy: str = "ops",
+                 fsync_ops: int = 100, fsync_interval: float = 1.0, compact_threshold: int = 10000):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"未知的 fsync 策略: {fsync_policy}")
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.fsync_policy = fsync_policy
+        self.fsync_ops = fsync_ops
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self.balances = {}          # 与 BalanceBook 共享的余额数据，压缩时写入快照
+        self._file = None
+        self._pending = []          # 尚未写入文件的日志行
+        self._retry = []            # 上次写入失败的日志行，下次提交时排在新记录之前
+        self._retry_snapshot = False    # 上次压缩失败，下次提交时重新压缩
+        self._end = 0               # 日志中已完整写入的字节数，写入失败时截回这里
+        self._lock = threading.Lock()
+        self._records = 0           # 日志中的记录数
+        self._valid_end = None      # 日志中最后一条完整记录的结束偏移，attach 时截掉之后的残行
+        self._unsynced = 0          # 上次 fsync 之后的记录数
+        self._last_sync = time.monotonic()
+
+    def load(self) -> dict:
+        """读取快照并重放日志，返回 {group_id: {user_id: balance}}"""
+        balances = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                balances = json.load(f)
+        records = 0
+        end = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # 崩溃时最后一行可能只写了一半
+                        break
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break
+                    balances.setdefault(rec["g"], {})[rec["u"]] = rec["b"]
+                    records += 1
+                    end += len(line)
+        self._records = records
+        self._valid_end = end
+        return balances
+
+    def attach(self, balances: dict):
+        self.balances = balances
+        if self._valid_end is not None and os.path.exists(self.journal_file) \
+                and os.path.getsize(self.journal_file) > self._valid_end:
+            # 截掉没写完的残行，否则新记录会接在残行后面，下次启动重放到这里就停止
+            with open(self.journal_file, "r+b") as f:
+                f.truncate(self._valid_end)
+        self._file = open(self.journal_file, "ab")
+        self._end = self._file.tell()
+
+    def record(self, group_id: str, user_id: str, balance: int):
+        self._pending.append(json.dumps({"g": group_id, "u": user_id, "b": balance}, ensure_ascii=False) + "\n")
+        self._records += 1
+        self._unsynced += 1
+
+    def prepare_commit(self, hand_end: bool = False):
+        """
+        取出待写入的日志行，按策略决定是否 fsync、是否压缩，返回执行写入的函数；
+        没有新记录时返回 None。快照的余额在这里复制，之后对余额的修改不会影响本次写入。
+        """
+        with self._lock:
+            retry, self._retry = self._retry, []
+            compact, self._retry_snapshot = self._retry_snapshot, False
+        if self._file is None or not (self._pending or retry or compact):
+            return None
+        lines, self._pending = retry + self._pending, []
+        now = time.monotonic()
+        sync = (self.fsync_policy == "ops" and self._unsynced >= self.fsync_ops) or \
+            (self.fsync_policy == "interval" and now - self._last_sync >= self.fsync_interval) or \
+            (self.fsync_policy == "hand" and hand_end)
+        snapshot = None
+        if compact or self._records >= self.compact_threshold:
+            snapshot = self._snapshot()
+        if sync or snapshot is not None:
+            self._unsynced = 0
+            self._last_sync = now
+
+        def write():
+            data = "".join(lines).encode("utf-8")
+            with self._lock:
+                try:
+                    self._file.write(data)
+                    self._file.flush()
+                except BaseException:
+                    self._retry = lines
+                    self._retry_snapshot = snapshot is not None
+                    self._reopen()
+                    raise
+                self._end += len(data)
+                try:
+                    if snapshot is not None:
+                        self._write_snapshot(snapshot)
+                    elif sync:
+                        os.fsync(self._file.fileno())
+                except BaseException:
+                    self._retry_snapshot = snapshot is not None
+                    raise
+            return len(data)
+        return write
+
+    def commit(self, hand_end: bool = False):
+        """一次操作结束：把缓冲交给操作系统，并按策略 fsync 或压缩"""
+        write = self.prepare_commit(hand_end)
+        if write is not None:
+            write()
+
+    def sync(self):
+        self.commit()
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _snapshot(self) -> dict:
+        """复制出普通字典的余额，编码留给写入线程"""
+        self._records = 0
+        return {group_id: dict(balances) for group_id, balances in self.balances.items()}
+
+    def _write_snapshot(self, snapshot: dict):
+        """把余额快照写入 tokens.json 后清空日志；即使在两步之间崩溃，重放日志也只会得到相同的余额"""
+        atomic_write(self.snapshot_file,
+                     json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._file.close()
+        self._file = open(self.journal_file, "wb")
+        self._end = 0
+
+    def _reopen(self):
+        """写入失败后截掉最后一次完整写入之后的内容（可能是半行），重新打开日志"""
+        try:
+            self._file.close()
+        except (OSError, ValueError):
+            # 缓冲里没写出去的数据会再刷一次，失败也照样关闭
+            pass
+        with open(self.journal_file, "r+b") as f:
+            f.truncate(self._end)
+        self._file = open(self.journal_file, "ab")
+
+    def compact(self):
+        self.commit()
+        snapshot = self._snapshot()
+        with self._lock:
+            self._write_snapshot(snapshot)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.compact()
+        self._file.close()
+        self._file = None
+
+
+class GroupBalances(dict):
+    """
+    单个群的余额表；下标赋值会同时写入日志（update/setdefault 不会）。
+    journal 可以是 TokenJournal，也可以是接口相同的 SQLiteStore。
+    """
+    __slots__ = ("group_id", "journal")
+
+    def __init__(self, journal: TokenJournal, group_id: str, balances=()):
+        super().__init__(balances)
+        self.group_id = group_id
+        self.journal = journal
+
+    def __setitem__(self, user_id, balance):
+        dict.__setitem__(self, user_id, balance)
+        self.journal.record(self.group_id, user_id, balance)
+
+
+class BalanceBook(dict):
+    """{group_id: GroupBalances}；给群赋值时自动包装成 GroupBalances"""
+
+    def __init__(self, journal: TokenJournal, balances: dict):
+        super().__init__((g, GroupBalances(journal, g, b)) for g, b in balances.items())
+        self.journal = journal
+        journal.attach(self)
+
+    def __setitem__(self, group_id, balances):
+        group = GroupBalances(self.journal, group_id)
+        dict.__setitem__(self, group_id, group)
+        for user_id, balance in dict(balances).items():
+            group[user_id] = balance
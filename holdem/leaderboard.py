@@ -0,0 +1,271 @@
+"""
+增量维护的排行榜索引。
+
+每个范围（全局或单个群）按三种指标各维护一个有序索引：胜场、胜率、净赢筹码。
+索引是跳表，一局结束后每位玩家的更新是 O(log n)，取前 N 名是 O(N)，
+不需要对所有玩家重新排序。胜率只统计局数达到 min_games 的玩家。
+
+JSON 后端用 RankJournal 持久化：每局只向 ranking.journal 追加变动玩家的统计，
+累积到一定行数后在写入线程中重写 ranking.json 并清空日志。
+"""
+import json
+import os
+import random
+
+from .persistence import atomic_write
+
+GLOBAL = ""
+METRICS = ("wins", "winrate", "net")
+_MAX_LEVEL = 24
+
+
+class _Node:
+    __slots__ = ("key", "value", "forward")
+
+    def __init__(self, key, value, level: int):
+        self.key = key
+        self.value = value
+        self.forward = [None] * level
+
+
+class SortedIndex:
+    """按 key 升序的跳表，key 需唯一且可比较"""
+
+    def __init__(self):
+        self._head = _Node(None, None, _MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < 0.25:
+            level += 1
+        return level
+
+    def insert(self, key, value=None):
+        update = [self._head] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+        level = self._random_level()
+        if level > self._level:
+            self._level = level
+        new = _Node(key, value, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+        self._size += 1
+
+    def remove(self, key) -> bool:
+        update = [None] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+        node = node.forward[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(self._level):
+            if update[i].forward[i] is not node:
+                break
+            update[i].forward[i] = node.forward[i]
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def first(self, n: int) -> list:
+        items = []
+        node = self._head.forward[0]
+        while node is not None and len(items) < n:
+            items.append((node.key, node.value))
+            node = node.forward[0]
+        return items
+
+
+def _sort_key(metric: str, user_id: str, stats: dict):
+    """升序索引的键：指标取负，使最大值排在最前；同分按局数、用户 ID 区分"""
+    if metric == "wins":
+        return (-stats["wins"], stats["games_played"], user_id)
+    if metric == "winrate":
+        return (-stats["wins"] / stats["games_played"], -stats["games_played"], user_id)
+    return (-stats["net"], stats["games_played"], user_id)
+
+
+class _Scope:
+    __slots__ = ("stats", "indexes", "keys")
+
+    def __init__(self):
+        self.stats = {}                                   # user_id -> {"name", "games_played", "wins", "net"}
+        self.indexes = {m: SortedIndex() for m in METRICS}
+        self.keys = {m: {} for m in METRICS}              # user_id -> 当前在索引中的键
+
+
+class Leaderboard:
+    def __init__(self, min_games: int = 5):
+        self.min_games = min_games
+        self._scopes = {}
+
+    def _scope(self, scope: str) -> _Scope:
+        s = self._scopes.get(scope)
+        if s is None:
+            s = self._scopes[scope] = _Scope()
+        return s
+
+    def _reindex(self, s: _Scope, user_id: str):
+        stats = s.stats[user_id]
+        for metric in METRICS:
+            old = s.keys[metric].pop(user_id, None)
+            if old is not None:
+                s.indexes[metric].remove(old)
+            if metric == "winrate" and stats["games_played"] < self.min_games:
+                continue
+            key = _sort_key(metric, user_id, stats)
+            s.indexes[metric].insert(key, user_id)
+            s.keys[metric][user_id] = key
+
+    def load(self, scopes: dict):
+        """scopes 为 {范围: {user_id: 统计}}，全局范围的键为 GLOBAL"""
+        for scope, users in scopes.items():
+            s = self._scope(scope)
+            for user_id, stats in users.items():
+                s.stats[user_id] = {"name": stats.get("name", user_id),
+                                    "games_played": stats.get("games_played", 0),
+                                    "wins": stats.get("wins", 0),
+                                    "net": stats.get("net", 0)}
+                if s.stats[user_id]["games_played"] > 0:
+                    self._reindex(s, user_id)
+
+    def record(self, scope: str, user_id: str, name: str, won: bool, net: int) -> dict:
+        """记录一名玩家在某范围内打完的一局，返回更新后的统计"""
+        s = self._scope(scope)
+        stats = s.stats.get(user_id)
+        if stats is None:
+            stats = s.stats[user_id] = {"name": name, "games_played": 0, "wins": 0, "net": 0}
+        stats["name"] = name
+        stats["games_played"] += 1
+        stats["wins"] += int(won)
+        stats["net"] += net
+        self._reindex(s, user_id)
+        return stats
+
+    def top(self, scope: str, metric: str, n: int) -> list:
+        """返回 [(user_id, 统计), ...]，按指标从高到低"""
+        if metric not in METRICS:
+            raise ValueError(f"未知的排行指标: {metric}")
+        s = self._scopes.get(scope)
+        if s is None:
+            return []
+        return [(user_id, s.stats[user_id]) for _, user_id in s.indexes[metric].first(n)]
+
+    def scope_stats(self, scope: str) -> dict:
+        s = self._scopes.get(scope)
+        return s.stats if s is not None else {}
+
+    def to_dict(self) -> dict:
+        """复制出的普通字典，之后对排行的修改不会影响它，可以交给写入线程编码"""
+        return {"global": {u: dict(stats) for u, stats in self.scope_stats(GLOBAL).items()},
+                "groups": {scope: {u: dict(stats) for u, stats in s.stats.items()}
+                           for scope, s in self._scopes.items() if scope != GLOBAL}}
+
+    @classmethod
+    def from_dict(cls, data: dict, min_games: int = 5):
+        """兼容旧版 ranking.json（{user_id: {"name", "games_played", "wins"}}）"""
+        board = cls(min_games)
+        if "global" in data and "groups" in data:
+            board.load({GLOBAL: data["global"], **data["groups"]})
+        else:
+            board.load({GLOBAL: data})
+        return board
+
+
+class RankJournal:
+    """
+    排行统计的追加式日志。每行 ``{"s": 范围, "u": 用户, "d": 统计}``，记录的是更新后的完整统计，
+    重放是幂等的；累积 compact_threshold 行后把整个排行写成 ranking.json 快照并清空日志。
+    prepare 在事件循环中只复制数据，JSON 编码和文件写入都在返回的函数里（写入线程）完成。
+    """
+
+    def __init__(self, snapshot_file: str, journal_file: str, compact_threshold: int = 5000):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.compact_threshold = compact_threshold
+        self._file = None           # 日志的追加句柄，只在写入线程中使用
+        self._records = 0           # 日志中的记录数
+        self._valid_end = None      # 日志中最后一条完整记录的结束偏移，首次写入前截掉之后的残行
+
+    def load(self, min_games: int = 5) -> Leaderboard:
+        """读取 ranking.json 并重放日志"""
+        data = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        board = Leaderboard.from_dict(data, min_games)
+        scopes = {}
+        records = 0
+        end = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break
+                    scopes.setdefault(rec["s"], {})[rec["u"]] = rec["d"]
+                    records += 1
+                    end += len(line)
+        board.load(scopes)
+        self._records = records
+        self._valid_end = end
+        return board
+
+    def prepare(self, rows: dict, board: Leaderboard):
+        """
+        rows 为 {(范围, user_id): 统计的副本}。需要压缩时同时复制整个排行，
+        返回执行写入的函数；没有变动时返回 None。
+        """
+        if not rows:
+            return None
+        rows = list(rows.items())
+        self._records += len(rows)
+        snapshot = None
+        if self._records >= self.compact_threshold:
+            snapshot = board.to_dict()
+            self._records = 0
+
+        def write():
+            data = "".join(json.dumps({"s": scope, "u": user_id, "d": stats}, ensure_ascii=False) + "\n"
+                           for (scope, user_id), stats in rows).encode("utf-8")
+            # 先追加日志再写快照：两步之间崩溃时，日志里每位玩家的最后一行与快照相同
+            self._open().write(data)
+            self._file.flush()
+            if snapshot is None:
+                return len(data)
+            written = atomic_write(self.snapshot_file,
+                                   json.dumps(snapshot, ensure_ascii=False, indent=4).encode("utf-8"))
+            self._file.close()
+            self._file = open(self.journal_file, "wb")
+            return len(data) + written
+        return write
+
+    def _open(self):
+        if self._file is None:
+            if self._valid_end is not None and os.path.exists(self.journal_file) \
+                    and os.path.getsize(self.journal_file) > self._valid_end:
+                with open(self.journal_file, "r+b") as f:
+                    f.truncate(self._valid_end)
+            self._file = open(self.journal_file, "ab")
+        return self._file
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
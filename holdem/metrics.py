@@ -0,0 +1,154 @@
+"""
+进程内性能指标：直方图、计数器和按需读取的仪表。
+
+    metrics.observe("poker_handler_seconds", {"handler": "call_bet"}, 0.0021)
+    metrics.inc("poker_evaluator_calls_total", {"source": "showdown"}, 4)
+    metrics.gauge("poker_resident_games", lambda: len(games))
+
+直方图使用固定的对数分桶（与 Prometheus 的累积桶一致），每次记录只是一次二分查找和几次加法；
+仪表只在导出时调用。report() 生成 /poker perf 的文字摘要，prometheus() 生成 Prometheus 文本格式。
+enabled 为 False 时调用方应跳过计时（见 main.py 的 timed），记录方法本身也直接返回。
+"""
+import bisect
+import time
+
+# 秒；最后一个桶为 +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """q 分位数的上界（所在桶的上沿；落在最后一个桶时返回最大值）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for k, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(BUCKETS[k], self.max) if k < len(BUCKETS) else self.max
+        return self.max
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.time()
+        self.histograms = {}        # (名称, 标签元组) -> Histogram
+        self.counters = {}          # (名称, 标签元组) -> 数值
+        self.gauges = {}            # 名称 -> 返回数值的函数
+
+    def observe(self, name: str, labels: dict, value: float):
+        if not self.enabled:
+            return
+        key = (name, tuple(labels.items()))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.observe(value)
+
+    def inc(self, name: str, labels: dict = None, value: float = 1):
+        if not self.enabled:
+            return
+        key = (name, tuple(labels.items()) if labels else ())
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, fn):
+        self.gauges[name] = fn
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get((name, tuple(labels.items())), 0)
+
+    def _read_gauges(self) -> dict:
+        values = {}
+        for name, fn in self.gauges.items():
+            try:
+                values[name] = fn()
+            except Exception as e:
+                print(f"读取指标 {name} 失败:", e)
+        return values
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        out = []
+        for name in sorted({name for name, _ in self.histograms}):
+            out.append(f"# TYPE {name} histogram")
+            for (hname, labels), hist in sorted(self.histograms.items()):
+                if hname != name:
+                    continue
+                labels = dict(labels)
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append(f"{name}_bucket{_labels(dict(labels, le=le))} {cumulative}")
+                out.append(f"{name}_sum{_labels(labels)} {hist.sum!r}")
+                out.append(f"{name}_count{_labels(labels)} {hist.count}")
+        for name in sorted({name for name, _ in self.counters}):
+            out.append(f"# TYPE {name} counter")
+            for (cname, labels), value in sorted(self.counters.items()):
+                if cname == name:
+                    out.append(f"{name}{_labels(dict(labels))} {value!r}")
+        for name, value in sorted(self._read_gauges().items()):
+            out.append(f"# TYPE {name} gauge")
+            out.append(f"{name} {value!r}")
+        return "\n".join(out) + "\n"
+
+    def report(self) -> list:
+        """/poker perf 的文字摘要"""
+        uptime = time.time() - self.started
+        lines = [f"运行 {uptime / 3600:.1f} 小时"]
+        for name, value in sorted(self._read_gauges().items()):
+            lines.append(f"{name}: {value}")
+        handlers = [(dict(labels).get("handler", "?"), hist) for (name, labels), hist in self.histograms.items()
+                    if name == "poker_handler_seconds"]
+        if handlers:
+            lines.append("指令耗时（次数 / 平均 / p50 / p99 / 最长，毫秒）：")
+            for handler, hist in sorted(handlers, key=lambda h: -h[1].sum):
+                lines.append(f"  {handler}: {hist.count} / {hist.sum / hist.count * 1000:.1f} / "
+                             f"{hist.quantile(0.5) * 1000:.1f} / {hist.quantile(0.99) * 1000:.1f} / {hist.max * 1000:.1f}")
+        sources = sorted({dict(labels).get("source") for name, labels in self.counters
+                          if name == "poker_evaluator_calls_total"})
+        for source in sources:
+            calls = self.counter("poker_evaluator_calls_total", source=source)
+            seconds = self.counter("poker_evaluator_seconds_total", source=source)
+            lines.append(f"牌型评价（{source}）：{int(calls):,} 次，{seconds:.3f}s"
+                         + (f"，{seconds / calls * 1e6:.2f}us/次" if calls else ""))
+        timeouts = {dict(labels).get("action"): value for (name, labels), value in self.counters.items()
+                    if name == "poker_turn_timeouts_total"}
+        if timeouts:
+            lines.append("行动超时：自动看牌 {:,} 次，自动弃牌 {:,} 次".format(
+                int(timeouts.get("check", 0)), int(timeouts.get("fold", 0))))
+        delivery = self.histograms.get(("poker_delivery_seconds", ()))
+        if delivery is not None and delivery.count:
+            lines.append(f"手牌私信：{delivery.count} 条，失败 {int(self.counter('poker_delivery_messages_total', result='failed'))} 条，"
+                         f"共尝试 {int(self.counter('poker_delivery_attempts_total'))} 次，"
+                         f"平均 {delivery.sum / delivery.count * 1000:.1f}ms，p99 {delivery.quantile(0.99) * 1000:.1f}ms")
+        persists = [(dict(labels).get("kind", "?"), hist) for (name, labels), hist in self.histograms.items()
+                    if name == "poker_persist_seconds"]
+        for kind, hist in sorted(persists):
+            written = self.counter("poker_persist_bytes_total", kind=kind)
+            lines.append(f"保存 {kind}：{hist.count} 次，平均 {hist.sum / hist.count * 1000:.2f}ms，"
+                         f"最长 {hist.max * 1000:.1f}ms，共写入 {written / 1024:.1f}KB")
+        return lines
@@ -0,0 +1,129 @@
+"""
+后台持久化：把文件写入移出事件循环。
+
+处理器只修改内存中的状态，然后用 ``mark_dirty(key, prepare)`` 标记某类数据需要保存。
+后台任务被唤醒后等待一个很短的合并窗口，再依次调用各 key 的 ``prepare()``：
+prepare 在事件循环线程中运行，负责取出待写入的数据快照，返回一个在写入线程中执行的函数
+（没有要写的内容时返回 None）。窗口内多次标记同一个 key 只会写一次。
+
+所有写入都在同一个单线程执行器中按提交顺序执行。需要确认已落盘的地方
+（例如一局结算）可以 ``await worker.flush()``。
+
+写入函数可以返回写入的字节数；设置了 ``on_write(key, 秒, 字节数)`` 时每次写入后调用它。
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def atomic_write(path: str, data: bytes) -> int:
+    """写入临时文件、fsync 后重命名，读者只会看到完整的旧文件或新文件；返回写入的字节数"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+class PersistenceWorker:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay                  # 合并窗口（秒）
+        self._dirty = {}                    # key -> prepare，按首次标记的顺序
+        self._waiters = []                  # 等待下一批写完的 Future
+        self._wakeup = None
+        self._task = None
+        self._closed = False
+        self._busy = False                  # 是否正在写一批数据
+        self.on_write = None                # 可选回调 (key, 耗时秒数, 写入字节数)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poker-persist")
+
+    def mark_dirty(self, key: str, prepare):
+        """标记一类数据需要保存；没有运行中的事件循环时（启动、关闭阶段）直接同步写入"""
+        if self._closed:
+            self._run_sync(key, prepare)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._run_sync(key, prepare)
+            return
+        self._dirty[key] = prepare
+        self._ensure_task(loop)
+        self._wakeup.set()
+
+    async def flush(self):
+        """等待目前为止标记的所有数据写完"""
+        if self._task is None or (not self._dirty and not self._busy):
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._wakeup.set()
+        await future
+
+    async def close(self):
+        """写完剩余数据并停止后台任务；之后的 mark_dirty 会同步写入"""
+        await self.flush()
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # 可能有 flush 之后才标记的数据
+        self.flush_sync()
+        self._executor.shutdown(wait=True)
+
+    def flush_sync(self):
+        dirty, self._dirty = self._dirty, {}
+        for key, prepare in dirty.items():
+            self._run_sync(key, prepare)
+
+    def _run_sync(self, key: str, prepare):
+        try:
+            write = prepare()
+            if write is not None:
+                start = time.perf_counter()
+                written = write()
+                self._written(key, start, written)
+        except Exception as e:
+            print("保存数据失败:", e)
+
+    def _written(self, key: str, start: float, written):
+        if self.on_write is not None:
+            self.on_write(key, time.perf_counter() - start, written if isinstance(written, int) else 0)
+
+    def _ensure_task(self, loop):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self._busy = True
+            if self.delay > 0 and not self._waiters:
+                await asyncio.sleep(self.delay)
+            dirty, self._dirty = self._dirty, {}
+            waiters, self._waiters = self._waiters, []
+            for key, prepare in dirty.items():
+                try:
+                    write = prepare()
+                    if write is not None:
+                        start = time.perf_counter()
+                        written = await loop.run_in_executor(self._executor, write)
+                        self._written(key, start, written)
+                except Exception as e:
+                    print(f"保存 {key} 失败:", e)
+            self._busy = False
+            for future in waiters:
+                if not future.done():
+                    future.set_result(None)
+            if self._dirty or self._waiters:
+                self._wakeup.set()
@@ -0,0 +1,171 @@
+"""
+翻牌前胜率表：169 种起手牌类别分别对 1–8 名随机对手的期望胜率。
+
+表只需生成一次（``python -m holdem.preflop [路径]``，或由插件在后台子进程中生成），
+之后以只读 mmap 方式映射文件，查询是 O(1) 的一次下标运算。表还不存在时用 live_equity 少量抽样现算。
+
+文件格式：16 字节头（b"PFEQ"、类别数、最大对手数、每格样本数，均为小端 uint32），
+随后是 169 × 8 个小端 float32。
+"""
+import mmap
+import os
+import random
+import struct
+import sys
+
+from .cards import RANKS, card_rank, card_suit
+from .evaluator import accumulate_batch, evaluate, lookup_batch, np
+
+MAGIC = b"PFEQ"
+HEADER = struct.Struct("<4sIII")
+CLASSES = 169
+MAX_OPPONENTS = 8
+LIVE_SAMPLES = 2000 if np is not None else 500     # live_equity 的默认样本数
+
+
+def hand_class(card1: int, card2: int) -> int:
+    """
+    起手牌类别下标（0–168）：对子在对角线上，同花为 高*13+低，不同花为 低*13+高。
+    """
+    r1, r2 = card_rank(card1), card_rank(card2)
+    hi, lo = max(r1, r2), min(r1, r2)
+    if card_suit(card1) == card_suit(card2) and r1 != r2:
+        return hi * 13 + lo
+    return lo * 13 + hi
+
+
+def class_name(index: int) -> str:
+    """类别下标对应的名称，如 "AKs"、"QJo"、"77"。"""
+    a, b = divmod(index, 13)
+    if a == b:
+        return RANKS[a] * 2
+    hi, lo = max(a, b), min(a, b)
+    return f"{RANKS[hi]}{RANKS[lo]}{'s' if a > b else 'o'}"
+
+
+def _class_cards(index: int) -> tuple:
+    """类别的一手代表牌"""
+    a, b = divmod(index, 13)
+    if a > b:  # 同花
+        return a * 4, b * 4
+    return a * 4, b * 4 + 1
+
+
+def _simulate_numpy(hero, opponents: int, samples: int, rng) -> float:
+    remaining = np.array([c for c in range(52) if c not in hero], dtype=np.int64)
+    need = 5 + 2 * opponents
+    # 每行随机排列剩余牌，前 5 张为公共牌，之后每 2 张为一名对手的手牌
+    drawn = rng.permuted(np.broadcast_to(remaining, (samples, remaining.size)), axis=1)[:, :need]
+    board = accumulate_batch(drawn[:, :5])
+    hero_hand = accumulate_batch(np.array([hero], dtype=np.int64))
+    scores = [lookup_batch(*(b + h for b, h in zip(board, hero_hand)))]
+    for i in range(opponents):
+        hand = accumulate_batch(drawn[:, 5 + 2 * i:7 + 2 * i])
+        scores.append(lookup_batch(*(b + h for b, h in zip(board, hand))))
+    scores = np.stack(scores)
+    is_best = scores == scores.max(axis=0)
+    hero_share = np.where(is_best[0], 1.0 / is_best.sum(axis=0), 0.0)
+    return float(hero_share.mean())
+
+
+def _simulate_python(hero, opponents: int, samples: int, rng) -> float:
+    remaining = [c for c in range(52) if c not in hero]
+    hero = list(hero)
+    total = 0.0
+    for _ in range(samples):
+        drawn = rng.sample(remaining, 5 + 2 * opponents)
+        board = drawn[:5]
+        hero_score = evaluate(hero + board)
+        best = hero_score
+        ties = 1
+        for i in range(opponents):
+            score = evaluate(drawn[5 + 2 * i:7 + 2 * i] + board)
+            if score > best:
+                break
+            if score == best:
+                ties += 1
+        else:
+            total += 1.0 / ties
+    return total / samples
+
+
+def live_equity(card1: int, card2: int, opponents: int, samples: int = None, seed=None) -> float:
+    """
+    不查表，直接对 opponents 名随机对手蒙特卡洛估算翻牌前胜率（0–1）。
+    samples 默认为 LIVE_SAMPLES：安装 numpy 时 2000，否则 500（8 名对手约十几毫秒）。
+    """
+    if not 1 <= opponents <= MAX_OPPONENTS:
+        raise ValueError(f"对手数需在 1–{MAX_OPPONENTS} 之间")
+    if np is not None:
+        return _simulate_numpy((card1, card2), opponents, samples or LIVE_SAMPLES, np.random.default_rng(seed))
+    return _simulate_python((card1, card2), opponents, samples or LIVE_SAMPLES, random.Random(seed))
+
+
+def generate_table(path: str, samples: int = None, seed=None):
+    """
+    用蒙特卡洛生成胜率表并原子地写入 path。samples 为每格样本数，
+    默认安装 numpy 时 10000，否则 2000。
+    """
+    if samples is None:
+        samples = 10000 if np is not None else 2000
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        simulate = _simulate_numpy
+    else:
+        rng = random.Random(seed)
+        simulate = _simulate_python
+    values = []
+    for index in range(CLASSES):
+        hero = _class_cards(index)
+        for opponents in range(1, MAX_OPPONENTS + 1):
+            values.append(simulate(hero, opponents, samples, rng))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, CLASSES, MAX_OPPONENTS, samples))
+        f.write(struct.pack(f"<{len(values)}f", *values))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PreflopTable:
+    """映射到内存的翻牌前胜率表"""
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise ValueError("翻牌前胜率表仅支持小端平台")
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, classes, max_opponents, self.samples = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or classes != CLASSES or max_opponents != MAX_OPPONENTS:
+            self._mmap.close()
+            raise ValueError(f"无效的翻牌前胜率表: {path}")
+        self._values = memoryview(self._mmap)[HEADER.size:].cast("f")
+
+    @classmethod
+    def load(cls, path: str):
+        """文件不存在或无效时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            print("加载翻牌前胜率表失败:", e)
+            return None
+
+    def equity(self, card1: int, card2: int, opponents: int) -> float:
+        """手牌对 opponents 名随机对手的期望胜率（0–1）"""
+        if not 1 <= opponents <= MAX_OPPONENTS:
+            raise ValueError(f"对手数需在 1–{MAX_OPPONENTS} 之间")
+        return self._values[hand_class(card1, card2) * MAX_OPPONENTS + opponents - 1]
+
+    def close(self):
+        self._values.release()
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "preflop_equity.bin")
+    generate_table(target)
+    print("已生成翻牌前胜率表:", target)
@@ -0,0 +1,233 @@
+"""
+按需开启的性能剖析：在线上直接定位热点，不需要重新部署带埋点的版本。
+
+两种模式，同一时间只运行一种：
+
+    sample      后台线程每隔 interval 秒读取事件循环线程的调用栈（sys._current_frames），
+                只在被剖析的指令执行期间计数。开销与处理器的代码量无关，适合长时间开着。
+                输出折叠栈文件 sample-*.folded（``函数;函数;函数 次数``），
+                可以直接交给 flamegraph.pl、inferno 或 speedscope 生成火焰图。
+    cprofile    被剖析的指令执行期间打开 cProfile，记录每个函数的调用次数和耗时，
+                输出 cprofile-*.prof（pstats 格式，可用 snakeviz 或 flameprof 查看）。
+
+指令是异步生成器，执行中 await 时事件循环会运行其他任务，这段时间的开销也会计入。
+handlers 为空时剖析所有指令，否则只剖析其中列出的处理器。
+
+alloc 为真时同时开启 tracemalloc，allocations(label) 前后各取一次快照，
+把内存分配增长最多的代码行追加到 alloc-*.txt。取快照需要遍历所有分配记录，代价较高，只在排查时打开。
+
+每 rotate 秒（以及停止时）把当前结果写成新文件并重新计数，每类文件只保留最近 keep 个。
+写文件交给 PersistenceWorker 的后台线程。
+"""
+import cProfile
+import collections
+import contextlib
+import functools
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from .persistence import atomic_write
+
+MODES = ("sample", "cprofile")
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(frame) -> str:
+    """把调用栈折叠成 ``最外层;...;最内层``"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class Profiler:
+    def __init__(self, directory: str, persistence, handlers=(), interval: float = 0.005,
+                 rotate: float = 300, keep: int = 10, alloc_top: int = 10):
+        self.directory = directory
+        self.persistence = persistence
+        self.handlers = set(handlers)       # 被剖析的处理器名，为空表示全部
+        self.interval = interval            # 采样间隔（秒）
+        self.rotate = rotate                # 每隔多少秒换一个输出文件
+        self.keep = keep                    # 每类输出文件保留的个数
+        self.alloc_top = alloc_top          # 每次快照对比记录的代码行数
+        self.mode = None                    # 运行中的模式，None 表示未开启
+        self.alloc = False
+        self.started = 0.0
+        self._active = 0                    # 正在执行的被剖析指令数
+        self._session = 0                   # 每次 start 加一，停止前开始的指令结束时不再计数
+        self._rotated = 0.0
+        self._profile = None
+        self._samples = collections.Counter()
+        self._sample_count = 0
+        self._sample_lock = threading.Lock()
+        self._sampler = None
+        self._stop_sampler = threading.Event()
+        self._target = None                 # 事件循环线程的 ident
+        self._alloc_lines = []
+
+    @property
+    def running(self) -> bool:
+        return self.mode is not None
+
+    def covers(self, handler: str) -> bool:
+        return self.mode is not None and (not self.handlers or handler in self.handlers)
+
+    # ---------- 开启与停止 ----------
+    def start(self, mode: str = "sample", alloc: bool = False):
+        """在事件循环线程中调用"""
+        if mode not in MODES:
+            raise ValueError(f"未知的剖析模式: {mode}")
+        if self.running:
+            self.stop()
+        self.mode = mode
+        self.alloc = alloc
+        self._session += 1
+        self.started = self._rotated = time.time()
+        if mode == "cprofile":
+            self._profile = cProfile.Profile()
+        else:
+            self._target = threading.get_ident()
+            self._stop_sampler.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="poker-sampler", daemon=True)
+            self._sampler.start()
+        if alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self) -> list:
+        """停止剖析并写出剩余结果，返回本次写出的文件名"""
+        if not self.running:
+            return []
+        if self._sampler is not None:
+            self._stop_sampler.set()
+            self._sampler.join()
+            self._sampler = None
+        if self._profile is not None and self._active:
+            self._profile.disable()
+        self._active = 0
+        written = self.flush()
+        if self.alloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.mode = None
+        self.alloc = False
+        self._profile = None
+        return written
+
+    def status(self) -> list:
+        if not self.running:
+            return ["性能剖析未开启。"]
+        lines = [f"模式 {self.mode}" + ("，内存分配追踪" if self.alloc else "") +
+                 f"，已运行 {time.time() - self.started:.0f}s",
+                 "剖析的指令：" + ("全部" if not self.handlers else "、".join(sorted(self.handlers)))]
+        if self.mode == "sample":
+            lines.append(f"当前文件已采样 {self._sample_count} 次")
+        lines.append(f"输出目录：{self.directory}")
+        return lines
+
+    # ---------- 指令前后 ----------
+    def enter(self) -> int:
+        """被剖析的指令开始执行，返回的会话号传给 exit"""
+        self._active += 1
+        if self._active == 1 and self._profile is not None:
+            try:
+                self._profile.enable()
+            except ValueError as e:
+                # 同一线程已有其他剖析器在运行
+                print("开启 cProfile 失败:", e)
+        return self._session
+
+    def exit(self, session: int):
+        if session != self._session or not self.running:
+            return
+        self._active -= 1
+        if self._active == 0:
+            if self._profile is not None:
+                self._profile.disable()
+            if time.time() - self._rotated >= self.rotate:
+                self.flush()
+
+    def _sample_loop(self):
+        while not self._stop_sampler.wait(self.interval):
+            if not self._active:
+                continue
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = fold_stack(frame)
+            with self._sample_lock:
+                self._samples[stack] += 1
+                self._sample_count += 1
+
+    # ---------- 内存分配 ----------
+    def alloc_begin(self):
+        """开启内存追踪时返回一个快照，传给 alloc_end；否则返回 None"""
+        if not self.alloc or not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.take_snapshot()
+
+    def alloc_end(self, label: str, before):
+        if before is None or not tracemalloc.is_tracing():
+            return
+        after = tracemalloc.take_snapshot()
+        # 不统计 tracemalloc 自身的分配（在比较结果上过滤，filter_traces 要遍历全部分配记录）
+        stats = [stat for stat in after.compare_to(before, "lineno")
+                 if stat.traceback[0].filename != tracemalloc.__file__]
+        grown = sum(stat.size_diff for stat in stats)
+        self._alloc_lines.append(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {label}：净增 {grown / 1024:+.1f}KiB")
+        for stat in stats[:self.alloc_top]:
+            self._alloc_lines.append(f"    {stat}")
+
+    @contextlib.contextmanager
+    def allocations(self, label: str):
+        before = self.alloc_begin()
+        try:
+            yield
+        finally:
+            self.alloc_end(label, before)
+
+    # ---------- 输出 ----------
+    def flush(self) -> list:
+        """把当前结果写成新文件并重新计数，返回写出的文件名"""
+        self._rotated = time.time()
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f".{int(now * 1000) % 1000:03d}"
+        written = []
+        if self._profile is not None and not self._active:
+            profile, self._profile = self._profile, cProfile.Profile()
+            profile.create_stats()
+            if profile.stats:
+                written.append(self._write("cprofile", stamp, ".prof", marshal.dumps(profile.stats)))
+        if self.mode == "sample":
+            with self._sample_lock:
+                samples, self._samples = self._samples, collections.Counter()
+                self._sample_count = 0
+            if samples:
+                data = "".join(f"{stack} {n}\n" for stack, n in samples.most_common())
+                written.append(self._write("sample", stamp, ".folded", data.encode("utf-8")))
+        if self._alloc_lines:
+            lines, self._alloc_lines = self._alloc_lines, []
+            written.append(self._write("alloc", stamp, ".txt", ("\n".join(lines) + "\n").encode("utf-8")))
+        return written
+
+    def _write(self, kind: str, stamp: str, suffix: str, data: bytes) -> str:
+        name = f"{kind}-{stamp}{suffix}"
+        # 每个文件单独一个 key，避免同一窗口内的两次轮换被合并成一次
+        self.persistence.mark_dirty("profile:" + name, lambda: functools.partial(self._save, kind, name, data))
+        return name
+
+    def _save(self, kind: str, name: str, data: bytes) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        written = atomic_write(os.path.join(self.directory, name), data)
+        # 只保留最近 keep 个同类文件（文件名按时间排序）
+        old = sorted(f for f in os.listdir(self.directory) if f.startswith(kind + "-") and not f.endswith(".tmp"))
+        for stale in old[:-self.keep] if self.keep else []:
+            os.remove(os.path.join(self.directory, stale))
+        return written
@@ -0,0 +1,179 @@
+"""
+扑克牌图片渲染（可选依赖 Pillow）。
+
+启动时画一次精灵图（52 张牌面 + 牌背），切成牌块缓存起来；之后每张图片只是把牌块贴到画布上，
+再编码为 PNG。花色用多边形和圆形直接画出，不依赖字体；玩家名等文字需要配置支持中文的字体文件，
+未配置时只标座位号。
+
+渲染结果按内容（牌面、名称）缓存为 directory 下的 PNG 文件，相同的公共牌、手牌或摊牌局面直接复用，
+最多保留 cache_size 个文件，超出时删除最久未使用的。渲染在调用方的线程中进行，可以放进线程池。
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .cards import RANKS
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # 未安装 Pillow 时不提供图片输出
+    Image = None
+
+AVAILABLE = Image is not None
+
+BACK = 52               # 精灵图中牌背的位置
+CARD_W, CARD_H = 60, 84
+GAP = 6
+LABEL_W = 220           # 摊牌图中文字列的宽度
+
+BACKGROUND = (22, 96, 58)
+FACE = (250, 250, 250)
+EDGE = (60, 60, 60)
+BACK_COLOR = (40, 70, 150)
+SUIT_COLORS = [(20, 20, 20), (200, 30, 40), (200, 30, 40), (20, 20, 20)]    # ♠ ♥ ♦ ♣
+TEXT = (240, 240, 240)
+
+
+def _draw_suit(draw, suit: int, cx: float, cy: float, r: float, color):
+    """以 (cx, cy) 为中心、r 为半径画花色符号"""
+    if suit == 2:       # ♦
+        draw.polygon([(cx, cy - r), (cx + r * 0.75, cy), (cx, cy + r), (cx - r * 0.75, cy)], fill=color)
+        return
+    if suit == 1:       # ♥：两个圆加倒三角
+        h = r * 0.5
+        draw.ellipse([cx - r, cy - r * 0.8, cx, cy - r * 0.8 + 2 * h], fill=color)
+        draw.ellipse([cx, cy - r * 0.8, cx + r, cy - r * 0.8 + 2 * h], fill=color)
+        draw.polygon([(cx - r * 0.97, cy - r * 0.15), (cx + r * 0.97, cy - r * 0.15), (cx, cy + r)], fill=color)
+        return
+    # ♠ 和 ♣ 都带底部的柄
+    draw.polygon([(cx, cy + r * 0.2), (cx - r * 0.45, cy + r), (cx + r * 0.45, cy + r)], fill=color)
+    if suit == 0:       # ♠：倒过来的心形
+        h = r * 0.5
+        draw.ellipse([cx - r, cy + r * 0.5 - 2 * h, cx, cy + r * 0.5], fill=color)
+        draw.ellipse([cx, cy + r * 0.5 - 2 * h, cx + r, cy + r * 0.5], fill=color)
+        draw.polygon([(cx - r * 0.97, cy + r * 0.05), (cx + r * 0.97, cy + r * 0.05), (cx, cy - r)], fill=color)
+    else:               # ♣：三个圆
+        s = r * 0.48
+        for x, y in ((cx, cy - r * 0.45), (cx - r * 0.5, cy + r * 0.15), (cx + r * 0.5, cy + r * 0.15)):
+            draw.ellipse([x - s, y - s, x + s, y + s], fill=color)
+
+
+def build_atlas(font) -> "Image.Image":
+    """画出 53 个牌块（52 张牌 + 牌背）横向排成的精灵图"""
+    atlas = Image.new("RGB", (CARD_W * 53, CARD_H), BACKGROUND)
+    draw = ImageDraw.Draw(atlas)
+    for card in range(53):
+        x = card * CARD_W
+        box = [x + 1, 1, x + CARD_W - 2, CARD_H - 2]
+        if card == BACK:
+            draw.rounded_rectangle(box, radius=6, fill=BACK_COLOR, outline=FACE, width=3)
+            continue
+        draw.rounded_rectangle(box, radius=6, fill=FACE, outline=EDGE, width=1)
+        color = SUIT_COLORS[card & 3]
+        draw.text((x + 6, 4), RANKS[card >> 2], fill=color, font=font)
+        _draw_suit(draw, card & 3, x + 13, 34, 6, color)
+        _draw_suit(draw, card & 3, x + CARD_W / 2 + 4, CARD_H / 2 + 12, 15, color)
+    return atlas
+
+
+def _load_font(path: str, size: int):
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError as e:
+            print("加载牌面字体失败:", e)
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:   # Pillow < 10.1 的默认字体不能指定大小
+        return ImageFont.load_default()
+
+
+class CardRenderer:
+    def __init__(self, directory: str, font_path: str = "", cache_size: int = 512):
+        if not AVAILABLE:
+            raise RuntimeError("图片输出需要安装 Pillow")
+        self.directory = directory
+        self.cache_size = cache_size
+        self.rank_font = _load_font("", 18)
+        # 只有配置了字体文件才画玩家名（默认字体没有中文字形）
+        self.label_font = _load_font(font_path, 18) if font_path else None
+        atlas = build_atlas(self.rank_font)
+        self.tiles = [atlas.crop((k * CARD_W, 0, (k + 1) * CARD_W, CARD_H)) for k in range(53)]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # 上次运行留下的图片同样可以复用，按修改时间从旧到新排列
+        names = sorted((name for name in os.listdir(directory) if name.endswith(".png")),
+                       key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+        self._files = OrderedDict((name, None) for name in names)
+
+    # ---------- 图片 ----------
+    def cards(self, cards, slots: int = 0) -> str:
+        """一排牌（不足 slots 张时用牌背补齐，如翻牌时的 5 张公共牌位），返回 PNG 路径"""
+        cards = tuple(cards)
+        return self._cached(("cards", cards, slots), lambda: self._row(cards, slots))
+
+    def table(self, board, rows: list) -> str:
+        """
+        摊牌图：第一排为公共牌，其后每位玩家一排（手牌 + 文字），rows 为 [(名称, 手牌, 说明), ...]。
+        返回 PNG 路径。
+        """
+        board = tuple(board)
+        rows = tuple((name, tuple(cards), note) for name, cards, note in rows)
+        return self._cached(("table", board, rows), lambda: self._table(board, rows))
+
+    def _row(self, cards: tuple, slots: int):
+        count = max(len(cards), slots)
+        image = Image.new("RGB", (GAP + count * (CARD_W + GAP), CARD_H + 2 * GAP), BACKGROUND)
+        for k in range(count):
+            image.paste(self.tiles[cards[k] if k < len(cards) else BACK], (GAP + k * (CARD_W + GAP), GAP))
+        return image
+
+    def _table(self, board: tuple, rows: tuple):
+        width = GAP + 5 * (CARD_W + GAP) + LABEL_W
+        height = GAP + (len(rows) + 1) * (CARD_H + GAP)
+        image = Image.new("RGB", (width, height), BACKGROUND)
+        draw = ImageDraw.Draw(image)
+        for k in range(5):
+            image.paste(self.tiles[board[k] if k < len(board) else BACK], (GAP + k * (CARD_W + GAP), GAP))
+        for seat, (name, cards, note) in enumerate(rows, 1):
+            y = GAP + seat * (CARD_H + GAP)
+            for k, card in enumerate(cards):
+                image.paste(self.tiles[card], (GAP + k * (CARD_W + GAP), y))
+            x = GAP + 2 * (CARD_W + GAP) + GAP
+            if self.label_font is not None:
+                draw.text((x, y + 16), name, fill=TEXT, font=self.label_font)
+                draw.text((x, y + 46), note, fill=TEXT, font=self.label_font)
+            else:
+                draw.text((x, y + 30), f"#{seat}", fill=TEXT, font=self.rank_font)
+        return image
+
+    # ---------- 缓存 ----------
+    def _cached(self, key: tuple, compose) -> str:
+        name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20] + ".png"
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name in self._files and os.path.exists(path):
+                self._files.move_to_end(name)
+                self.hits += 1
+                return path
+            self.misses += 1
+        image = compose()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        # 牌面颜色很少，压缩级别 1 已经足够小，编码更快
+        image.save(tmp_path, "PNG", compress_level=1)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._files[name] = None
+            self._files.move_to_end(name)
+            stale = []
+            while len(self._files) > self.cache_size:
+                stale.append(self._files.popitem(last=False)[0])
+        for old in stale:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except FileNotFoundError:
+                pass
+        return path
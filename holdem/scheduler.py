@@ -0,0 +1,106 @@
+"""
+定时任务调度：所有牌桌共用一个后台任务和一个最小堆。
+
+    handle = scheduler.call_at(when, callback, *args)    # when 为 time.time() 时间戳
+    handle = scheduler.call_later(delay, callback, *args)
+    scheduler.cancel(handle)
+
+每个定时任务只是堆中的一项 [时间, 序号, 回调, 参数, 已取消]，安排为 O(log n)；
+取消只做标记，到期弹出时跳过（惰性删除），为 O(1)。后台任务只等待堆顶到期，
+插入更早的任务时被唤醒重新计算等待时间。不论有多少张牌桌在等待升盲、换桌，
+都只有一个任务在睡眠，而不是每张牌桌一个 asyncio.sleep。
+
+回调在事件循环中执行；返回协程时另起一个任务运行，不阻塞后面到期的回调。
+时间使用墙上时钟，保存下来的到期时间在重启后仍然有效。
+"""
+import asyncio
+import heapq
+import itertools
+import time
+
+WHEN, SEQ, CALLBACK, ARGS, CANCELLED = range(5)
+
+
+class Scheduler:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        self._task = None
+        self._wakeup = None
+        self._running = set()       # 回调返回的协程任务，保留引用直到完成
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._heap if not entry[CANCELLED])
+
+    def call_at(self, when: float, callback, *args) -> list:
+        entry = [when, next(self._seq), callback, args, False]
+        earliest = not self._heap or when < self._heap[0][WHEN]
+        heapq.heappush(self._heap, entry)
+        self.ensure_running()
+        if earliest and self._wakeup is not None:
+            self._wakeup.set()
+        return entry
+
+    def call_later(self, delay: float, callback, *args) -> list:
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def cancel(self, handle):
+        if handle is not None:
+            handle[CANCELLED] = True
+            handle[CALLBACK] = handle[ARGS] = None
+
+    def ensure_running(self):
+        """在事件循环中启动后台任务；没有运行中的事件循环时（如插件初始化）留到下次调用"""
+        if self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            heap = self._heap
+            while heap and heap[0][CANCELLED]:
+                heapq.heappop(heap)
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+            delay = heap[0][WHEN] - self.clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            entry = heapq.heappop(heap)
+            callback, args = entry[CALLBACK], entry[ARGS]
+            entry[CANCELLED] = True
+            self.fired += 1
+            try:
+                result = callback(*args)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.get_running_loop().create_task(result)
+                    self._running.add(task)
+                    task.add_done_callback(self._done)
+            except Exception as e:
+                print("定时任务执行失败:", e)
+
+    def _done(self, task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print("定时任务执行失败:", task.exception())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._running:
+            task.cancel()
+        self._running.clear()
+        self._heap.clear()
@@ -0,0 +1,84 @@
+"""
+彩池结算：按投入额拆分主池和边池，并按牌力分配。
+
+每位玩家本局投入彩池的总额记在 Player.contributed（投入时由 PokerGame.bet 累加）。
+拆池只需对投入额排序一次，再从小到大扫一遍：按每个投入档位切一层，
+这一层的金额为 (档位差 × 投入不少于该档位的人数)，未弃牌且投入不少于该档位的玩家有资格分这一层；
+扫过一位玩家的档位后把他移出有资格的集合，不再为每一层重新扫描全部玩家。
+资格相同的相邻层合并为一个池。最高一层只有一人投入时是没人跟的注，单独作为一个退还池
+（refund 为 True）放在最后，原样退还给他；其他只有一人有资格的池是别人跟注后弃牌留下的，照常赢得。
+
+每个池由有资格的玩家中牌力最大者平分；除不尽的零头按座位顺序（从庄家左手边起）每人一枚。
+牌力为 evaluator.evaluate 的整数，每位玩家只计算一次。
+"""
+from collections import namedtuple
+
+# eligible: 有资格分这个池的玩家 ID 元组，按座位顺序；refund: 是否为没人跟注、退还给投入者的部分
+Pot = namedtuple("Pot", ["amount", "eligible", "refund"], defaults=(False,))
+
+
+def build_pots(contributions: list, live: set) -> list:
+    """
+    contributions 为按座位顺序的 [(player_id, 投入额), ...]，live 为未弃牌的玩家 ID。
+    返回从主池到最后一个边池的 Pot 列表。
+    """
+    order = sorted(contributions, key=lambda c: c[1])
+    # 投入不少于当前档位的未弃牌玩家（按座位顺序）；扫过某位玩家的档位后把他移出
+    eligible = dict.fromkeys(p for p, _ in contributions if p in live)
+    changed = True              # 上一个池建立之后是否有人移出
+    pots = []
+    refund = None
+    prev = 0
+    carry = 0
+    n = len(order)
+    for i, (pid, amount) in enumerate(order):
+        if amount > prev:
+            layer = (amount - prev) * (n - i)
+            prev = amount
+            if i == n - 1:
+                # 没有人跟到这个档位：退还给投入者本人（即使已弃牌）
+                refund = Pot(layer, (pid,), True)
+            elif not eligible:
+                # 只有已弃牌的玩家投入到这个档位：并入相邻的池
+                if pots:
+                    pots[-1] = Pot(pots[-1].amount + layer, pots[-1].eligible)
+                else:
+                    carry += layer
+            elif pots and not changed:
+                pots[-1] = Pot(pots[-1].amount + layer, pots[-1].eligible)
+            else:
+                pots.append(Pot(layer + carry, tuple(eligible)))
+                carry = 0
+                changed = False
+        if pid in eligible:
+            del eligible[pid]
+            changed = True
+    if carry:
+        # 未弃牌的玩家都没有投入（正常牌局不会出现），由他们平分
+        pots.append(Pot(carry, tuple(p for p, _ in contributions if p in live)))
+    if refund is not None:
+        pots.append(refund)
+    return pots
+
+
+def award_pots(pots: list, scores: dict) -> tuple:
+    """
+    scores 为 {player_id: 牌力}。返回 (payouts, pot_winners)：
+    payouts 为 {player_id: 分得筹码}，pot_winners 为每个池的赢家 ID 元组（按座位顺序）。
+    """
+    payouts = {}
+    pot_winners = []
+    for pot in pots:
+        if not pot.eligible:
+            pot_winners.append(())
+            continue
+        if len(pot.eligible) == 1:
+            winners = pot.eligible
+        else:
+            best = max(scores[pid] for pid in pot.eligible)
+            winners = tuple(pid for pid in pot.eligible if scores[pid] == best)
+        share, odd = divmod(pot.amount, len(winners))
+        for k, pid in enumerate(winners):
+            payouts[pid] = payouts.get(pid, 0) + share + (1 if k < odd else 0)
+        pot_winners.append(winners)
+    return payouts, pot_winners
@@ -0,0 +1,258 @@
+"""
+无界面的牌局模拟器：用脚本策略在 PokerGame 规则引擎上连续打大量牌局。
+
+    python -m holdem.simulator --hands 1000000 --players 9 --workers 8
+    python -m holdem.simulator --hands 200000 --buyin 200 --big-blind 40 --strategies tight loose
+
+每个工作进程独立开若干张桌子，逐局调用 start_hand / act / advance_street / settle，
+与插件处理器走同一套规则。每局结束后检查筹码守恒，失败时报告随机种子和局号以便复现。
+输出总局数、hands/sec、摊牌比例、边池比例和各策略的净赢筹码，用于回归测试规则改动和调整盲注、买入配置。
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .deck import SeedSource
+from .evaluator import evaluate
+from .game import GameError, Player, PokerGame
+
+MAX_RAISES_PER_STREET = 3
+
+
+# ---------- 策略 ----------
+# 策略函数签名为 strategy(game, player, stack, rng) -> (行动, 加注额)
+
+def calling_station(game, player, stack, rng):
+    """能跟就跟，从不加注和弃牌"""
+    if player.round_bet >= game.current_bet:
+        return "check", 0
+    return "call", 0
+
+
+def random_player(game, player, stack, rng):
+    r = rng.random()
+    if r < 0.15:
+        return "fold", 0
+    if r < 0.25:
+        return "raise", game.big_blind * rng.randint(1, 3)
+    if r < 0.27:
+        return "allin", 0
+    return calling_station(game, player, stack, rng)
+
+
+def _strength(game, player) -> float:
+    """粗略牌力：翻牌前按起手牌类别，翻牌后按成牌类别，归一化到 0–1"""
+    if not game.community_cards:
+        c1, c2 = player.cards
+        hi, lo = max(c1 >> 2, c2 >> 2), min(c1 >> 2, c2 >> 2)
+        score = hi + lo + (13 if hi == lo else 0) + (2 if (c1 & 3) == (c2 & 3) else 0)
+        return score / 37
+    return (evaluate(player.cards + game.community_cards) >> 20) / 8
+
+
+def tight(game, player, stack, rng):
+    """只玩强牌：弱牌面对下注就弃，强牌加注"""
+    strength = _strength(game, player)
+    if strength > 0.6 and rng.random() < 0.5:
+        return "raise", game.big_blind
+    if player.round_bet >= game.current_bet:
+        return "check", 0
+    if strength < 0.35:
+        return "fold", 0
+    return "call", 0
+
+
+def loose(game, player, stack, rng):
+    """大部分牌都玩，较常加注，偶尔全下"""
+    strength = _strength(game, player)
+    if strength > 0.8 and rng.random() < 0.2:
+        return "allin", 0
+    if strength > 0.4 and rng.random() < 0.4:
+        return "raise", game.big_blind * 2
+    if player.round_bet < game.current_bet and strength < 0.15:
+        return "fold", 0
+    return calling_station(game, player, stack, rng)
+
+
+STRATEGIES = {
+    "calling_station": calling_station,
+    "random": random_player,
+    "tight": tight,
+    "loose": loose,
+}
+
+
+# ---------- 模拟 ----------
+class TableSim:
+    """一张桌子：玩家加入时付买入，筹码低于大盲时补充到初始筹码（记为一次补码）"""
+
+    def __init__(self, players: int, strategies: list, config: dict, rng: random.Random):
+        self.config = config
+        self.rng = rng
+        # 种子取自模拟器的随机数发生器，同一个 --seed 重现同样的牌
+        self.game = PokerGame(config["buyin"], config["small_blind"], config["big_blind"],
+                              config["bet_amount"], players, seeds=SeedSource(rng.randbytes))
+        self.stacks = {}
+        self.strategy = {}
+        self.invested = {}              # 每位玩家带上桌的全部筹码（初始 + 补码）
+        self.rebuys = 0
+        for k in range(players):
+            pid = f"p{k}"
+            self.strategy[pid] = strategies[k % len(strategies)]
+            self.invested[pid] = config["initial_token"]
+            # 与 /poker join 相同：买入直接进入彩池
+            self.stacks[pid] = config["initial_token"] - config["buyin"]
+            player = Player(pid, pid)
+            player.contributed = config["buyin"]
+            self.game.pot += config["buyin"]
+            self.game.add_player(player)
+
+    def _rebuy(self):
+        for pid, stack in self.stacks.items():
+            if stack < self.config["big_blind"]:
+                self.invested[pid] += self.config["initial_token"] - stack
+                self.stacks[pid] = self.config["initial_token"]
+                self.rebuys += 1
+
+    def _betting_round(self):
+        game, stacks = self.game, self.stacks
+        raises = 0
+        # 每位玩家每轮最多行动有限次，防止策略之间无限加注
+        for _ in range(len(game.players) * (MAX_RAISES_PER_STREET + 2)):
+            if game.betting_complete() or game.active_count <= 1:
+                return
+            player = game.current_player
+            if not player.active or player.all_in:
+                game.advance_turn()
+                continue
+            action, amount = STRATEGIES[self.strategy[player.id]](game, player, stacks[player.id], self.rng)
+            if action == "raise":
+                if raises >= MAX_RAISES_PER_STREET:
+                    action, amount = "call", 0
+                else:
+                    raises += 1
+            if action == "call" and player.round_bet >= game.current_bet:
+                action = "check"
+            try:
+                game.act(player.id, action, stacks, amount)
+            except GameError:
+                # 余额不足：有筹码就全下，否则弃牌
+                game.act(player.id, "allin" if stacks[player.id] > 0 else "fold", stacks)
+        # 达到行动上限仍未结束（理论上不会出现）：未跟满的玩家弃牌
+        for player in game.not_called():
+            game.fold(player)
+
+    def play_hand(self):
+        """打一局，返回 (是否摊牌, 池数)"""
+        game = self.game
+        if game.finished:
+            # 与 /poker continue 相同：换庄并收盲注；补码后每人至少有一个大盲
+            self._rebuy()
+            game.next_hand(self.stacks)
+        game.start_hand(self.stacks)
+        while True:
+            self._betting_round()
+            if game.active_count <= 1:
+                break
+            if game.advance_street() is None:
+                break
+        settlement = game.settle(self.stacks)
+        return game.active_count > 1, len(settlement.pots)
+
+    def check_chips(self) -> bool:
+        """桌上的筹码（余额 + 未结算的彩池）等于带上桌的筹码"""
+        in_play = sum(self.stacks.values()) + (0 if self.game.finished else self.game.pot)
+        return in_play == sum(self.invested.values())
+
+    def check_settled_once(self) -> bool:
+        """已结算的一局再次结算应当被拒绝，余额不变"""
+        before = dict(self.stacks)
+        try:
+            self.game.settle(self.stacks)
+        except GameError:
+            return self.stacks == before
+        return False
+
+
+def simulate_chunk(hands: int, players: int, strategies: list, config: dict, seed: int,
+                   hands_per_table: int = 1000) -> dict:
+    """在一个进程里打 hands 局，每 hands_per_table 局换一张新桌子"""
+    rng = random.Random(seed)
+    stats = {"hands": 0, "showdowns": 0, "side_pot_hands": 0, "rebuys": 0, "net": {}}
+    start = time.perf_counter()
+    while stats["hands"] < hands:
+        sim = TableSim(players, strategies, config, rng)
+        for _ in range(min(hands_per_table, hands - stats["hands"])):
+            hand_no = stats["hands"]
+            showdown, pots = sim.play_hand()
+            stats["hands"] += 1
+            stats["showdowns"] += showdown
+            stats["side_pot_hands"] += pots > 1
+            if not sim.check_chips():
+                raise AssertionError(f"筹码不守恒：种子 {seed}，第 {hand_no} 局")
+            if not sim.check_settled_once():
+                raise AssertionError(f"重复结算未被拒绝：种子 {seed}，第 {hand_no} 局")
+        stats["rebuys"] += sim.rebuys
+        for pid, stack in sim.stacks.items():
+            name = sim.strategy[pid]
+            stats["net"][name] = stats["net"].get(name, 0) + stack - sim.invested[pid]
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def simulate(hands: int, players: int = 6, strategies=("calling_station", "random", "tight", "loose"),
+             config: dict = None, workers: int = None, seed: int = None) -> dict:
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    workers = workers or os.cpu_count() or 1
+    seed = seed if seed is not None else random.randrange(1 << 32)
+    chunks = [hands // workers + (1 if k < hands % workers else 0) for k in range(workers)]
+    chunks = [c for c in chunks if c]
+    start = time.perf_counter()
+    if len(chunks) == 1:
+        results = [simulate_chunk(chunks[0], players, list(strategies), config, seed)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [pool.submit(simulate_chunk, c, players, list(strategies), config, seed + k)
+                       for k, c in enumerate(chunks)]
+            results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+    total = {"hands": 0, "showdowns": 0, "side_pot_hands": 0, "rebuys": 0, "net": {}}
+    for r in results:
+        for key in ("hands", "showdowns", "side_pot_hands", "rebuys"):
+            total[key] += r[key]
+        for name, net in r["net"].items():
+            total["net"][name] = total["net"].get(name, 0) + net
+    total.update(elapsed=elapsed, hands_per_sec=total["hands"] / elapsed if elapsed else 0.0,
+                 workers=len(chunks), seed=seed)
+    return total
+
+
+DEFAULT_CONFIG = {"buyin": 100, "small_blind": 10, "big_blind": 20, "bet_amount": 20, "initial_token": 1000}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holdem.simulator", description="德州扑克牌局模拟器")
+    parser.add_argument("--hands", type=int, default=100000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--seed", type=int)
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument("--" + key.replace("_", "-"), type=int, default=value)
+    args = parser.parse_args(argv)
+    config = {key: getattr(args, key) for key in DEFAULT_CONFIG}
+    result = simulate(args.hands, args.players, args.strategies, config, args.workers, args.seed)
+    print(f"{result['hands']:,} 局，{result['workers']} 个进程，耗时 {result['elapsed']:.1f}s，"
+          f"{result['hands_per_sec']:,.0f} hands/sec（种子 {result['seed']}）")
+    print(f"摊牌 {result['showdowns'] / result['hands']:.1%}，出现边池 {result['side_pot_hands'] / result['hands']:.1%}，"
+          f"补码 {result['rebuys']:,} 次")
+    for name, net in sorted(result["net"].items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<16} 净赢 {net:+,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
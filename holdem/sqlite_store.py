@@ -0,0 +1,222 @@
+"""
+SQLite 存储后端：余额、牌局记录、每位玩家的牌局结果和排行榜。
+
+余额接口与 TokenJournal 相同（load / attach / record / prepare_commit / commit / close），
+可以直接挂到 BalanceBook 上：余额变动先在内存中合并，commit 时每个用户一条单行 UPSERT 并提交事务。
+连接允许跨线程使用，所有访问都持有同一把锁，写入可以交给后台线程执行。
+"""
+import itertools
+import json
+import os
+import sqlite3
+import threading
+
+from .history import iter_jsonl
+from .journal import TokenJournal
+from .leaderboard import RankJournal
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    group_id TEXT NOT NULL,
+    user_id  TEXT NOT NULL,
+    balance  INTEGER NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS hands (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id        TEXT NOT NULL,
+    phase           TEXT,
+    pot             INTEGER NOT NULL,
+    community_cards TEXT NOT NULL,
+    winners         TEXT NOT NULL,
+    timestamp       INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_hands_group ON hands (group_id, id);
+CREATE TABLE IF NOT EXISTS hand_players (
+    hand_id   INTEGER NOT NULL REFERENCES hands (id),
+    user_id   TEXT NOT NULL,
+    name      TEXT,
+    final_bet INTEGER,
+    hand      TEXT,
+    active    INTEGER,
+    hand_rank INTEGER,
+    won       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hand_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_hand_players_user ON hand_players (user_id, hand_id);
+CREATE TABLE IF NOT EXISTS rank_stats (
+    scope        TEXT NOT NULL,
+    user_id      TEXT NOT NULL,
+    name         TEXT,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    wins         INTEGER NOT NULL DEFAULT 0,
+    net          INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_rank_stats_wins ON rank_stats (scope, wins DESC);
+CREATE INDEX IF NOT EXISTS idx_rank_stats_net ON rank_stats (scope, net DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self._pending = {}      # (group_id, user_id) -> 尚未写入的最新余额
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # 早期版本只有全局的 leaderboard 表，合并进 rank_stats 的全局范围
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leaderboard'").fetchone():
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO rank_stats (scope, user_id, name, games_played, wins) "
+                    "SELECT '', user_id, name, games_played, wins FROM leaderboard")
+                self.conn.execute("DROP TABLE leaderboard")
+        self.conn.commit()
+
+    # ---------- 余额（与 TokenJournal 相同的接口） ----------
+    def load(self) -> dict:
+        balances = {}
+        for group_id, user_id, balance in self.conn.execute("SELECT group_id, user_id, balance FROM balances"):
+            balances.setdefault(group_id, {})[user_id] = balance
+        return balances
+
+    def attach(self, balances: dict):
+        pass
+
+    def record(self, group_id: str, user_id: str, balance: int):
+        self._pending[(group_id, user_id)] = balance
+
+    def prepare_commit(self, hand_end: bool = False):
+        if not self._pending:
+            return None
+        rows, self._pending = self._pending, {}
+
+        def write():
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT INTO balances (group_id, user_id, balance) VALUES (?, ?, ?) "
+                    "ON CONFLICT (group_id, user_id) DO UPDATE SET balance = excluded.balance",
+                    [(g, u, b) for (g, u), b in rows.items()])
+        return write
+
+    def commit(self, hand_end: bool = False):
+        write = self.prepare_commit(hand_end)
+        if write is not None:
+            write()
+
+    def sync(self):
+        self.commit()
+
+    def close(self):
+        self.commit()
+        with self.lock:
+            self.conn.close()
+
+    # ---------- 牌局记录 ----------
+    def _insert_hand(self, record: dict) -> int:
+        winner_ids = {w[0] for w in record["winners"]}
+        cur = self.conn.execute(
+            "INSERT INTO hands (group_id, phase, pot, community_cards, winners, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            (record["group_id"], record.get("phase"), record["pot"],
+             json.dumps(record["community_cards"], ensure_ascii=False),
+             json.dumps(record["winners"], ensure_ascii=False), record["timestamp"]))
+        hand_id = cur.lastrowid
+        rows = []
+        for p in record["players"]:
+            hand_rank = p.get("hand_rank")
+            if hand_rank is not None and not isinstance(hand_rank, int):
+                # 旧记录中的牌力是元组，原样保存为 JSON 文本
+                hand_rank = json.dumps(hand_rank)
+            rows.append((hand_id, p["id"], p["name"], p.get("final_bet"),
+                         json.dumps(p.get("hand"), ensure_ascii=False), int(bool(p.get("active"))),
+                         hand_rank, int(p["id"] in winner_ids)))
+        self.conn.executemany(
+            "INSERT INTO hand_players (hand_id, user_id, name, final_bet, hand, active, hand_rank, won) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return hand_id
+
+    def append_hand(self, record: dict) -> int:
+        with self.lock, self.conn:
+            return self._insert_hand(record)
+
+    def _hand_record(self, row) -> dict:
+        hand_id, group_id, phase, pot, community_cards, winners, timestamp = row
+        players = [
+            {"id": user_id, "name": name, "final_bet": final_bet, "hand": json.loads(hand),
+             "active": bool(active), "hand_rank": hand_rank}
+            for user_id, name, final_bet, hand, active, hand_rank in self.conn.execute(
+                "SELECT user_id, name, final_bet, hand, active, hand_rank FROM hand_players WHERE hand_id = ?",
+                (hand_id,))
+        ]
+        return {"id": hand_id, "group_id": group_id, "phase": phase, "pot": pot,
+                "community_cards": json.loads(community_cards), "players": players,
+                "winners": json.loads(winners), "timestamp": timestamp}
+
+    def recent_hands(self, group_id: str, limit: int, offset: int = 0) -> list:
+        """按时间倒序返回本群的牌局记录"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, group_id, phase, pot, community_cards, winners, timestamp FROM hands "
+                "WHERE group_id = ? ORDER BY id DESC LIMIT ? OFFSET ?", (group_id, limit, offset)).fetchall()
+            return [self._hand_record(row) for row in rows]
+
+    def count_hands(self, group_id: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM hands WHERE group_id = ?", (group_id,)).fetchone()[0]
+
+    # ---------- 排行榜 ----------
+    def save_rank_stats(self, rows: list):
+        """rows 为 [(范围, user_id, 统计), ...]，每行一次单行 UPSERT；全局范围为空字符串"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO rank_stats (scope, user_id, name, games_played, wins, net) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (scope, user_id) DO UPDATE SET name = excluded.name, "
+                "games_played = excluded.games_played, wins = excluded.wins, net = excluded.net",
+                [(scope, user_id, st["name"], st["games_played"], st["wins"], st["net"])
+                 for scope, user_id, st in rows])
+
+    def load_rank_stats(self) -> dict:
+        """返回 {范围: {user_id: 统计}}"""
+        scopes = {}
+        for scope, user_id, name, games_played, wins, net in self.conn.execute(
+                "SELECT scope, user_id, name, games_played, wins, net FROM rank_stats"):
+            scopes.setdefault(scope, {})[user_id] = {"name": name, "games_played": games_played,
+                                                     "wins": wins, "net": net}
+        return scopes
+
+    # ---------- 从 JSON 文件迁移 ----------
+    def migrate_from_json(self, tokens_file: str, journal_file: str, records_file: str, history_file: str,
+                          ranking_file: str, ranking_journal_file: str) -> bool:
+        """
+        一次性导入旧的 tokens.json（含余额日志）、game_records.json / game_records.jsonl 和 ranking.json（含排行日志）。
+        已迁移过则直接返回 False；原文件保留不动。
+        """
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+            return False
+        balances = TokenJournal(tokens_file, journal_file).load()
+        records = []
+        if os.path.exists(records_file):
+            with open(records_file, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        ranking = RankJournal(ranking_file, ranking_journal_file).load().to_dict()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO balances (group_id, user_id, balance) VALUES (?, ?, ?)",
+                [(g, u, b) for g, users in balances.items() for u, b in users.items()])
+            scopes = {"": ranking["global"], **ranking["groups"]}
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rank_stats (scope, user_id, name, games_played, wins, net) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(scope, pid, info.get("name"), info.get("games_played", 0), info.get("wins", 0), info.get("net", 0))
+                 for scope, users in scopes.items() for pid, info in users.items()])
+            for record in itertools.chain(records, iter_jsonl(history_file)):
+                self._insert_hand(record)
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from_json', '1')")
+        return True
@@ -0,0 +1,207 @@
+"""
+列式的玩家统计库：每局结算后为每位真人玩家追加一行事实，按列存放在 stats/ 目录下。
+
+    hand        牌局编号                    group       群 ID 哈希
+    player      用户 ID 哈希                time        结算时间戳
+    stakes      大盲注                      seats       本局人数
+    position    座位（0 为小盲、1 为大盲，依次往后，最后一位是庄家）
+    street      看到的最后一条街（0 翻牌前、1 翻牌、2 转牌、3 河牌）
+    vpip        翻牌前是否主动入池          showdown    是否参与摊牌
+    invested    本局投入                    won         本局分得
+    category    摊牌时的牌型类别（0 高牌 … 8 同花顺），未摊牌为 -1
+
+每一列是一个 ``<列名>.col`` 文件，内容是小端定长整数的连续数组，只追加不修改：
+写入线程把一批新行依次追加到各列末尾，启动时各列截到相同行数（丢弃没写完的行）。
+
+查询时把列文件以只读方式映射到内存，不解析任何记录。安装了 numpy 时每列是一个 np.memmap，
+用布尔掩码和 count_nonzero / sum 一次算出 VPIP、胜率、净赢筹码和摊牌率，数百万行只需几毫秒；
+否则退回 mmap 上的 memoryview 逐行累加。文件大小不变时复用上次的映射。
+
+    python -m holdem.stats <目录> [行数]     写入随机数据并测量一次查询的耗时
+"""
+import mmap
+import os
+import random
+import sys
+import time
+from array import array
+
+from .evaluator import hand_category, np
+from .history import group_key as id_key
+
+COLUMNS = (
+    ("hand", "Q"), ("group", "Q"), ("player", "Q"), ("time", "I"), ("stakes", "I"),
+    ("seats", "B"), ("position", "B"), ("street", "B"), ("vpip", "B"), ("showdown", "B"),
+    ("invested", "q"), ("won", "q"), ("category", "b"),
+)
+STREETS = ("preflop", "flop", "turn", "river")
+
+
+def hand_facts(group_id: str, game, payouts: dict, scores: dict, now: float = None) -> list:
+    """结算后的一局拆成每位真人玩家一行，列顺序同 COLUMNS"""
+    group = id_key(group_id)
+    stamp = int(time.time() if now is None else now)
+    showdown = len(scores) > 1
+    rows = []
+    for position, p in enumerate(game.players):
+        if p.bot_level:
+            continue
+        phase = game.phase if p.active else p.folded_on
+        street = STREETS.index(phase) if phase in STREETS else 0
+        score = scores.get(p.id) if showdown else None
+        rows.append((game.hand_id, group, id_key(p.id), stamp, game.big_blind,
+                     len(game.players), position, street, int(p.voluntary), int(score is not None),
+                     p.contributed, payouts.get(p.id, 0), hand_category(score) if score is not None else -1))
+    return rows
+
+
+class StatsStore:
+    def __init__(self, directory: str):
+        if sys.byteorder != "little":
+            raise ValueError("统计库仅支持小端平台")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._pending = [array(code) for _, code in COLUMNS]   # 待写入的新行，按列
+        self._files = None                  # 各列的追加句柄，只在写入线程中使用
+        self._maps = {}                     # 列名 -> (映射时的文件大小, 数组)
+        self._repair()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.col")
+
+    def _repair(self):
+        """创建缺少的列文件，各列截到最短一列的行数，丢弃上次中断时写了一半的行"""
+        sizes = {}
+        for name, code in COLUMNS:
+            path = self._path(name)
+            sizes[name] = os.path.getsize(path) if os.path.exists(path) else 0
+        rows = min(size // array(code).itemsize for (name, code), size in zip(COLUMNS, sizes.values()))
+        for name, code in COLUMNS:
+            usable = rows * array(code).itemsize
+            if sizes[name] != usable or not os.path.exists(self._path(name)):
+                with open(self._path(name), "ab") as f:
+                    f.truncate(usable)
+
+    # ---------- 写入 ----------
+    def add(self, rows: list):
+        for row in rows:
+            for column, value in zip(self._pending, row):
+                column.append(value)
+
+    def prepare(self):
+        """在事件循环中取出待写入的行，返回写入函数（交给 PersistenceWorker）"""
+        if not self._pending[0]:
+            return None
+        chunks = [column.tobytes() for column in self._pending]
+        self._pending = [array(code) for _, code in COLUMNS]
+        return lambda: self._write(chunks)
+
+    def _write(self, chunks: list) -> int:
+        if self._files is None:
+            self._files = [open(self._path(name), "ab") for name, _ in COLUMNS]
+        for f, chunk in zip(self._files, chunks):
+            f.write(chunk)
+            f.flush()
+        return sum(len(chunk) for chunk in chunks)
+
+    def close(self):
+        if self._files is not None:
+            for f in self._files:
+                f.close()
+            self._files = None
+        self._maps.clear()
+
+    # ---------- 查询 ----------
+    def _column(self, name: str, code: str):
+        size = os.path.getsize(self._path(name))
+        cached = self._maps.get(name)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        itemsize = array(code).itemsize
+        if not size:
+            column = np.zeros(0, dtype=code) if np is not None else memoryview(b"").cast(code)
+        elif np is not None:
+            column = np.memmap(self._path(name), dtype="<" + code, mode="r", shape=(size // itemsize,))
+        else:
+            with open(self._path(name), "rb") as f:
+                column = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(code)
+        self._maps[name] = (size, column)
+        return column
+
+    def columns(self) -> dict:
+        """列名 -> 只读数组，各列截到相同行数（写入线程可能正写到一半）"""
+        columns = {name: self._column(name, code) for name, code in COLUMNS}
+        rows = min(len(column) for column in columns.values())
+        return {name: column[:rows] for name, column in columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.columns()["hand"])
+
+    def player_stats(self, player_id: str, group_id: str = None) -> dict:
+        """
+        汇总一位玩家（group_id 不为空时只算该群）的统计：
+        局数、主动入池、获胜（分得筹码）、摊牌及摊牌获胜的局数、看到翻牌的局数和净赢筹码。
+        """
+        c = self.columns()
+        player = id_key(player_id)
+        group = id_key(group_id) if group_id else None
+        if np is not None:
+            mask = c["player"] == player
+            if group is not None:
+                mask &= c["group"] == group
+            won = c["won"][mask]
+            wins = won > 0
+            showdown = c["showdown"][mask].astype(bool)
+            return {
+                "hands": int(np.count_nonzero(mask)),
+                "vpip": int(np.count_nonzero(c["vpip"][mask])),
+                "wins": int(np.count_nonzero(wins)),
+                "showdowns": int(np.count_nonzero(showdown)),
+                "showdown_wins": int(np.count_nonzero(showdown & wins)),
+                "flops": int(np.count_nonzero(c["street"][mask])),
+                "net": int(won.sum()) - int(c["invested"][mask].sum()),
+            }
+        result = dict.fromkeys(("hands", "vpip", "wins", "showdowns", "showdown_wins", "flops", "net"), 0)
+        for k in range(len(c["player"])):
+            if c["player"][k] != player or (group is not None and c["group"][k] != group):
+                continue
+            won = c["won"][k]
+            result["hands"] += 1
+            result["vpip"] += c["vpip"][k]
+            result["wins"] += won > 0
+            result["showdowns"] += c["showdown"][k]
+            result["showdown_wins"] += c["showdown"][k] and won > 0
+            result["flops"] += c["street"][k] > 0
+            result["net"] += won - c["invested"][k]
+        return result
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("用法: python -m holdem.stats <目录> [行数]")
+        return 2
+    store = StatsStore(argv[0])
+    rows = int(argv[1]) if len(argv) > 1 else 1_000_000
+    rng = random.Random(0)
+    players = [id_key(f"user{k}") for k in range(1000)]
+    groups = [id_key(f"group{k}") for k in range(50)]
+    for start in range(0, rows, 100_000):
+        batch = []
+        for k in range(start, min(start + 100_000, rows)):
+            street = rng.randrange(4)
+            showdown = street == 3 and rng.random() < 0.5
+            batch.append((k, rng.choice(groups), rng.choice(players), 0, 20, 6, rng.randrange(6), street,
+                          rng.random() < 0.3, showdown, rng.randrange(200), rng.randrange(400) * (rng.random() < 0.2),
+                          rng.randrange(9) if showdown else -1))
+        store.add(batch)
+        store.prepare()()
+    begin = time.perf_counter()
+    stats = store.player_stats("user0")
+    print(f"{len(store)} 行，查询 user0 用时 {(time.perf_counter() - begin) * 1000:.1f}ms：{stats}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+行动限时：所有牌桌共用一个分层时间轮，以及在它之上的每桌行动计时（含时间银行）。
+
+TimerWheel 把时间切成 tick 秒一格，第 0 层 slots 格，每往上一层每格覆盖的时间乘以 slots
+（默认 0.5 秒 × 64 格，四层可以覆盖约 97 天）。每个槽是一个集合：
+
+    schedule(delay, callback, *args)    按到期刻度放进对应层的槽，O(1)
+    cancel(timer)                       从所在的槽中删除，O(1)
+
+每走一格只看第 0 层的一个槽；第 0 层转满一圈时把上一层对应槽里的定时器按剩余时间重新放入低层。
+整个时间轮只有一个后台任务，没有定时器时不再醒来，因此成千上万张空闲牌桌几乎没有开销，
+也不会为每个待行动的玩家各开一个 asyncio.sleep。回调返回协程时另起一个任务运行。
+
+TurnClock 记录每张牌桌当前轮到谁：轮到真人时 start()，状态变化时重新 start() 或 stop()。
+超过 limit 秒还没行动时先动用该玩家的时间银行（剩余秒数），用完后调用 on_timeout，由调用方替玩家看牌或弃牌。
+时间银行按 (bank_key, 玩家) 记账，只扣除超出 limit 的部分。
+"""
+import asyncio
+import math
+import time
+
+
+class Timer:
+    __slots__ = ("expires", "callback", "args", "bucket")
+
+    def __init__(self, expires: int, callback, args: tuple):
+        self.expires = expires      # 到期的刻度
+        self.callback = callback
+        self.args = args
+        self.bucket = None          # 所在的槽，已到期或已取消时为 None
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 0.5, slots: int = 64, levels: int = 4, clock=time.monotonic):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._origin = clock()
+        self._current = 0           # 已经处理到的刻度
+        self.count = 0              # 未到期的定时器数
+        self.fired = 0
+        self._task = None
+        self._wakeup = None
+        self._running = set()
+
+    def _now(self) -> int:
+        return int((self.clock() - self._origin) / self.tick)
+
+    # ---------- 定时器 ----------
+    def schedule(self, delay: float, callback, *args) -> Timer:
+        if not self.count:
+            # 空闲期间不走格，直接对齐到当前时刻
+            self._current = max(self._current, self._now())
+        timer = Timer(self._now() + max(1, math.ceil(delay / self.tick)), callback, args)
+        self._place(timer)
+        self.count += 1
+        self.ensure_running()
+        if self.count == 1 and self._wakeup is not None:
+            self._wakeup.set()
+        return timer
+
+    def cancel(self, timer: Timer):
+        if timer is not None and timer.bucket is not None:
+            timer.bucket.discard(timer)
+            timer.bucket = None
+            self.count -= 1
+
+    def remaining(self, timer: Timer) -> float:
+        """距到期的秒数（按刻度计）"""
+        return max(timer.expires * self.tick + self._origin - self.clock(), 0.0)
+
+    def _place(self, timer: Timer):
+        delta = timer.expires - self._current
+        level, unit = 0, 1
+        while delta >= unit * self.slots and level < self.levels - 1:
+            level += 1
+            unit *= self.slots
+        bucket = self._wheels[level][(timer.expires // unit) % self.slots]
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def advance(self) -> list:
+        """走到当前时刻，返回到期的定时器"""
+        target = self._now()
+        if not self.count:
+            self._current = max(self._current, target)
+            return []
+        due = []
+        slots = self.slots
+        while self._current < target and self.count > len(due):
+            self._current += 1
+            tick = self._current
+            # 低层转满一圈时，从高到低把上一层对应槽里的定时器放回低层
+            unit = slots ** (self.levels - 1)
+            for level in range(self.levels - 1, 0, -1):
+                if tick % unit == 0:
+                    bucket = self._wheels[level][(tick // unit) % slots]
+                    if bucket:
+                        moved = list(bucket)
+                        bucket.clear()
+                        for timer in moved:
+                            self._place(timer)
+                unit //= slots
+            bucket = self._wheels[0][tick % slots]
+            if bucket:
+                for timer in bucket:
+                    timer.bucket = None
+                due.extend(bucket)
+                bucket.clear()
+        if self.count == len(due):
+            self._current = max(self._current, target)
+        self.count -= len(due)
+        return due
+
+    # ---------- 后台任务 ----------
+    def ensure_running(self):
+        """在事件循环中启动后台任务；没有运行中的事件循环时（如插件初始化）留到下次调用"""
+        if self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            if not self.count:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            # 睡到下一格的边界
+            await asyncio.sleep(max((self._current + 1) * self.tick + self._origin - self.clock(), 0))
+            for timer in self.advance():
+                self.fired += 1
+                try:
+                    result = timer.callback(*timer.args)
+                    if asyncio.iscoroutine(result):
+                        task = asyncio.get_running_loop().create_task(result)
+                        self._running.add(task)
+                        task.add_done_callback(self._done)
+                except Exception as e:
+                    print("定时器回调失败:", e)
+
+    def _done(self, task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print("定时器回调失败:", task.exception())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._running:
+            task.cancel()
+        self._running.clear()
+
+
+class Turn:
+    __slots__ = ("table", "player_id", "bank_key", "started", "banked", "timer")
+
+    def __init__(self, table: str, player_id: str, bank_key: str, started: float):
+        self.table = table
+        self.player_id = player_id
+        self.bank_key = bank_key
+        self.started = started
+        self.banked = False         # 是否已在动用时间银行
+        self.timer = None
+
+
+class TurnClock:
+    def __init__(self, wheel: TimerWheel, limit: float, bank: float, on_bank, on_timeout):
+        self.wheel = wheel
+        self.limit = limit          # 每次行动的基本时限（秒）
+        self.bank = bank            # 每位玩家的时间银行（秒）
+        self.on_bank = on_bank      # on_bank(turn, 秒数)：开始动用时间银行
+        self.on_timeout = on_timeout    # on_timeout(turn)：时间银行也用完
+        self.turns = {}             # 牌桌 -> Turn
+        self.banks = {}             # (bank_key, 玩家) -> 剩余秒数，未出现时为 bank
+
+    def start(self, table: str, player_id: str, bank_key: str):
+        self.stop(table)
+        turn = self.turns[table] = Turn(table, player_id, bank_key, self.wheel.clock())
+        turn.timer = self.wheel.schedule(self.limit, self._expired, turn)
+
+    def stop(self, table: str):
+        turn = self.turns.pop(table, None)
+        if turn is None:
+            return
+        self.wheel.cancel(turn.timer)
+        if turn.banked:
+            used = self.wheel.clock() - turn.started - self.limit
+            key = (turn.bank_key, turn.player_id)
+            self.banks[key] = max(self.banks.get(key, self.bank) - used, 0)
+
+    def bank_left(self, bank_key: str, player_id: str) -> float:
+        return self.banks.get((bank_key, player_id), self.bank)
+
+    def remaining(self, table: str):
+        """当前行动剩余的秒数（含已在动用的时间银行），没有计时时返回 None"""
+        turn = self.turns.get(table)
+        return self.wheel.remaining(turn.timer) if turn is not None else None
+
+    def forget(self, bank_key: str):
+        """牌桌结束后清除该桌的时间银行"""
+        for key in [key for key in self.banks if key[0] == bank_key]:
+            del self.banks[key]
+
+    def _expired(self, turn: Turn):
+        if self.turns.get(turn.table) is not turn:
+            return None
+        left = self.bank_left(turn.bank_key, turn.player_id)
+        if not turn.banked and left > 0:
+            turn.banked = True
+            turn.timer = self.wheel.schedule(left, self._expired, turn)
+            return self.on_bank(turn, left)
+        del self.turns[turn.table]
+        self.banks[(turn.bank_key, turn.player_id)] = 0
+        return self.on_timeout(turn)
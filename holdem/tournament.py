@@ -0,0 +1,231 @@
+"""
+多桌锦标赛：报名、分桌、升盲、淘汰、平衡与拆桌，不依赖 AstrBot。
+
+每个群同时最多一场锦标赛。开赛时把报名玩家随机分到 ceil(人数 / 每桌人数) 张牌桌，
+每张牌桌是一个普通的 PokerGame，在 GameCache 中的键为 ``<群号>#T<桌号>``。
+锦标赛筹码记在 Tournament.stacks 中，与群内代币余额分开；报名费汇入奖池，结束时按名次发放代币。
+
+盲注每 level_seconds 秒升一级，大盲按 growth 倍增长并取整到两位有效数字，
+新的盲注在各桌下一局开始时生效。
+
+每局结算后：
+    筹码为 0 的玩家被淘汰，同一局淘汰的玩家按本局开始时筹码多少排定名次；
+    rebalance(idle) 只调整当前空闲（两局之间）的牌桌，
+        剩余人数坐得下更少的牌桌时拆掉人数最少的一桌，玩家坐到人数最少的其他牌桌，
+        各桌人数相差超过 1 时从人多的桌挪一人到人少的桌；
+    剩余人数不超过每桌人数时，其他牌桌依次拆掉并入最后一桌，即决赛桌；
+    只剩一人时锦标赛结束。
+"""
+import random
+import time
+
+from .game import GameError
+
+def nice_blind(amount: float) -> int:
+    """取整到两位有效数字"""
+    amount = int(round(amount))
+    magnitude = 10 ** max(len(str(amount)) - 2, 0)
+    return max(int(round(amount / magnitude)) * magnitude, 1)
+
+
+def table_key(group_id: str, table: int) -> str:
+    return f"{group_id}#T{table}"
+
+
+def parse_key(key: str):
+    """锦标赛牌桌的键返回 (群号, 桌号)，否则返回 None"""
+    group_id, sep, table = key.rpartition("#T")
+    if not sep or not table.isdigit():
+        return None
+    return group_id, int(table)
+
+
+class Tournament:
+    def __init__(self, group_id: str, origin: str, buyin: int, starting_stack: int, table_size: int,
+                 small_blind: int, big_blind: int, level_seconds: float, growth: float, payouts: list):
+        self.group_id = group_id
+        self.origin = origin                # 公告发送到的会话（开赛的群）
+        self.buyin = buyin                  # 报名费（代币），全部进入奖池
+        self.starting_stack = starting_stack
+        self.table_size = table_size
+        self.small_blind = small_blind      # 第一级盲注
+        self.big_blind = big_blind
+        self.level_seconds = level_seconds
+        self.growth = growth                # 每级大盲的增长倍数
+        self.payouts = payouts              # 各名次分得奖池的百分比
+        self.state = "registering"
+        self.entrants = {}                  # 用户 ID -> [昵称, 私信 session]，按报名顺序
+        self.stacks = {}                    # 用户 ID -> 锦标赛筹码
+        self.tables = {}                    # 桌号 -> [用户 ID, ...]
+        self.places = {}                    # 用户 ID -> 名次（已淘汰或结束）
+        self.level = 0
+        self.level_ends = 0.0
+        self.started = 0.0
+        self.timer = None                   # 升盲的定时任务（Scheduler 句柄，不保存）
+        self._table_of = {}                 # 用户 ID -> 桌号
+
+    # ---------- 报名 ----------
+    @property
+    def prize_pool(self) -> int:
+        return self.buyin * len(self.entrants)
+
+    def register(self, player_id: str, name: str, private_unified: str = ""):
+        if self.state != "registering":
+            raise GameError("锦标赛已经开始，不能再报名。")
+        if player_id in self.entrants:
+            raise GameError("你已经报名了本场锦标赛。")
+        self.entrants[player_id] = [name, private_unified]
+
+    def name(self, player_id: str) -> str:
+        return self.entrants[player_id][0]
+
+    def start(self, now: float = None, rng=random):
+        """随机分桌，返回 {桌号: [用户 ID, ...]}"""
+        if self.state != "registering":
+            raise GameError("锦标赛已经开始了。")
+        if len(self.entrants) < 2:
+            raise GameError("至少需要2名玩家报名才能开始锦标赛。")
+        players = list(self.entrants)
+        rng.shuffle(players)
+        count = -(-len(players) // self.table_size)
+        self.tables = {no: players[no - 1::count] for no in range(1, count + 1)}
+        self.stacks = {pid: self.starting_stack for pid in players}
+        self.state = "running"
+        self.started = time.time() if now is None else now
+        self.level_ends = self.started + self.level_seconds
+        self._reindex()
+        return self.tables
+
+    # ---------- 盲注 ----------
+    def blinds(self, level: int = None):
+        """(小盲, 大盲)"""
+        level = self.level if level is None else level
+        if level == 0:
+            return self.small_blind, self.big_blind
+        big = nice_blind(self.big_blind * self.growth ** level)
+        return max(big * self.small_blind // self.big_blind, 1), big
+
+    def advance_level(self):
+        self.level += 1
+        self.level_ends += self.level_seconds
+
+    # ---------- 座位 ----------
+    def _reindex(self):
+        self._table_of = {pid: no for no, pids in self.tables.items() for pid in pids}
+
+    def table_of(self, player_id: str):
+        return self._table_of.get(player_id)
+
+    def key(self, table: int) -> str:
+        return table_key(self.group_id, table)
+
+    @property
+    def remaining(self) -> int:
+        return len(self._table_of)
+
+    def bust(self, busted: list) -> list:
+        """
+        busted 为 [(用户 ID, 本局开始时的筹码), ...]，从所在牌桌移除并排定名次，
+        返回 [(用户 ID, 名次), ...]。开局筹码多的名次靠前。
+        """
+        place = self.remaining
+        result = []
+        for pid, _ in sorted(busted, key=lambda b: b[1]):
+            table = self._table_of.pop(pid)
+            self.tables[table].remove(pid)
+            self.places[pid] = place
+            result.append((pid, place))
+            place -= 1
+        if self.remaining == 1:
+            winner = next(iter(self._table_of))
+            self.places[winner] = 1
+            self.state = "finished"
+        return result
+
+    def _move(self, pid: str, src: int, dst: int, moves: list):
+        self.tables[src].remove(pid)
+        self.tables[dst].append(pid)
+        self._table_of[pid] = dst
+        moves.append((pid, src, dst))
+
+    def rebalance(self, idle) -> tuple:
+        """
+        在空闲的牌桌（idle 为桌号集合）之间换桌，返回 (换桌 [(用户 ID, 原桌, 新桌), ...], 拆掉的桌号)。
+        正在进行一局的牌桌不动，它们结束本局后会再调用一次。
+        """
+        moves, broken = [], []
+        size = self.table_size
+        needed = -(-self.remaining // size)
+        while len(self.tables) > needed:
+            candidates = [no for no in self.tables if no in idle]
+            if not candidates:
+                break
+            victim = min(candidates, key=lambda no: (len(self.tables[no]), -no))
+            targets = [no for no in candidates if no != victim]
+            if sum(size - len(self.tables[no]) for no in targets) < len(self.tables[victim]):
+                break
+            for pid in list(self.tables[victim]):
+                dst = min((no for no in targets if len(self.tables[no]) < size),
+                          key=lambda no: (len(self.tables[no]), no))
+                self._move(pid, victim, dst, moves)
+            del self.tables[victim]
+            broken.append(victim)
+        while True:
+            candidates = [no for no in self.tables if no in idle]
+            if len(candidates) < 2:
+                break
+            big = max(candidates, key=lambda no: (len(self.tables[no]), -no))
+            small = min(candidates, key=lambda no: (len(self.tables[no]), no))
+            if len(self.tables[big]) - len(self.tables[small]) <= 1:
+                break
+            self._move(self.tables[big][-1], big, small, moves)
+        return moves, broken
+
+    # ---------- 奖金 ----------
+    def prizes(self) -> list:
+        """[(用户 ID, 名次, 代币), ...]，按名次；名额不超过报名人数，百分比在获奖名次间重新归一"""
+        shares = self.payouts[:len(self.entrants)]
+        total = sum(shares)
+        if not total:
+            return []
+        ranked = sorted(self.places.items(), key=lambda item: item[1])
+        result = []
+        for k, share in enumerate(shares):
+            if k >= len(ranked):
+                break
+            pid, place = ranked[k]
+            amount = self.prize_pool * share // total
+            if k == 0:
+                # 取整的零头归冠军
+                amount = self.prize_pool - sum(self.prize_pool * s // total for s in shares[1:])
+            result.append((pid, place, amount))
+        return result
+
+    # ---------- 快照 ----------
+    def to_dict(self) -> dict:
+        return {
+            "config": [self.group_id, self.origin, self.buyin, self.starting_stack, self.table_size,
+                       self.small_blind, self.big_blind, self.level_seconds, self.growth, self.payouts],
+            "state": self.state,
+            "entrants": self.entrants,
+            "stacks": self.stacks,
+            "tables": {str(no): pids for no, pids in self.tables.items()},
+            "places": self.places,
+            "level": self.level,
+            "level_ends": self.level_ends,
+            "started": self.started,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        tournament = cls(*data["config"])
+        tournament.state = data["state"]
+        tournament.entrants = data["entrants"]
+        tournament.stacks = data["stacks"]
+        tournament.tables = {int(no): pids for no, pids in data["tables"].items()}
+        tournament.places = data["places"]
+        tournament.level = data["level"]
+        tournament.level_ends = data["level_ends"]
+        tournament.started = data["started"]
+        tournament._reindex()
+        return tournament
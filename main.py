@@ -1,58 +1,44 @@
-import itertools
 from astrbot.api.all import *
 from astrbot.core.platform.sources.gewechat.client import SimpleGewechatClient
-import random
+from .holdem.actionlog import ActionLog, replay_lines
+from .holdem.actors import TableActors
+from .holdem.bot import LEVELS as BOT_LEVELS, BotView, decide
+from .holdem.cards import card_str, cards_str
+from .holdem.delivery import deliver
+from .holdem.equity import estimate_equity, exact_runouts
+from .holdem.evaluator import evaluate, hand_name
+from .holdem.game import FINISHED, GameError, Player, PokerGame
+from .holdem.gamecache import GameCache
+from .holdem.history import HandHistory
+from .holdem.journal import BalanceBook, TokenJournal
+from .holdem.leaderboard import GLOBAL, Leaderboard, RankJournal
+from .holdem.metrics import Metrics
+from .holdem.persistence import PersistenceWorker, atomic_write
+from .holdem.profiler import MODES as PROFILE_MODES, Profiler
+from .holdem.render import AVAILABLE as RENDER_AVAILABLE, CardRenderer
+from .holdem.scheduler import Scheduler
+from .holdem.sqlite_store import SQLiteStore
+from .holdem.stats import StatsStore, hand_facts
+from .holdem.preflop import LIVE_SAMPLES, MAX_OPPONENTS, PreflopTable, live_equity
+from .holdem.timers import TimerWheel, Turn, TurnClock
+from .holdem.tournament import Tournament, parse_key
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import functools
 import json
 import os
-
-class PokerGame:
-    def __init__(self, buyin: int, small_blind: int, big_blind: int, bet_amount: int, max_players: int):
-        self.buyin = buyin                  # 加入游戏时支付的买入金额
-        self.small_blind = small_blind      # 小盲注金额
-        self.big_blind = big_blind          # 大盲注金额
-        self.bet_amount = bet_amount        # 后续每轮固定跟注金额
-        self.max_players = max_players      # 最大玩家数
-        self.players = []                   # 玩家记录：{"id": str, "name": str, "cards": list, ...}
-        self.deck = self.create_deck()      # 洗好的牌堆
-        self.community_cards = []           # 公共牌
-        self.phase = "waiting"              # 游戏阶段：waiting, preflop, flop, turn, river, showdown
-        self.pot = 0                        # 当前彩池
-        self.current_bet = 0                # 当前轮要求的投注额度
-        self.current_turn_index = 0         # 新增：当前行动玩家索引
-
-    def create_deck(self):
-        suits = ['♠', '♥', '♦', '♣']
-        ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-        deck = [f"{rank}{suit}" for suit in suits for rank in ranks]
-        random.shuffle(deck)
-        return deck
-
-    def deal_card(self):
-        if not self.deck:
-            self.deck = self.create_deck()
-        return self.deck.pop()
-
-    def advance_turn(self):
-        """轮转到下一个活跃玩家"""
-        n = len(self.players)
-        if n == 0:
-            return
-        # 从当前行动玩家之后开始查找
-        for i in range(1, n+1):
-            index = (self.current_turn_index + i) % n
-            if self.players[index]["active"]:
-                self.current_turn_index = index
-                return
-
-
+import subprocess
+import sys
+import threading
+import time
 
 # -------------------------
 # 牌型评价函数
 # -------------------------
-def evaluate_5cards(cards: list) -> tuple:
+def evaluate_5cards(cards: list) -> int:
     """
-    对 5 张牌进行评价，返回一个元组表示手牌强度。
-    数值越大表示手牌越好，元组中第一个元素为类别，其它元素为高牌信息。
+    对 5 张整数牌进行评价，返回一个整数表示手牌强度，数值越大表示手牌越好。
+    整数的最高位段为类别，其余位段为依次比较的高牌信息（见 holdem/evaluator.py）。
     类别定义：
         8: 同花顺
         7: 四条
@@ -64,71 +50,60 @@ def evaluate_5cards(cards: list) -> tuple:
         1: 一对
         0: 高牌
     """
-    rank_map = {"2":2, "3":3, "4":4, "5":5, "6":6, "7":7, "8":8, "9":9, "10":10, "J":11, "Q":12, "K":13, "A":14}
-    values = []
-    suits = []
-    for card in cards:
-        rank = card[:-1]
-        suit = card[-1]
-        values.append(rank_map[rank])
-        suits.append(suit)
-    values.sort(reverse=True)
-    freq = {}
-    for v in values:
-        freq[v] = freq.get(v, 0) + 1
-    counts = sorted(freq.values(), reverse=True)
-    flush = len(set(suits)) == 1
-    straight = False
-    high_straight = None
-    unique_vals = sorted(set(values))
-    if len(unique_vals) >= 5:
-        for i in range(len(unique_vals)-4):
-            seq = unique_vals[i:i+5]
-            if seq == list(range(seq[0], seq[0]+5)):
-                straight = True
-                high_straight = seq[-1]
-        if set([14,2,3,4,5]).issubset(set(values)):
-            straight = True
-            high_straight = 5
-    if flush and straight:
-        return (8, high_straight, values)
-    elif counts[0] == 4:
-        four_val = max(v for v, c in freq.items() if c == 4)
-        kicker = max(v for v in values if v != four_val)
-        return (7, four_val, kicker)
-    elif counts[0] == 3 and any(c >= 2 for v, c in freq.items() if c >= 2 and v not in [max(v for v, c in freq.items() if c == 3)]):
-        three_val = max(v for v, c in freq.items() if c == 3)
-        pair_val = max(v for v, c in freq.items() if c >= 2 and v != three_val)
-        return (6, three_val, pair_val)
-    elif flush:
-        return (5, values)
-    elif straight:
-        return (4, high_straight, values)
-    elif counts[0] == 3:
-        three_val = max(v for v, c in freq.items() if c == 3)
-        kickers = sorted([v for v in values if v != three_val], reverse=True)
-        return (3, three_val, kickers)
-    elif counts[0] == 2 and len([v for v, c in freq.items() if c == 2]) >= 2:
-        pairs = sorted([v for v, c in freq.items() if c == 2], reverse=True)
-        kicker = max(v for v in values if v not in pairs)
-        return (2, pairs, kicker)
-    elif counts[0] == 2:
-        pair_val = max(v for v, c in freq.items() if c == 2)
-        kickers = sorted([v for v in values if v != pair_val], reverse=True)
-        return (1, pair_val, kickers)
-    else:
-        return (0, values)
-
-def evaluate_hand(cards: list) -> tuple:
+    return evaluate(cards)
+
+def evaluate_hand(cards: list) -> int:
+    """
+    给定 7 张整数牌（2张手牌+5张公共牌），一次查表返回最佳 5 张牌的牌力整数。
+    """
+    return evaluate(cards)
+
+def timed(handler):
     """
-    给定 7 张牌（2张手牌+5张公共牌），返回最佳 5 张牌的评价元组。
+    把指令从开始到执行完的耗时记入 poker_handler_seconds 直方图（关闭指标时不计时）；
+    开启性能剖析且剖析该指令时，执行期间计入剖析结果。
     """
-    best = None
-    for combo in itertools.combinations(cards, 5):
-        rank = evaluate_5cards(list(combo))
-        if best is None or rank > best:
-            best = rank
-    return best
+    labels = {"handler": handler.__name__}
+
+    @functools.wraps(handler)
+    async def wrapper(self, event: AstrMessageEvent, *args, **kwargs):
+        self.scheduler.ensure_running()
+        self.wheel.ensure_running()
+        profiling = self.profiler.covers(handler.__name__)
+        if not self.metrics.enabled and not profiling:
+            async for result in handler(self, event, *args, **kwargs):
+                yield result
+            return
+        self.start_metrics_dump()
+        session = self.profiler.enter() if profiling else None
+        start = time.perf_counter()
+        try:
+            async for result in handler(self, event, *args, **kwargs):
+                yield result
+        finally:
+            self.metrics.observe("poker_handler_seconds", labels, time.perf_counter() - start)
+            if profiling:
+                self.profiler.exit(session)
+    return wrapper
+
+def traced(method):
+    """开启内存分配追踪时，在方法前后各取一次 tracemalloc 快照，记录分配增长最多的代码行"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.profiler.allocations(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def table_command(handler):
+    """同一个群的指令经由该群的牌桌邮箱逐条执行，不同群之间并行；耗时包括排队时间"""
+    @functools.wraps(handler)
+    async def wrapper(self, event: AstrMessageEvent, *args, **kwargs):
+        group_id = self.get_group_id(event)
+        # 行动超时等后台提示发到该群最近一条指令的会话
+        self.origins[group_id] = event.unified_msg_origin
+        async for result in self.tables.run(group_id, handler(self, event, *args, **kwargs)):
+            yield result
+    return timed(wrapper)
 
 # -------------------------
 # 德州扑克插件
@@ -138,75 +113,443 @@ class TexasHoldemPoker(Star):
     def __init__(self, context: Context, config: dict):
         super().__init__(context)
         self.config = config
-        self.games = {}  # 存储各群游戏状态
+        self.tables = TableActors()  # 各群的指令邮箱，保证同一牌桌的指令串行执行
         self.tokens_file = os.path.join(os.path.dirname(__file__), "tokens.json")
+        self.tokens_journal_file = os.path.join(os.path.dirname(__file__), "tokens.journal")
+        self.game_records_file = os.path.join(os.path.dirname(__file__), "game_records.json")
+        self.game_records_history_file = os.path.join(os.path.dirname(__file__), "game_records.jsonl")
+        self.ranking_file = os.path.join(os.path.dirname(__file__), "ranking.json")
+        self.ranking_journal_file = os.path.join(os.path.dirname(__file__), "ranking.journal")
+        # 性能指标：指令耗时、牌型评价次数、保存耗时和字节数，见 /poker perf
+        self.metrics = Metrics(self.config.get("metrics_enabled", True))
+        self.metrics_task = None
+        # 所有保存操作交给后台写入线程，处理器只标记脏数据
+        self.persistence = PersistenceWorker(self.config.get("persist_delay", 0.05))
+        if self.metrics.enabled:
+            self.persistence.on_write = self.record_write
+        # 按需开启的性能剖析（/poker profile），结果写到 profiles/ 目录
+        self.profiler = Profiler(
+            os.path.join(os.path.dirname(__file__), "profiles"),
+            self.persistence,
+            handlers=[h.strip() for h in self.config.get("profile_handlers", "").split(",") if h.strip()],
+            interval=self.config.get("profile_interval", 0.005),
+            rotate=self.config.get("profile_rotate", 300),
+            keep=self.config.get("profile_keep", 10),
+        )
+        self.tokens_hand_end = False    # 待提交的余额变动中是否包含一局结算
+        self.pending_hands = []         # 待写入的牌局记录
+        self.pending_rank = {}          # 待写入的排行统计 (范围, user_id) -> 统计
+        # 存储各群游戏状态：空闲的牌局淘汰到 games/ 目录，下次访问时自动恢复
+        self.games = GameCache(
+            os.path.join(os.path.dirname(__file__), "games"),
+            self.persistence,
+            ttl=self.config.get("game_idle_ttl", 1800),
+            max_resident=self.config.get("max_resident_games", 1000),
+            busy=lambda group_id: self.tables.depth(self.mailbox_of(group_id)) > 0,
+        )
+        # 牌局操作日志：进程意外退出后重放最新一段日志恢复进行中的牌局
+        self.actions = ActionLog(
+            os.path.join(os.path.dirname(__file__), "actions"),
+            self.persistence,
+            checkpoint_every=self.config.get("action_checkpoint_every", 1000),
+            keep_segments=self.config.get("action_keep_segments", 20),
+            resident=self.games.resident_items,
+        )
+        try:
+            recovered = self.actions.recover()
+            for group_id, game in recovered.items():
+                self.games[group_id] = game
+            if recovered:
+                print(f"已从操作日志恢复 {len(recovered)} 个牌局")
+        except Exception as e:
+            print("恢复牌局失败:", e)
+        self.actions.rotate(self.games.resident_items())
+        self.games.on_evict = lambda group_id, game: self.actions.record(group_id, game, "evict")
+        self.games.on_rehydrate = lambda group_id, game: self.actions.record(group_id, game, "checkpoint")
+        # 锦标赛：升盲和换桌由同一个定时任务调度器驱动，所有群的锦标赛共用
+        self.scheduler = Scheduler()
+        self.tournaments_file = os.path.join(os.path.dirname(__file__), "tournaments.json")
+        self.tournaments = self.load_tournaments()
+        for tournament in self.tournaments.values():
+            if tournament.state == "running":
+                # 停机期间到期的升盲在启动后立即执行一次
+                tournament.level_ends = max(tournament.level_ends, time.time())
+                self.schedule_level(tournament)
+        # 在事件循环中加载插件时立即启动；否则由 initialize 或第一条指令启动
+        self.scheduler.ensure_running()
+        # 行动限时：所有牌桌共用一个时间轮，超时先动用时间银行，用完后自动看牌或弃牌
+        self.wheel = TimerWheel(self.config.get("action_timer_tick", 0.5))
+        self.origins = {}   # 群 -> 最近一条指令的会话
+        self.turn_clock = None
+        if self.config.get("action_timeout", 90) > 0:
+            self.turn_clock = TurnClock(self.wheel, self.config.get("action_timeout", 90),
+                                        self.config.get("time_bank", 60), self.turn_bank, self.turn_timeout)
+            for group_id, game in self.games.resident_items():
+                self.watch_turn(group_id, game)
+        self.wheel.ensure_running()
+        self.metrics.gauge("poker_resident_games", lambda: self.games.resident)
+        self.metrics.gauge("poker_spilled_games", lambda: self.games.spilled)
+        self.metrics.gauge("poker_resident_players",
+                           lambda: sum(len(game.players) for _, game in self.games.resident_items()))
+        self.metrics.gauge("poker_busy_tables", lambda: sum(1 for g in self.tables.stats if self.tables.depth(g)))
+        self.metrics.gauge("poker_pending_timers", lambda: self.wheel.count)
+        # 存储后端：json（余额日志 + JSON 文件）或 sqlite（单个数据库文件）
+        self.store = None
+        self.ranking_journal = None
+        if self.config.get("storage_backend", "json") == "sqlite":
+            self.store = SQLiteStore(os.path.join(os.path.dirname(__file__), "poker.db"))
+            try:
+                if self.store.migrate_from_json(self.tokens_file, self.tokens_journal_file,
+                                                self.game_records_file, self.game_records_history_file,
+                                                self.ranking_file, self.ranking_journal_file):
+                    print("已将 JSON 数据迁移到 SQLite")
+            except Exception as e:
+                print("迁移 JSON 数据失败:", e)
+            self.balance_store = self.store
+        else:
+            # 余额变动逐条追加到日志，定期压缩回 tokens.json 快照
+            self.balance_store = TokenJournal(
+                self.tokens_file,
+                self.tokens_journal_file,
+                fsync_policy=self.config.get("token_fsync_policy", "ops"),
+                fsync_ops=self.config.get("token_fsync_ops", 100),
+                fsync_interval=self.config.get("token_fsync_interval", 1.0),
+                compact_threshold=self.config.get("token_compact_threshold", 10000),
+            )
+            # 排行统计同样只追加变动的玩家，定期压缩回 ranking.json
+            self.ranking_journal = RankJournal(self.ranking_file, self.ranking_journal_file)
         self.tokens = self.load_tokens()
         # 新增：保存游戏记录和排行榜统计
-        self.game_records_file = os.path.join(os.path.dirname(__file__), "game_records.json")
         self.game_records = self.load_game_records()
-        self.ranking_file = os.path.join(os.path.dirname(__file__), "ranking.json")
         self.ranking = self.load_ranking()
+        # 玩家统计：每局每人一行事实，按列追加到 stats/ 目录，/poker stats 映射后向量化汇总
+        self.stats = None
+        if self.config.get("hand_stats", True):
+            try:
+                self.stats = StatsStore(os.path.join(os.path.dirname(__file__), "stats"))
+            except Exception as e:
+                print("打开统计库失败:", e)
+        self.equity_pool = None  # 胜率计算的进程池，按需创建
+        # 图片输出：公共牌、手牌私信和摊牌结果附带牌面图片（需要 Pillow）
+        self.renderer = None
+        if self.config.get("card_images", False):
+            if not RENDER_AVAILABLE:
+                print("图片输出需要安装 Pillow，改为只发送文字")
+            else:
+                try:
+                    self.renderer = CardRenderer(
+                        os.path.join(os.path.dirname(__file__), "card_images"),
+                        font_path=self.config.get("card_image_font", ""),
+                        cache_size=self.config.get("card_image_cache", 512),
+                    )
+                except Exception as e:
+                    print("初始化牌面图片失败:", e)
+        # 翻牌前胜率表：文件不存在时在后台子进程中生成一次（不占用本进程的 GIL），之后直接映射；
+        # 生成完成之前发手牌时现算胜率
+        self.preflop_file = os.path.join(os.path.dirname(__file__), "preflop_equity.bin")
+        self.preflop_table = PreflopTable.load(self.preflop_file)
+        self.preflop_builder = None
+        if self.preflop_table is None:
+            threading.Thread(target=self.build_preflop_table, daemon=True).start()
 
-    def load_game_records(self):
+    async def initialize(self):
+        """
+        插件加载完成后（事件循环中）调用：启动定时任务调度器和时间轮，
+        重启前恢复的锦标赛升盲和行动限时不必等到下一条指令。
+        """
+        self.scheduler.ensure_running()
+        self.wheel.ensure_running()
+        if self.turn_clock is None:
+            return
+        # 插件卸载时所有牌局都写成了快照：轮到真人行动的牌局也重新计时，超时处理时再恢复到内存
+        groups = self.games.spilled_ids()
         try:
-            if os.path.exists(self.game_records_file):
-                with open(self.game_records_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            spilled = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: [(group_id, self.games.peek(group_id)) for group_id in groups])
         except Exception as e:
-            print("加载游戏记录失败:", e)
-        return []
+            print("读取牌局快照失败:", e)
+            return
+        for group_id, game in spilled:
+            # 期间已经有指令恢复并重新计时的牌局不再覆盖
+            if game is not None and group_id not in self.turn_clock.turns:
+                self.watch_turn(group_id, game)
 
-    def save_game_records(self):
+    def build_preflop_table(self):
+        """在线程中等待生成胜率表的子进程结束，然后映射结果"""
         try:
-            with open(self.game_records_file, "w", encoding="utf-8") as f:
-                json.dump(self.game_records, f, ensure_ascii=False, indent=4)
+            self.preflop_builder = subprocess.Popen(
+                [sys.executable, "-m", "holdem.preflop", self.preflop_file],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            _, err = self.preflop_builder.communicate()
+            if self.preflop_builder.returncode < 0:
+                # 插件卸载时被终止
+                return
+            if self.preflop_builder.returncode != 0:
+                raise RuntimeError(err.decode("utf-8", "replace").strip() or f"退出码 {self.preflop_builder.returncode}")
+            self.preflop_table = PreflopTable.load(self.preflop_file)
         except Exception as e:
-            print("保存游戏记录失败:", e)
+            print("生成翻牌前胜率表失败:", e)
 
-    def load_ranking(self):
+    def record_write(self, key: str, seconds: float, written: int):
+        # game:<群号> 等按前缀归类，避免每个群一条时间序列
+        labels = {"kind": key.split(":", 1)[0]}
+        self.metrics.observe("poker_persist_seconds", labels, seconds)
+        self.metrics.inc("poker_persist_bytes_total", labels, written)
+
+    def start_metrics_dump(self):
+        """配置了 metrics_file 时，启动按 metrics_interval 定期写 Prometheus 文本文件的后台任务"""
+        if self.metrics_task is not None or not self.config.get("metrics_file"):
+            return
+        self.metrics_task = asyncio.get_running_loop().create_task(self.dump_metrics())
+
+    async def dump_metrics(self):
+        path = os.path.join(os.path.dirname(__file__), self.config.get("metrics_file"))
+        interval = self.config.get("metrics_interval", 60)
+        while True:
+            await asyncio.sleep(interval)
+            data = self.metrics.prometheus().encode("utf-8")
+            self.persistence.mark_dirty("metrics", lambda: functools.partial(atomic_write, path, data))
+
+    async def terminate(self):
+        if self.metrics_task is not None:
+            self.metrics_task.cancel()
+            self.metrics_task = None
+        self.profiler.stop()
+        self.scheduler.close()
+        self.wheel.close()
+        # 未结束的牌局写成快照，重新加载插件后可以继续
+        self.games.evict_all()
+        await self.persistence.close()
+        self.actions.close()
         try:
-            if os.path.exists(self.ranking_file):
-                with open(self.ranking_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            self.balance_store.close()
         except Exception as e:
-            print("加载排名失败:", e)
-        return {}
+            print("保存tokens失败:", e)
+        if self.game_records is not None:
+            self.game_records.close()
+        if self.stats is not None:
+            self.stats.close()
+        if self.ranking_journal is not None:
+            self.ranking_journal.close()
+        if self.equity_pool is not None:
+            self.equity_pool.shutdown(wait=False, cancel_futures=True)
+            self.equity_pool = None
+        if self.preflop_builder is not None and self.preflop_builder.poll() is None:
+            self.preflop_builder.kill()
+        if self.preflop_table is not None:
+            self.preflop_table.close()
+            self.preflop_table = None
 
-    def save_ranking(self):
+    async def render_image(self, compose):
+        """在线程中调用 compose()（CardRenderer 的方法），返回图片路径；未开启图片输出或失败时返回 None"""
+        if self.renderer is None:
+            return None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, compose)
+        except Exception as e:
+            print("渲染牌面图片失败:", e)
+            return None
+
+    async def send_private(self, player_id: str, content):
+        """图片模式的手牌私信，content 为 (文字, 图片路径)"""
+        session, text, path = content
+        chain = MessageChain().message(text)
+        if path is not None:
+            chain = chain.file_image(path)
+        if not await self.context.send_message(session, chain):
+            raise RuntimeError("找不到私信会话")
+
+    def get_equity_pool(self):
+        processes = self.config.get("equity_processes", 0)
+        if processes <= 1:
+            return None
+        if self.equity_pool is None:
+            self.equity_pool = ProcessPoolExecutor(max_workers=processes)
+        return self.equity_pool
+
+    async def compute_equity(self, hands: list, board: list):
+        """在线程中计算胜率（可穷举时精确计算，否则蒙特卡洛），返回 (Equity 列表, 是否精确)"""
+        samples = self.config.get("equity_samples", 20000)
+        exact_limit = self.config.get("equity_exact_limit", 20000)
+        processes = self.config.get("equity_processes", 0)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        equities, exact = await loop.run_in_executor(None, functools.partial(
+            estimate_equity, hands, board, samples, exact_limit,
+            executor=self.get_equity_pool(), workers=max(processes, 1)))
+        # 每个样本（或穷举的每组公共牌）评价每位玩家一次；穷举时转牌之后的结果有缓存，这里按上限计
+        boards = exact_runouts(hands, board) if exact else samples
+        self.metrics.inc("poker_evaluator_calls_total", {"source": "equity"}, boards * len(hands))
+        self.metrics.inc("poker_evaluator_seconds_total", {"source": "equity"}, time.perf_counter() - start)
+        return equities, exact
+
+    async def live_preflop_equity(self, hands: list, opponents: int) -> list:
+        """胜率表还没生成时在线程（或胜率进程池）中现算每手牌的翻牌前胜率，失败的为 None"""
+        loop = asyncio.get_running_loop()
+        pool = self.get_equity_pool()
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, live_equity, card1, card2, opponents) for card1, card2 in hands),
+            return_exceptions=True)
+        equities = []
+        for result in results:
+            if isinstance(result, Exception):
+                print("计算翻牌前胜率失败:", result)
+                result = None
+            equities.append(result)
+        # 每个样本评价自己和每名对手各一次
+        done = sum(1 for result in equities if result is not None)
+        self.metrics.inc("poker_evaluator_calls_total", {"source": "preflop"}, done * LIVE_SAMPLES * (opponents + 1))
+        self.metrics.inc("poker_evaluator_seconds_total", {"source": "preflop"}, time.perf_counter() - start)
+        return equities
+
+    async def bot_decide(self, view: BotView, level: int):
+        """在线程（或胜率进程池）中为机器人做决策，不占用事件循环；超时或出错时看牌或弃牌"""
+        budget = self.config.get("bot_time_budget", 0.3)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            decision = await asyncio.wait_for(
+                loop.run_in_executor(self.get_equity_pool(), functools.partial(decide, view, level, budget)),
+                budget + 1.0)
+        except Exception as e:
+            print("机器人决策失败:", e)
+            return None
+        # 每个样本评价自己和每名对手各一次（遇到更大的牌提前结束，这里按上限计）
+        self.metrics.inc("poker_evaluator_calls_total", {"source": "bot"}, decision.samples * (view.opponents + 1))
+        self.metrics.inc("poker_evaluator_seconds_total", {"source": "bot"}, time.perf_counter() - start)
+        return decision
+
+    def load_game_records(self):
+        """打开追加式牌局记录（只读取偏移索引）；SQLite 后端直接查库，返回 None"""
+        if self.store is not None:
+            return None
+        history = HandHistory(self.game_records_history_file,
+                              os.path.join(os.path.dirname(__file__), "game_records.idx"))
+        # 旧版整体写入的 game_records.json 只导入一次，导入后改名保留
+        if len(history) == 0 and os.path.exists(self.game_records_file):
+            try:
+                imported = history.import_legacy(self.game_records_file)
+                os.replace(self.game_records_file, self.game_records_file + ".migrated")
+                print(f"已导入 {imported} 条旧游戏记录")
+            except Exception as e:
+                print("加载游戏记录失败:", e)
+        return history
+
+    def record_game(self, game_record: dict):
+        self.pending_hands.append(game_record)
+        self.persistence.mark_dirty("game_records", self.prepare_game_records)
+
+    @traced
+    def prepare_game_records(self):
+        records, self.pending_hands = self.pending_hands, []
+        if self.store is not None:
+            def write():
+                for record in records:
+                    self.store.append_hand(record)
+            return write
+
+        def write():
+            start = self.game_records.size
+            for record in records:
+                self.game_records.append(record)
+            return self.game_records.size - start
+        return write
+
+    def recent_hands(self, group_id: str, limit: int, offset: int = 0) -> list:
+        if self.store is not None:
+            return self.store.recent_hands(group_id, limit, offset)
+        return self.game_records.recent(group_id, limit, offset)
+
+    def count_hands(self, group_id: str) -> int:
+        if self.store is not None:
+            return self.store.count_hands(group_id)
+        return self.game_records.count(group_id)
+
+    def record_stats(self, group_id: str, game: PokerGame, payouts: dict, scores: dict):
+        """把结算后的一局按玩家拆成事实行，交给写入线程追加到统计库"""
+        if self.stats is None:
+            return
+        self.stats.add(hand_facts(group_id, game, payouts, scores))
+        self.persistence.mark_dirty("stats", self.stats.prepare)
+
+    def load_ranking(self) -> Leaderboard:
+        """读取各群及全局的排行统计，建立有序索引"""
+        min_games = self.config.get("rank_min_games", 5)
         try:
-            with open(self.ranking_file, "w", encoding="utf-8") as f:
-                json.dump(self.ranking, f, ensure_ascii=False, indent=4)
+            if self.store is not None:
+                board = Leaderboard(min_games)
+                board.load(self.store.load_rank_stats())
+                return board
+            return self.ranking_journal.load(min_games)
         except Exception as e:
-            print("保存排名失败:", e)
+            print("加载排名失败:", e)
+        return Leaderboard(min_games)
 
-    def update_ranking(self, winners: list, game: PokerGame):
-        # winners 为 [(player_id, player_name), ...]
+    def save_ranking(self):
+        self.persistence.mark_dirty("ranking", self.prepare_ranking)
+
+    @traced
+    def prepare_ranking(self):
+        """在事件循环中取出变动的排行统计，返回写入函数"""
+        rows, self.pending_rank = self.pending_rank, {}
+        if self.store is None:
+            return self.ranking_journal.prepare(rows, self.ranking)
+        if not rows:
+            return None
+        return functools.partial(self.store.save_rank_stats,
+                                 [(scope, user_id, stats) for (scope, user_id), stats in rows.items()])
+
+    def update_ranking(self, group_id: str, winners: list, game: PokerGame, payouts: dict):
+        """
+        winners 为 [(player_id, player_name), ...]，payouts 为 {player_id: 本局分得的筹码}。
+        每位玩家在本群和全局范围各更新一次索引，净赢筹码 = 分得筹码 - 本局投入。
+        """
+        winner_ids = {w[0] for w in winners}
         for p in game.players:
-            pid = p["id"]
-            name = p["name"]
-            if pid not in self.ranking:
-                self.ranking[pid] = {"name": name, "games_played": 0, "wins": 0}
-            self.ranking[pid]["games_played"] += 1
-            if any(w[0] == pid for w in winners):
-                self.ranking[pid]["wins"] += 1
+            if p.bot_level:
+                continue
+            net = payouts.get(p.id, 0) - p.contributed
+            for scope in (group_id, GLOBAL):
+                stats = self.ranking.record(scope, p.id, p.name, p.id in winner_ids, net)
+                self.pending_rank[(scope, p.id)] = dict(stats)
         self.save_ranking()
 
-
-    def load_tokens(self):
+    def load_tournaments(self) -> dict:
         try:
-            if os.path.exists(self.tokens_file):
-                with open(self.tokens_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            if os.path.exists(self.tournaments_file):
+                with open(self.tournaments_file, "r", encoding="utf-8") as f:
+                    return {group_id: Tournament.from_dict(data) for group_id, data in json.load(f).items()}
         except Exception as e:
-            print("加载tokens失败:", e)
+            print("加载锦标赛失败:", e)
         return {}
 
-    def save_tokens(self):
+    def save_tournaments(self):
+        self.persistence.mark_dirty("tournaments", self.prepare_tournaments)
+
+    def prepare_tournaments(self):
+        data = json.dumps({group_id: t.to_dict() for group_id, t in self.tournaments.items()},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return functools.partial(atomic_write, self.tournaments_file, data)
+
+    def load_tokens(self):
+        balances = {}
         try:
-            with open(self.tokens_file, "w", encoding="utf-8") as f:
-                json.dump(self.tokens, f, ensure_ascii=False, indent=4)
+            balances = self.balance_store.load()
         except Exception as e:
-            print("保存tokens失败:", e)
+            print("加载tokens失败:", e)
+        return BalanceBook(self.balance_store, balances)
+
+    def save_tokens(self, hand_end: bool = False):
+        """余额已在赋值时记入日志缓冲，这里只标记需要提交；hand_end 表示一局结算完成"""
+        self.tokens_hand_end = self.tokens_hand_end or hand_end
+        self.persistence.mark_dirty("tokens", self.prepare_tokens)
+
+    @traced
+    def prepare_tokens(self):
+        hand_end, self.tokens_hand_end = self.tokens_hand_end, False
+        return self.balance_store.prepare_commit(hand_end)
 
     def get_group_id(self, event: AstrMessageEvent) -> str:
         group_id = event.message_obj.group_id
@@ -214,12 +557,292 @@ class TexasHoldemPoker(Star):
             group_id = f"private_{event.get_sender_id()}"
         return group_id
 
+    def table_id(self, event: AstrMessageEvent) -> str:
+        """发送者所在牌桌的键：已在本群锦标赛中入座时为其锦标赛牌桌，否则为本群牌桌"""
+        group_id = self.get_group_id(event)
+        tournament = self.tournaments.get(group_id)
+        if tournament is not None:
+            table = tournament.table_of(event.get_sender_id())
+            if table is not None:
+                return tournament.key(table)
+        return group_id
+
+    def mailbox_of(self, group_id: str) -> str:
+        """锦标赛牌桌的指令和本群其他指令共用群的邮箱"""
+        parsed = parse_key(group_id)
+        return parsed[0] if parsed else group_id
+
+    def tournament_of(self, group_id: str):
+        """牌桌所属的锦标赛，普通牌桌返回 None"""
+        parsed = parse_key(group_id)
+        return self.tournaments.get(parsed[0]) if parsed else None
+
+    def stacks(self, group_id: str):
+        """牌桌的筹码表：锦标赛牌桌为锦标赛筹码，否则为本群余额表"""
+        tournament = self.tournament_of(group_id)
+        if tournament is not None:
+            return tournament.stacks
+        return self.tokens.get(group_id, {})
+
+    def save_stacks(self, group_id: str):
+        if self.tournament_of(group_id) is not None:
+            self.save_tournaments()
+        else:
+            self.save_tokens()
+
+    def game_act(self, group_id: str, game: PokerGame, player_id: str, action: str, stacks, amount: int = 0) -> int:
+        """执行一次玩家行动（见 PokerGame.act）并记入操作日志"""
+        balance = stacks.get(player_id, 0)
+        paid = game.act(player_id, action, stacks, amount)
+        self.actions.record(group_id, game, "act", player_id, action, amount, balance)
+        self.watch_turn(group_id, game)
+        return paid
+
+    def end_table(self, group_id: str):
+        self.actions.record(group_id, self.games[group_id], "end")
+        del self.games[group_id]
+        if self.turn_clock is not None:
+            self.turn_clock.stop(group_id)
+            if self.mailbox_of(group_id) == group_id:
+                self.turn_clock.forget(group_id)
+
+    async def settle_fold(self, event: AstrMessageEvent, group_id: str, game: PokerGame):
+        """其他人都已弃牌，所有池都归唯一的未弃牌玩家"""
+        yield event.plain_result(await self.fold_win(group_id, game))
+
+    async def fold_win(self, group_id: str, game: PokerGame) -> str:
+        """settle_fold 的结算部分，返回结算消息（行动超时自动弃牌时也由这里结算）"""
+        settlement = game.settle(self.stacks(group_id))
+        self.actions.record(group_id, game, "settle")
+        self.watch_turn(group_id, game)
+        winner = game.active_players()[0]
+        self.save_tokens(hand_end=True)
+        tournament = self.tournament_of(group_id)
+        lines = []
+        if tournament is None:
+            self.update_ranking(group_id, [(winner.id, winner.name)], game, settlement.payouts)
+            self.record_stats(group_id, game, settlement.payouts, settlement.scores)
+        else:
+            lines = self.tournament_hand_end(group_id, game)
+            if group_id in self.games:
+                lines.append("发送 `/poker continue` 开始下一局。")
+        # 结算需要确认已落盘
+        await self.persistence.flush()
+        reveal = f"\n牌堆种子：{game.deck.seed.hex()}" if game.deck.seed is not None else ""
+        if tournament is None:
+            self.end_table(group_id)
+        return (f"只有 {winner.name} 一人未弃牌，赢得彩池 {game.pot} 代币！"
+                f"（牌局 #{game.hand_id}，可用 `/poker replay {game.hand_id}` 回放）" + reveal
+                + "".join("\n" + line for line in lines))
+
+    async def play_bots(self, event: AstrMessageEvent, group_id: str):
+        """轮到机器人时依次替它行动，直到轮到真人、本轮下注结束或只剩一人未弃牌"""
+        for text in await self.bot_turns(group_id):
+            yield event.plain_result(text)
+
+    async def bot_turns(self, group_id: str) -> list:
+        """play_bots 的行动部分，返回要发送的消息（只剩一人时包含结算消息）"""
+        game = self.games.get(group_id)
+        if game is None or game.phase == "waiting" or game.finished:
+            return []
+        stacks = self.stacks(group_id)
+        lines = []
+        raises = 0
+        # 机器人之间互相加注时限制次数，避免一轮下注无休止
+        for _ in range(len(game.players) * 4):
+            if game.betting_complete() or game.active_count <= 1:
+                break
+            player = game.current_player
+            if not player.bot_level:
+                break
+            if not player.active or player.all_in:
+                game.advance_turn()
+                continue
+            view = BotView(tuple(player.cards), tuple(game.community_cards), game.active_count - 1,
+                           game.current_bet - player.round_bet, game.pot, stacks.get(player.id, 0),
+                           game.big_blind, raises < 2)
+            decision = await self.bot_decide(view, player.bot_level)
+            action, amount = (decision.action, decision.amount) if decision else ("check", 0)
+            try:
+                paid = self.game_act(group_id, game, player.id, action, stacks, amount)
+            except GameError:
+                action, paid = "fold", self.game_act(group_id, game, player.id, "fold", stacks)
+            raises += action == "raise"
+            lines.append({
+                "fold": f"{player.name} 弃牌。",
+                "check": f"{player.name} 看牌。",
+                "call": f"{player.name} 跟注 {paid} 代币。",
+                "raise": f"{player.name} 加注 {amount} 代币，总支付 {paid} 代币。",
+                "allin": f"{player.name} 全压 {paid} 代币。",
+            }[action])
+        if not lines:
+            return []
+        self.save_stacks(group_id)
+        messages = ["\n".join(lines) + f"\n当前彩池: {game.pot} 代币，当前注额: {game.current_bet} 代币。"]
+        if game.active_count == 1:
+            messages.append(await self.fold_win(group_id, game))
+        return messages
+
+    # ---------- 行动限时 ----------
+    def watch_turn(self, group_id: str, game: PokerGame):
+        """轮到真人行动时（重新）开始计时，否则停止该桌的计时；牌局状态每次变化后调用"""
+        if self.turn_clock is None:
+            return
+        player = game.current_player
+        if (game.finished or game.phase == "waiting" or game.betting_complete() or game.active_count <= 1
+                or player is None or player.bot_level or not player.active or player.all_in):
+            self.turn_clock.stop(group_id)
+            return
+        self.turn_clock.start(group_id, player.id, self.mailbox_of(group_id))
+
+    def turn_bank(self, turn: Turn, seconds: float):
+        return self.turn_job(turn.table, self.announce_bank(turn, seconds))
+
+    def turn_timeout(self, turn: Turn):
+        return self.turn_job(turn.table, self.auto_act(turn))
+
+    async def turn_job(self, group_id: str, job):
+        """时间轮回调：在牌桌所在群的邮箱中执行 job，产出的文字发到该群"""
+        mailbox = self.mailbox_of(group_id)
+        async for text in self.tables.run(mailbox, job):
+            tournament = self.tournaments.get(mailbox)
+            origin = self.origins.get(mailbox) or (tournament.origin if tournament else None)
+            if origin is None or not await self.context.send_message(origin, MessageChain().message(text)):
+                print("发送行动超时提示失败:", group_id)
+
+    async def announce_bank(self, turn: Turn, seconds: float):
+        game = self.games.get(turn.table)
+        if game is None or self.turn_clock.turns.get(turn.table) is not turn:
+            return
+        yield f"{game.find_player(turn.player_id).name} 行动超时，开始使用时间银行（{seconds:g} 秒）。"
+
+    async def auto_act(self, turn: Turn):
+        """时间银行也用完：能看牌就看牌，否则弃牌，然后继续机器人行动或结算"""
+        group_id = turn.table
+        game = self.games.get(group_id)
+        # 排队期间玩家可能已经行动，或者牌局已经结束
+        if (game is None or group_id in self.turn_clock.turns or game.finished
+                or game.current_player is None or game.current_player.id != turn.player_id):
+            return
+        player = game.current_player
+        action = "check" if player.round_bet >= game.current_bet else "fold"
+        try:
+            self.game_act(group_id, game, player.id, action, self.stacks(group_id))
+        except GameError as e:
+            print("行动超时自动操作失败:", e)
+            return
+        self.metrics.inc("poker_turn_timeouts_total", {"action": action})
+        yield f"{player.name} 行动超时，自动{'看牌' if action == 'check' else '弃牌'}。"
+        if game.active_count == 1:
+            yield await self.fold_win(group_id, game)
+            return
+        for text in await self.bot_turns(group_id):
+            yield text
+
+    # ---------- 锦标赛 ----------
+    def schedule_level(self, tournament: Tournament):
+        self.scheduler.cancel(tournament.timer)
+        tournament.timer = self.scheduler.call_at(tournament.level_ends, self.tournament_job,
+                                                  tournament, self.level_up)
+
+    def schedule_rebalance(self, tournament: Tournament):
+        self.scheduler.call_later(0, self.tournament_job, tournament, self.rebalance_tables)
+
+    async def tournament_job(self, tournament: Tournament, job):
+        """定时任务：在锦标赛所在群的邮箱中执行 job，产出的文字作为公告发到群里"""
+        async for text in self.tables.run(tournament.group_id, job(tournament)):
+            if not await self.context.send_message(tournament.origin, MessageChain().message(text)):
+                print("发送锦标赛公告失败:", tournament.group_id)
+
+    def tournament_live(self, tournament: Tournament) -> bool:
+        # 定时任务排队期间锦标赛可能已经结束或被取消
+        return self.tournaments.get(tournament.group_id) is tournament and tournament.state == "running"
+
+    async def level_up(self, tournament: Tournament):
+        if not self.tournament_live(tournament):
+            return
+        tournament.advance_level()
+        self.schedule_level(tournament)
+        self.save_tournaments()
+        small, big = tournament.blinds()
+        yield f"锦标赛盲注升至第 {tournament.level + 1} 级：小盲 {small}，大盲 {big}（各桌下一局生效）。"
+
+    async def rebalance_tables(self, tournament: Tournament):
+        """在两局之间的牌桌间换桌、拆桌，正在进行的牌桌结束本局后会再安排一次"""
+        if not self.tournament_live(tournament):
+            return
+        idle = set()
+        for table in tournament.tables:
+            game = self.games.get(tournament.key(table))
+            if game is not None and (game.finished or (game.phase == "waiting" and game.blinds is None)):
+                idle.add(table)
+        moves, broken = tournament.rebalance(idle)
+        if not moves:
+            return
+        lines = []
+        for player_id, src, dst in moves:
+            player = self.games[tournament.key(src)].remove_player(player_id)
+            self.games[tournament.key(dst)].add_player(Player(player.id, player.name, player.private_unified))
+            lines.append(f"{player.name} 从 {src} 号桌换到 {dst} 号桌。")
+        for table in broken:
+            self.end_table(tournament.key(table))
+        for table in {dst for _, _, dst in moves} | {src for _, src, _ in moves}:
+            if table not in broken:
+                key = tournament.key(table)
+                self.actions.record(key, self.games[key], "checkpoint")
+        self.save_tournaments()
+        if broken:
+            lines.insert(0, "、".join(str(table) for table in broken) + " 号桌已拆桌。")
+            if len(tournament.tables) == 1:
+                lines.append(f"进入决赛桌（{next(iter(tournament.tables))} 号桌）！")
+        yield "\n".join(lines)
+
+    def tournament_hand_end(self, group_id: str, game: PokerGame) -> list:
+        """锦标赛牌桌一局结算后淘汰筹码为 0 的玩家，并安排换桌；返回附加到结算消息的文字"""
+        tournament = self.tournament_of(group_id)
+        if tournament is None:
+            return []
+        # 输光的玩家本局投入的就是开局时的全部筹码
+        busted = [(p.id, p.contributed) for p in game.players if tournament.stacks.get(p.id, 0) <= 0]
+        lines = []
+        for player_id, place in tournament.bust(busted):
+            game.remove_player(player_id)
+            lines.append(f"{tournament.name(player_id)} 被淘汰，获得第 {place} 名。")
+        if busted:
+            self.actions.record(group_id, game, "checkpoint")
+        if tournament.state == "finished":
+            lines.extend(self.finish_tournament(tournament))
+        else:
+            self.schedule_rebalance(tournament)
+        self.save_tournaments()
+        return lines
+
+    def finish_tournament(self, tournament: Tournament) -> list:
+        """按名次把奖池发到本群余额，删除锦标赛和剩余牌桌"""
+        group_id = tournament.group_id
+        if group_id not in self.tokens:
+            self.tokens[group_id] = {}
+        balances = self.tokens[group_id]
+        initial = self.config.get("initial_token", 1000)
+        lines = [f"锦标赛结束！奖池 {tournament.prize_pool} 代币："]
+        for player_id, place, amount in tournament.prizes():
+            balances[player_id] = balances.get(player_id, initial) + amount
+            lines.append(f"第 {place} 名 {tournament.name(player_id)}：{amount} 代币")
+        self.save_tokens(hand_end=True)
+        self.scheduler.cancel(tournament.timer)
+        for table in tournament.tables:
+            if tournament.key(table) in self.games:
+                self.end_table(tournament.key(table))
+        del self.tournaments[group_id]
+        return lines
+
     @command_group("poker")
     def poker():
         '''德州扑克指令组'''
         pass
 
     @poker.command("start")
+    @table_command
     async def start_game(self, event: AstrMessageEvent):
         group_id = self.get_group_id(event)
         if group_id in self.games:
@@ -230,12 +853,122 @@ class TexasHoldemPoker(Star):
         big_blind = self.config.get("big_blind", 20)
         bet_amount = self.config.get("bet_amount", 20)
         max_players = self.config.get("max_players", 9)
-        self.games[group_id] = PokerGame(buyin, small_blind, big_blind, bet_amount, max_players)
+        game = self.games[group_id] = PokerGame(buyin, small_blind, big_blind, bet_amount, max_players)
+        self.actions.record(group_id, game, "start", [buyin, small_blind, big_blind, bet_amount, max_players])
         yield event.plain_result(
             f"新德州扑克游戏开始！买入: {buyin}, 小盲注: {small_blind}, 大盲注: {big_blind}, 每轮跟注金额: {bet_amount}, 最大玩家: {max_players}。\n请发送 `/poker join` 加入游戏。"
         )
-        
+
+
+    @poker.command("tournament")
+    @table_command
+    async def tournament_command(self, event: AstrMessageEvent, action: str = "status"):
+        '''锦标赛：/poker tournament open|join|start|status|cancel'''
+        group_id = self.get_group_id(event)
+        sender_id = event.get_sender_id()
+        tournament = self.tournaments.get(group_id)
+        if action == "open":
+            if tournament is not None:
+                yield event.plain_result("本群已有一场锦标赛，请等它结束后再开新的一场。")
+                return
+            payouts = [int(x) for x in str(self.config.get("tournament_payouts", "50,30,20")).split(",") if x.strip()]
+            tournament = Tournament(
+                group_id, event.unified_msg_origin,
+                buyin=self.config.get("tournament_buyin", 100),
+                starting_stack=self.config.get("tournament_stack", 1500),
+                table_size=self.config.get("tournament_table_size", 6),
+                small_blind=self.config.get("small_blind", 10),
+                big_blind=self.config.get("big_blind", 20),
+                level_seconds=self.config.get("tournament_level_seconds", 600),
+                growth=self.config.get("tournament_blind_growth", 1.5),
+                payouts=payouts,
+            )
+            self.tournaments[group_id] = tournament
+            self.save_tournaments()
+            yield event.plain_result(
+                f"锦标赛开放报名！报名费 {tournament.buyin} 代币，起始筹码 {tournament.starting_stack}，"
+                f"每桌最多 {tournament.table_size} 人，盲注 {tournament.small_blind}/{tournament.big_blind} 起，"
+                f"每 {tournament.level_seconds / 60:g} 分钟升一级。\n"
+                "发送 `/poker tournament join` 报名，`/poker tournament start` 开赛。"
+            )
+            return
+        if tournament is None:
+            yield event.plain_result("本群没有锦标赛，发送 `/poker tournament open` 开放报名。")
+            return
+        if action == "join":
+            if group_id not in self.tokens:
+                self.tokens[group_id] = {}
+            balance = self.tokens[group_id].get(sender_id, self.config.get("initial_token", 1000))
+            if balance < tournament.buyin:
+                yield event.plain_result(f"余额不足，报名需要 {tournament.buyin} 代币。你当前余额: {balance}")
+                return
+            try:
+                tournament.register(sender_id, event.get_sender_name(), f"gewechat:FriendMessage:{sender_id}")
+            except GameError as e:
+                yield event.plain_result(str(e))
+                return
+            self.tokens[group_id][sender_id] = balance - tournament.buyin
+            self.save_tokens()
+            self.save_tournaments()
+            yield event.plain_result(
+                f"{event.get_sender_name()} 报名成功，扣除报名费 {tournament.buyin} 代币。"
+                f"当前报名 {len(tournament.entrants)} 人，奖池 {tournament.prize_pool} 代币。"
+            )
+        elif action == "start":
+            try:
+                tables = tournament.start()
+            except GameError as e:
+                yield event.plain_result(str(e))
+                return
+            small, big = tournament.blinds()
+            for table, player_ids in tables.items():
+                # 报名费已进入奖池，牌桌本身没有买入
+                game = PokerGame(0, small, big, big, tournament.table_size)
+                for player_id in player_ids:
+                    name, private_unified = tournament.entrants[player_id]
+                    game.add_player(Player(player_id, name, private_unified))
+                key = tournament.key(table)
+                self.games[key] = game
+                self.actions.record(key, game, "next")
+            self.schedule_level(tournament)
+            self.save_tournaments()
+            lines = [f"锦标赛开始！共 {tournament.remaining} 名玩家，分为 {len(tables)} 桌，"
+                     f"第 1 级盲注 {small}/{big}，每 {tournament.level_seconds / 60:g} 分钟升一级。"]
+            for table, player_ids in tables.items():
+                lines.append(f"{table} 号桌：" + "、".join(tournament.name(pid) for pid in player_ids))
+            lines.append("各桌玩家发送 `/poker deal` 开始第一局，之后的指令与普通牌局相同。")
+            yield event.plain_result("\n".join(lines))
+        elif action == "cancel":
+            if tournament.state != "registering":
+                yield event.plain_result("锦标赛已经开始，不能取消。")
+                return
+            # 退还报名费
+            for player_id in tournament.entrants:
+                self.tokens[group_id][player_id] = self.tokens[group_id].get(player_id, 0) + tournament.buyin
+            del self.tournaments[group_id]
+            self.save_tokens()
+            self.save_tournaments()
+            yield event.plain_result(f"锦标赛已取消，已退还 {len(tournament.entrants)} 名玩家的报名费。")
+        elif action == "status":
+            if tournament.state == "registering":
+                names = "、".join(name for name, _ in tournament.entrants.values()) or "无"
+                yield event.plain_result(f"锦标赛报名中：{len(tournament.entrants)} 人（{names}），"
+                                         f"奖池 {tournament.prize_pool} 代币。")
+                return
+            small, big = tournament.blinds()
+            left = max(tournament.level_ends - time.time(), 0)
+            lines = [f"锦标赛进行中：剩余 {tournament.remaining}/{len(tournament.entrants)} 人，"
+                     f"奖池 {tournament.prize_pool} 代币。",
+                     f"第 {tournament.level + 1} 级盲注 {small}/{big}，{left / 60:.1f} 分钟后升级。"]
+            for table, player_ids in sorted(tournament.tables.items()):
+                lines.append(f"{table} 号桌：" + "、".join(
+                    f"{tournament.name(pid)}({tournament.stacks[pid]})" for pid in player_ids))
+            yield event.plain_result("\n".join(lines))
+        else:
+            yield event.plain_result("用法：/poker tournament open|join|start|status|cancel")
+
     @poker.command("add_balance")
+    @table_command
     async def add_balance(self, event: AstrMessageEvent, amount: int):
         '''增加余额：给当前用户增加指定数量的代币'''
         group_id = self.get_group_id(event)
@@ -247,6 +980,7 @@ class TexasHoldemPoker(Star):
         yield event.plain_result(f"成功增加 {amount} 代币。你当前余额: {self.tokens[group_id][sender_id]}")
 
     @poker.command("join")
+    @table_command
     async def join_game(self, event: AstrMessageEvent):
         group_id = self.get_group_id(event)
         if group_id not in self.games:
@@ -255,10 +989,9 @@ class TexasHoldemPoker(Star):
         game = self.games[group_id]
         sender_id = event.get_sender_id()
         sender_name = event.get_sender_name()
-        for player in game.players:
-            if player["id"] == sender_id:
-                yield event.plain_result("你已经加入了本局游戏。")
-                return
+        if game.find_player(sender_id):
+            yield event.plain_result("你已经加入了本局游戏。")
+            return
         # 记录私信 session 字符串供记录使用（格式："gewechat:FriendMessage:{wxid}"）
         private_unified = f"gewechat:FriendMessage:{sender_id}"
         if group_id not in self.tokens:
@@ -273,69 +1006,86 @@ class TexasHoldemPoker(Star):
         self.tokens[group_id][sender_id] -= buyin
         self.save_tokens()
         game.pot += buyin
-        game.players.append({
-            "id": sender_id,
-            "name": sender_name,
-            "cards": [],
-            "private_unified": private_unified,
-            "round_bet": 0,
-            "active": True
-        })
+        player = Player(sender_id, sender_name, private_unified)
+        player.contributed = buyin
+        game.add_player(player)
+        self.actions.record(group_id, game, "join", sender_id, sender_name, private_unified, 0, buyin)
         yield event.plain_result(
             f"{sender_name} 加入游戏，扣除买入 {buyin} 代币。当前彩池: {game.pot} 代币。你当前余额: {self.tokens[group_id][sender_id]}"
         )
 
+    @poker.command("addbot")
+    @table_command
+    async def add_bot(self, event: AstrMessageEvent, level: int = 2):
+        '''添加机器人：/poker addbot [等级 1-3]，机器人轮到时自动行动'''
+        group_id = self.get_group_id(event)
+        if group_id not in self.games:
+            yield event.plain_result("当前群聊没有正在进行的游戏，请先使用 `/poker start` 开始游戏。")
+            return
+        game = self.games[group_id]
+        if level not in BOT_LEVELS:
+            yield event.plain_result(f"机器人等级只能是 {min(BOT_LEVELS)}–{max(BOT_LEVELS)}。")
+            return
+        if game.phase != "waiting":
+            yield event.plain_result("本局已经发牌，请在发牌前添加机器人。")
+            return
+        if len(game.players) >= game.max_players:
+            yield event.plain_result(f"座位已满（最多 {game.max_players} 人）。")
+            return
+        k = 1
+        while game.find_player(f"bot_{k}"):
+            k += 1
+        bot_id = f"bot_{k}"
+        if group_id not in self.tokens:
+            self.tokens[group_id] = {}
+        # 机器人的筹码不足买入时补回初始筹码
+        if self.tokens[group_id].get(bot_id, 0) < game.buyin:
+            self.tokens[group_id][bot_id] = self.config.get("initial_token", 1000)
+        self.tokens[group_id][bot_id] -= game.buyin
+        self.save_tokens()
+        game.pot += game.buyin
+        player = Player(bot_id, f"机器人{k}(Lv{level})", bot_level=level)
+        player.contributed = game.buyin
+        game.add_player(player)
+        self.actions.record(group_id, game, "join", bot_id, player.name, "", level, game.buyin)
+        yield event.plain_result(
+            f"{player.name} 加入游戏，扣除买入 {game.buyin} 代币。当前彩池: {game.pot} 代币。机器人余额: {self.tokens[group_id][bot_id]}"
+        )
+
     @poker.command("fold")
+    @table_command
     async def fold(self, event: AstrMessageEvent):
         '''弃牌：放弃本局游戏'''
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
         sender_id = event.get_sender_id()
-        found = False
-        for p in game.players:
-            if p["id"] == sender_id and p["active"]:
-                p["active"] = False
-                # 重置该玩家的下注金额，避免被误判为已跟注
-                p["round_bet"] = 0
-                found = True
-                yield event.plain_result(f"{p['name']} 已弃牌。")
-                break
-        if not found:
-            yield event.plain_result("你不在当前游戏中或已弃牌。")
+        try:
+            # 弃牌后该玩家不再计入待跟注玩家
+            self.game_act(group_id, game, sender_id, "fold", self.stacks(group_id))
+        except GameError as e:
+            yield event.plain_result(str(e))
             return
+        yield event.plain_result(f"{game.find_player(sender_id).name} 已弃牌。")
         # 检查是否只剩下唯一活跃玩家
-        active_players = [p for p in game.players if p["active"]]
-        if len(active_players) == 1:
-            winner = active_players[0]
-            group_tokens = self.tokens[group_id]
-            group_tokens[winner["id"]] += game.pot
-            self.save_tokens()
-            yield event.plain_result(f"只有 {winner['name']} 一人未弃牌，赢得彩池 {game.pot} 代币！")
-            del self.games[group_id]
+        if game.active_count == 1:
+            async for result in self.settle_fold(event, group_id, game):
+                yield result
+            return
+        async for result in self.play_bots(event, group_id):
+            yield result
 
 
     @poker.command("deal")
+    @table_command
     async def deal_hole_cards(self, event: AstrMessageEvent):
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
-        if len(game.players) < 2:
-            yield event.plain_result("至少需要2名玩家才能开始游戏。")
-            return
-        if game.phase != "waiting":
-            yield event.plain_result("游戏已经开始发牌了。")
-            return
-        # 设置当前行动玩家：如果有 >=3 个玩家，则从大盲（索引1）之后开始（即索引2）；否则从第 0 位开始
-        if len(game.players) >= 3:
-            game.current_turn_index = 2
-        else:
-            game.current_turn_index = 0
-
 
         # 动态获取当前事件所属平台适配器
         platform_name = event.platform_meta.name
@@ -345,295 +1095,478 @@ class TexasHoldemPoker(Star):
             yield event.plain_result(f"未找到 {platform_name} 平台适配器。")
             return
 
-        for player in game.players:
-            card1 = game.deal_card()
-            card2 = game.deal_card()
-            player["cards"] = [card1, card2]
-            content = f"你的手牌: {card1} {card2}"
-            # 直接使用目标用户的 wxid 发送私信
-            await adapter.client.post_text(player["id"], content)
-        # 分配盲注
-        small_blind_player = game.players[0]
-        sb_amount = game.small_blind
-        group_tokens = self.tokens[group_id]
-        available = group_tokens.get(small_blind_player["id"], 0)
-        sb = min(available, sb_amount)
-        group_tokens[small_blind_player["id"]] = available - sb
-        small_blind_player["round_bet"] += sb
-        game.pot += sb
-
-        big_blind_player = game.players[1]
-        available = group_tokens.get(big_blind_player["id"], 0)
-        bb_amount = game.big_blind
-        bb = min(available, bb_amount)
-        group_tokens[big_blind_player["id"]] = available - bb
-        big_blind_player["round_bet"] += bb
-        game.pot += bb
+        # 发手牌并分配盲注（/poker continue 时已收过本局盲注则不再收）
+        stacks = self.stacks(group_id)
+        # 重放需要发牌前的牌堆和盲注位的余额
+        deck = game.deck.state()
+        balances = {} if game.blinds else {p.id: stacks.get(p.id, 0) for p in game.players[:2]}
+        try:
+            blinds = game.start_hand(stacks)
+        except GameError as e:
+            yield event.plain_result(str(e))
+            return
+        self.actions.record(group_id, game, "deal", deck, balances)
+        self.watch_turn(group_id, game)
+        self.save_stacks(group_id)
 
-        self.save_tokens()
-        game.current_bet = game.big_blind
-        game.phase = "preflop"
+        messages = []
+        opponents = len(game.players) - 1
+        humans = [p for p in game.players if not p.bot_level]
+        equities = [None] * len(humans)
+        if opponents <= MAX_OPPONENTS:
+            if self.preflop_table is not None:
+                equities = [self.preflop_table.equity(*p.cards, opponents) for p in humans]
+            else:
+                equities = await self.live_preflop_equity([p.cards for p in humans], opponents)
+        for player, equity in zip(humans, equities):
+            card1, card2 = player.cards
+            content = f"你的手牌: {card_str(card1)} {card_str(card2)}"
+            if equity is not None:
+                content += f"\n对 {opponents} 名对手的翻牌前胜率约 {equity:.1%}"
+            # 直接使用目标用户的 wxid 发送私信
+            messages.append((player.id, content))
+        send = adapter.client.post_text
+        if self.renderer is not None:
+            # 图片模式经由私信会话发送文字和手牌图片，全部图片在一次线程调用中渲染
+            paths = await self.render_image(lambda: [self.renderer.cards(p.cards) for p in humans])
+            paths = paths or [None] * len(humans)
+            messages = [(pid, (p.private_unified, content, path))
+                        for (pid, content), p, path in zip(messages, humans, paths)]
+            send = self.send_private
+        # 并发发送，单条失败或超时只重试该条，不阻塞其他玩家
+        report = await deliver(
+            send, messages,
+            concurrency=self.config.get("deliver_concurrency", 4),
+            timeout=self.config.get("deliver_timeout", 5.0),
+            retries=self.config.get("deliver_retries", 2),
+            backoff=self.config.get("deliver_backoff", 0.5),
+        )
+        for r in report.results:
+            self.metrics.inc("poker_delivery_messages_total", {"result": "ok" if r.ok else "failed"})
+            self.metrics.inc("poker_delivery_attempts_total", None, r.attempts)
+            self.metrics.observe("poker_delivery_seconds", {}, r.latency)
+        undelivered = ""
+        if report.failed:
+            failed_ids = {r.player_id for r in report.failed}
+            undelivered = "\n以下玩家未收到手牌私信：" + "、".join(p.name for p in game.players if p.id in failed_ids)
         yield event.plain_result(
-            f"手牌已发出，各玩家请查看私信。\n盲注分配：{small_blind_player['name']} 小盲 {sb}，{big_blind_player['name']} 大盲 {bb}。\n当前预注金额为 {game.current_bet} 代币。请使用 `/poker call` 跟注，或 `/poker next` 进入下一阶段。"
+            f"手牌已发出，各玩家请查看私信。\n盲注分配：{blinds.small_player.name} 小盲 {blinds.small}，{blinds.big_player.name} 大盲 {blinds.big}。\n当前预注金额为 {game.current_bet} 代币。请使用 `/poker call` 跟注，或 `/poker next` 进入下一阶段。"
+            + (f"\n本局牌堆承诺：{game.deck.commitment}" if game.deck.seed is not None else "")
+            + undelivered
         )
+        async for result in self.play_bots(event, group_id):
+            yield result
 
     @poker.command("call")
+    @table_command
     async def call_bet(self, event: AstrMessageEvent):
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
-        sender_id = event.get_sender_id()
-        # 判断是否轮到你操作
-        if game.players[game.current_turn_index]["id"] != sender_id:
-            yield event.plain_result("请等待轮到你操作。")
-            return
-        player = None
-        for p in game.players:
-            if p["id"] == sender_id and p["active"]:
-                player = p
-                break
-        if not player:
-            yield event.plain_result("你不在当前游戏中或已弃牌。")
-            return
-        if player["round_bet"] >= game.current_bet:
-            yield event.plain_result("你已经跟注了。")
-            return
-        required = game.current_bet - player["round_bet"]
-        group_tokens = self.tokens[group_id]
-        if group_tokens.get(sender_id, 0) < required:
-            yield event.plain_result(f"余额不足，需跟注 {required} 代币。你当前余额: {group_tokens.get(sender_id, 0)}")
+        try:
+            # 轮到该玩家、余额等检查都在 PokerGame.act 中完成，行动后轮转到下一位活跃玩家
+            paid = self.game_act(group_id, game, event.get_sender_id(), "call", self.stacks(group_id))
+        except GameError as e:
+            yield event.plain_result(str(e))
             return
-        group_tokens[sender_id] -= required
-        player["round_bet"] += required
-        game.pot += required
-        self.save_tokens()
-        # 完成操作后轮转到下一位活跃玩家
-        game.advance_turn()
-        yield event.plain_result(f"你已跟注，支付 {required} 代币。当前彩池: {game.pot} 代币。")
+        self.save_stacks(group_id)
+        yield event.plain_result(f"你已跟注，支付 {paid} 代币。当前彩池: {game.pot} 代币。")
+        async for result in self.play_bots(event, group_id):
+            yield result
 
     @poker.command("raise")
+    @table_command
     async def raise_bet(self, event: AstrMessageEvent, increment: int):
         '''加注：支付跟注差额再额外加注指定代币'''
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
-        sender_id = event.get_sender_id()
-        # 判断是否轮到你操作
-        if game.players[game.current_turn_index]["id"] != sender_id:
-            yield event.plain_result("请等待轮到你操作。")
-            return
-        player = None
-        for p in game.players:
-            if p["id"] == sender_id and p["active"]:
-                player = p
-                break
-        if not player:
-            yield event.plain_result("你不在当前游戏中或已弃牌。")
-            return
-        required_call = game.current_bet - player["round_bet"]
-        total_raise = required_call + increment
-        group_tokens = self.tokens[group_id]
-        if group_tokens.get(sender_id, 0) < total_raise:
-            yield event.plain_result(f"余额不足，需支付 {total_raise} 代币（含跟注差额和加注）。你当前余额: {group_tokens.get(sender_id, 0)}")
-            return
-        group_tokens[sender_id] -= total_raise
-        player["round_bet"] += total_raise
-        game.pot += total_raise
-        # 更新当前预注金额为该玩家的总下注
-        game.current_bet = player["round_bet"]
-        self.save_tokens()
-        game.advance_turn()
-        yield event.plain_result(f"你加注了 {increment} 代币，总支付 {total_raise} 代币。当前彩池: {game.pot} 代币，新预注金额: {game.current_bet} 代币。")
-
-    @poker.command("fold")
-    async def fold(self, event: AstrMessageEvent):
-        group_id = self.get_group_id(event)
-        if group_id not in self.games:
-            yield event.plain_result("当前群聊没有正在进行的游戏。")
+        try:
+            # 轮到该玩家、余额等检查都在 PokerGame.act 中完成，行动后轮转到下一位活跃玩家
+            paid = self.game_act(group_id, game, event.get_sender_id(), "raise", self.stacks(group_id), increment)
+        except GameError as e:
+            yield event.plain_result(str(e))
             return
-        game = self.games[group_id]
-        sender_id = event.get_sender_id()
-        found = False
-        for p in game.players:
-            if p["id"] == sender_id and p["active"]:
-                p["active"] = False
-                found = True
-                yield event.plain_result(f"{p['name']} 已弃牌。")
-                break
-        if not found:
-            yield event.plain_result("你不在当前游戏中或已弃牌。")
-            return
-        active_players = [p for p in game.players if p["active"]]
-        if len(active_players) == 1:
-            winner = active_players[0]
-            group_tokens = self.tokens[group_id]
-            group_tokens[winner["id"]] += game.pot
-            self.save_tokens()
-            yield event.plain_result(f"只有 {winner['name']} 一人未弃牌，赢得彩池 {game.pot} 代币！")
-            del self.games[group_id]
+        self.save_stacks(group_id)
+        yield event.plain_result(f"你加注了 {increment} 代币，总支付 {paid} 代币。当前彩池: {game.pot} 代币，新预注金额: {game.current_bet} 代币。")
+        async for result in self.play_bots(event, group_id):
+            yield result
 
     @poker.command("next")
+    @table_command
     async def next_round(self, event: AstrMessageEvent):
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
-        not_called = [p["name"] for p in game.players if p["active"] and p["round_bet"] < game.current_bet]
-        if not_called:
-            yield event.plain_result("以下玩家还未跟注: " + ", ".join(not_called))
-            return
-
-        if game.phase == "preflop":
-            game.deal_card()  # 烧牌
-            flop_cards = [game.deal_card() for _ in range(3)]
-            game.community_cards.extend(flop_cards)
-            game.phase = "flop"
-            for p in game.players:
-                if p["active"]:
-                    p["round_bet"] = 0
-            game.current_bet = game.bet_amount
-            yield event.plain_result(
-                f"翻牌: {' '.join(flop_cards)}。\n当前轮下注金额为 {game.current_bet} 代币。请使用 `/poker call` 跟注，或 `/poker next` 进入下一阶段。"
-            )
-        elif game.phase == "flop":
-            game.deal_card()  # 烧牌
-            turn_card = game.deal_card()
-            game.community_cards.append(turn_card)
-            game.phase = "turn"
-            for p in game.players:
-                if p["active"]:
-                    p["round_bet"] = 0
-            game.current_bet = game.bet_amount
-            yield event.plain_result(
-                f"转牌: {turn_card}。\n当前轮下注金额为 {game.current_bet} 代币。请使用 `/poker call` 跟注，或 `/poker next` 进入下一阶段。"
-            )
-        elif game.phase == "turn":
-            game.deal_card()  # 烧牌
-            river_card = game.deal_card()
-            game.community_cards.append(river_card)
-            game.phase = "river"
-            for p in game.players:
-                if p["active"]:
-                    p["round_bet"] = 0
-            game.current_bet = game.bet_amount
-            yield event.plain_result(
-                f"河牌: {river_card}。\n当前轮下注金额为 {game.current_bet} 代币。请使用 `/poker call` 跟注，或 `/poker next` 进入摊牌阶段。"
-            )
-        elif game.phase == "river":
+        try:
+            cards = game.advance_street()
+        except GameError as e:
+            yield event.plain_result(str(e))
+            return
+        if cards is None:
+            # 河牌下注结束，进入摊牌
             async for result in self.showdown(event):
                 yield result
-        else:
-            yield event.plain_result("游戏阶段错误。")
-
-
-
+            return
+        self.actions.record(group_id, game, "street")
+        self.watch_turn(group_id, game)
+        label = {"flop": "翻牌", "turn": "转牌", "river": "河牌"}[game.phase]
+        hint = "进入摊牌阶段" if game.phase == "river" else "进入下一阶段"
+        yield event.plain_result(
+            f"{label}: {cards_str(cards)}。\n当前轮下注金额为 {game.current_bet} 代币。请使用 `/poker call` 跟注，或 `/poker next` {hint}。"
+        )
+        if self.renderer is not None:
+            path = await self.render_image(functools.partial(self.renderer.cards, game.community_cards, 5))
+            if path is not None:
+                yield event.image_result(path)
+        async for result in self.play_bots(event, group_id):
+            yield result
 
     @poker.command("showdown")
+    @table_command
     async def showdown(self, event: AstrMessageEvent):
         '''摊牌：计算最佳手牌，决定赢家，保存详细记录，并输出最终余额'''
-        import time  # 确保导入 time 模块
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
-        if game.phase != "river":
-            yield event.plain_result("还未到摊牌阶段。")
+        if game.finished:
+            # 已结算的一局留在桌上等待继续，不能再摊牌一次
+            yield event.plain_result(FINISHED)
             return
-        results = {}
-        for player in game.players:
-            if not player["active"]:
-                continue
-            if len(game.community_cards) != 5 or len(player["cards"]) != 2:
-                yield event.plain_result("牌数不足，无法摊牌。")
-                return
-            total_cards = player["cards"] + game.community_cards
-            hand_rank = evaluate_hand(total_cards)
-            results[player["id"]] = {"name": player["name"], "hand_rank": hand_rank, "cards": player["cards"]}
-        best = None
-        winners = []
-        for pid, info in results.items():
-            rank = info["hand_rank"]
-            if best is None or rank > best:
-                best = rank
-                winners = [(pid, info["name"])]
-            elif rank == best:
-                winners.append((pid, info["name"]))
-        msg = "摊牌结果：\n"
-        for pid, info in results.items():
-            msg += f"{info['name']}: {info['hand_rank']} (手牌: {' '.join(info['cards'])})\n"
-        if len(winners) == 1:
-            winner_name = winners[0][1]
-            msg += f"\n赢家是 {winner_name}，赢得彩池 {game.pot} 代币！"
-            self.tokens[group_id][winners[0][0]] += game.pot
-        else:
-            names = ", ".join(name for pid, name in winners)
-            msg += f"\n平局：{names}，各得彩池的一半。"
-            share = game.pot // len(winners)
-            for pid, name in winners:
-                self.tokens[group_id][pid] += share
-        self.save_tokens()
+        # 开启内存分配追踪时记录结算和拼接消息的分配
+        allocations = self.profiler.alloc_begin()
+        try:
+            # 按各玩家本局投入额拆出主池和边池，每个池在有资格的玩家中比牌，并把筹码发到余额表
+            start = time.perf_counter()
+            settlement = game.settle(self.stacks(group_id))
+        except GameError as e:
+            yield event.plain_result(str(e))
+            return
+        self.metrics.inc("poker_evaluator_calls_total", {"source": "showdown"}, len(settlement.scores))
+        self.metrics.inc("poker_evaluator_seconds_total", {"source": "showdown"}, time.perf_counter() - start)
+        self.actions.record(group_id, game, "settle")
+        self.watch_turn(group_id, game)
+        scores, payouts = settlement.scores, settlement.payouts
+        winners = [(p.id, p.name) for p in game.players if payouts.get(p.id)]
+        # 由弃牌决定的一局没有牌力，不亮牌
+        shown = [(p.name, p.cards, hand_name(scores[p.id])) for p in game.active_players() if p.id in scores]
+        lines = ["摊牌结果："]
+        lines.extend(f"{name}: {label} (手牌: {cards_str(cards)})" for name, cards, label in shown)
+        lines.append("")
+        pots = settlement.pots
+        # 没人跟注退还的部分排在最后，不算作主池或边池
+        contested = sum(1 for pot in pots if not pot.refund)
+        for k, (pot, pot_winner_ids) in enumerate(zip(pots, settlement.pot_winners)):
+            label = "彩池" if contested == 1 else ("主池" if k == 0 else f"边池{k}")
+            names = "、".join(game.find_player(pid).name for pid in pot_winner_ids)
+            if pot.refund:
+                lines.append(f"无人跟注的 {pot.amount} 代币退还给 {names}。")
+            elif len(pot_winner_ids) == 1:
+                lines.append(f"{label} {pot.amount} 代币：赢家是 {names}！")
+            else:
+                lines.append(f"{label} {pot.amount} 代币：平局，{names} 平分。")
+        self.save_tokens(hand_end=True)
 
         # 保存详细游戏记录
         game_record = {
             "group_id": group_id,
             "phase": game.phase,
             "pot": game.pot,
-            "community_cards": game.community_cards,
+            "community_cards": [card_str(c) for c in game.community_cards],
             "players": [
                 {
-                    "id": p["id"],
-                    "name": p["name"],
-                    "final_bet": p["round_bet"],
-                    "hand": p["cards"],
-                    "active": p["active"],
-                    "hand_rank": results.get(p["id"], {}).get("hand_rank")
+                    "id": p.id,
+                    "name": p.name,
+                    "final_bet": p.round_bet,
+                    "hand": [card_str(c) for c in p.cards],
+                    "active": p.active,
+                    "hand_rank": scores.get(p.id)
                 }
                 for p in game.players
             ],
             "winners": winners,
+            "payouts": payouts,
+            "deck_seed": game.deck.seed.hex() if game.deck.seed is not None else None,
             "timestamp": int(time.time())
         }
-        self.game_records.append(game_record)
-        self.save_game_records()
+        self.record_game(game_record)
 
-        # 更新排行榜数据
-        self.update_ranking(winners, game)
+        # 更新排行榜和玩家统计（锦标赛筹码不计入）
+        tournament = self.tournament_of(group_id)
+        if tournament is None:
+            self.update_ranking(group_id, winners, game, payouts)
+            self.record_stats(group_id, game, payouts, scores)
+        self.profiler.alloc_end("showdown", allocations)
+        # 结算需要确认已落盘
+        await self.persistence.flush()
 
         # 输出参与玩家最终余额信息
-        final_balances = "参与玩家最终余额：\n"
-        for p in game.players:
-            uid = p["id"]
-            balance = self.tokens[group_id].get(uid, self.config.get("initial_token", 1000))
-            final_balances += f"{p['name']}: {balance} 代币\n"
-        yield event.plain_result(msg + "\n" + final_balances + "\n本局已结束，发送 `/poker continue` 继续下一局，或 `/poker end` 结束游戏。")
-        game.finished = True  # 标记本局结束，等待玩家选择是否继续
+        lines.extend(("", "参与玩家最终余额："))
+        initial = self.config.get("initial_token", 1000)
+        stacks = self.stacks(group_id)
+        lines.extend(f"{p.name}: {stacks.get(p.id, initial)} 代币" for p in game.players)
+        lines.append("")
+        if tournament is not None:
+            lines.extend(self.tournament_hand_end(group_id, game))
+            lines.append("")
+        if game.deck.seed is not None:
+            # 公开本局种子，玩家可以核对发牌时公布的承诺并重现发牌顺序
+            lines.append(f"牌堆种子：{game.deck.seed.hex()}（可用 `python -m holdem.deck <种子> <承诺>` 核对）")
+        if tournament is not None:
+            if group_id in self.games:
+                lines.append(f"本局（#{game.hand_id}）已结束，发送 `/poker continue` 开始下一局；"
+                             f"`/poker replay {game.hand_id}` 可查看本局回放。")
+        else:
+            lines.append(f"本局（#{game.hand_id}）已结束，发送 `/poker continue` 继续下一局，或 `/poker end` 结束游戏；"
+                         f"`/poker replay {game.hand_id}` 可查看本局回放。")
+        # settle 已标记本局结束，等待玩家选择是否继续
+        yield event.plain_result("\n".join(lines))
+        if self.renderer is not None:
+            path = await self.render_image(functools.partial(self.renderer.table, game.community_cards, shown))
+            if path is not None:
+                yield event.image_result(path)
 
 
 
     @poker.command("status")
+    @table_command
     async def game_status(self, event: AstrMessageEvent):
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
         result = f"游戏状态: {game.phase}\n彩池: {game.pot} 代币\n玩家列表：\n"
         for p in game.players:
-            status = "活跃" if p["active"] else "弃牌"
-            result += f"- {p['name']}：本轮投注 {p['round_bet']} 代币，状态: {status}\n"
+            status = "活跃" if p.active else "弃牌"
+            result += f"- {p.name}：本轮投注 {p.round_bet} 代币，状态: {status}\n"
         if game.community_cards:
-            result += f"公共牌: {' '.join(game.community_cards)}\n"
+            result += f"公共牌: {cards_str(game.community_cards)}\n"
+        left = self.turn_clock.remaining(group_id) if self.turn_clock is not None else None
+        if left is not None:
+            result += f"轮到 {game.current_player.name} 行动，剩余 {left:.0f} 秒\n"
         yield event.plain_result(result)
 
 
 
+    @poker.command("equity")
+    @timed
+    async def equity(self, event: AstrMessageEvent):
+        '''胜率：全下后或本局结束后，计算各玩家在每条街的胜率'''
+        group_id = self.table_id(event)
+        if group_id not in self.games:
+            yield event.plain_result("当前群聊没有正在进行的游戏。")
+            return
+        game = self.games[group_id]
+        contenders = [p for p in game.players if p.active and len(p.cards) == 2]
+        if len(contenders) < 2:
+            yield event.plain_result("至少需要两名持牌玩家才能计算胜率。")
+            return
+        # 牌局进行中查看胜率会泄露手牌，只允许在无法继续下注（至多一人仍有筹码）或本局结束后查看
+        group_tokens = self.stacks(group_id)
+        all_in = sum(1 for p in contenders if group_tokens.get(p.id, 0) > 0) <= 1
+        if not (game.finished or all_in):
+            yield event.plain_result("为避免泄露手牌，只能在全下后或本局结束后查看胜率。")
+            return
+        hands = [p.cards for p in contenders]
+        board = game.community_cards
+        if game.finished:
+            # 复盘：依次给出翻牌前、翻牌、转牌时的胜率
+            streets = [(label, n) for label, n in (("翻牌前", 0), ("翻牌", 3), ("转牌", 4)) if n < len(board)]
+        else:
+            streets = [({0: "翻牌前", 3: "翻牌", 4: "转牌", 5: "河牌"}[len(board)], len(board))]
+        msg = "胜率：\n"
+        for p in contenders:
+            msg += f"{p.name}: {cards_str(p.cards)}\n"
+        for label, n in streets:
+            results, exact = await self.compute_equity(hands, board[:n])
+            msg += f"\n{label}" + (f"（{cards_str(board[:n])}）" if n else "") + ("，精确" if exact else "，模拟") + "：\n"
+            for p, eq in zip(contenders, results):
+                msg += f"{p.name}: 胜 {eq.win:.1%}，平 {eq.tie:.1%}，权益 {eq.equity:.1%}\n"
+        yield event.plain_result(msg.rstrip())
+
+    @poker.command("history")
+    @timed
+    async def history(self, event: AstrMessageEvent, n: int = 5, page: int = 1):
+        '''牌局记录：分页查看本群最近的牌局，/poker history [每页条数] [页码]'''
+        group_id = self.get_group_id(event)
+        n = max(1, min(n, 20))
+        page = max(page, 1)
+        # 先写完刚结束的牌局
+        await self.persistence.flush()
+        total = self.count_hands(group_id)
+        if total == 0:
+            yield event.plain_result("本群还没有牌局记录。")
+            return
+        pages = -(-total // n)
+        if page > pages:
+            yield event.plain_result(f"共 {pages} 页，第 {page} 页没有记录。")
+            return
+        records = self.recent_hands(group_id, n, (page - 1) * n)
+        lines = [f"本群牌局记录（第 {page}/{pages} 页，共 {total} 局）："]
+        for record in records:
+            hand_no = record.get("hand_no", record.get("id", "?"))
+            when = time.strftime("%m-%d %H:%M", time.localtime(record["timestamp"]))
+            winners = "、".join(w[1] for w in record["winners"]) or "无"
+            board = " ".join(record["community_cards"]) or "无"
+            lines.append(f"#{hand_no} {when} 彩池 {record['pot']}，赢家 {winners}，公共牌 {board}")
+        yield event.plain_result("\n".join(lines))
+
+    @poker.command("replay")
+    @timed
+    async def replay(self, event: AstrMessageEvent, hand_id: int):
+        '''回放：/poker replay <牌局编号>，按操作日志重放本群已结束的一局'''
+        group_id = self.get_group_id(event)
+        # 先写完缓冲中的日志
+        await self.persistence.flush()
+        loop = asyncio.get_running_loop()
+        try:
+            found = await loop.run_in_executor(None, self.actions.hand_events, hand_id)
+        except Exception as e:
+            print("读取操作日志失败:", e)
+            found = None
+        # 锦标赛牌桌的牌局也属于本群
+        if found is None or self.mailbox_of(found[0]) != group_id:
+            yield event.plain_result(f"本群没有编号为 {hand_id} 的牌局（或日志已被清理）。")
+            return
+        _, events, settled = found
+        if not settled:
+            yield event.plain_result("该局还未结算，结束后才能回放。")
+            return
+        try:
+            lines = replay_lines(events)
+        except Exception as e:
+            print("回放牌局失败:", e)
+            yield event.plain_result("该局的操作日志不完整，无法回放。")
+            return
+        yield event.plain_result(f"牌局 #{hand_id} 回放：\n" + "\n".join(lines))
+
+    @poker.command("rank")
+    @timed
+    async def rank(self, event: AstrMessageEvent, scope: str = "group", n: int = 10, metric: str = "wins"):
+        '''排行榜：/poker rank [group|global] [前 N 名] [wins|winrate|net]'''
+        metrics = {"wins": "胜场", "winrate": "胜率", "net": "净赢筹码"}
+        if scope not in ("group", "global"):
+            yield event.plain_result("范围只能是 group 或 global。")
+            return
+        if metric not in metrics:
+            yield event.plain_result("排序指标只能是 wins、winrate 或 net。")
+            return
+        n = max(1, min(n, 50))
+        key = GLOBAL if scope == "global" else self.get_group_id(event)
+        top = self.ranking.top(key, metric, n)
+        title = "全局" if scope == "global" else "本群"
+        if not top:
+            if metric == "winrate":
+                yield event.plain_result(f"{title}还没有玩家满 {self.ranking.min_games} 局，暂无胜率排行。")
+            else:
+                yield event.plain_result(f"{title}还没有排行数据。")
+            return
+        lines = [f"{title}排行榜（按{metrics[metric]}，前 {len(top)} 名）："]
+        for i, (user_id, st) in enumerate(top, 1):
+            lines.append(f"{i}. {st['name']}：{st['wins']}/{st['games_played']} 胜，"
+                         f"胜率 {st['wins'] / st['games_played']:.1%}，净赢 {st['net']:+d}")
+        yield event.plain_result("\n".join(lines))
+
+    @poker.command("stats")
+    @timed
+    async def player_stats(self, event: AstrMessageEvent, target: str = ""):
+        '''玩家统计：/poker stats [@玩家]，查看本群的 VPIP、胜率、净赢筹码和摊牌率'''
+        if self.stats is None:
+            yield event.plain_result("玩家统计未开启（hand_stats）。")
+            return
+        player_id, name = event.get_sender_id(), event.get_sender_name()
+        mention = next((seg for seg in event.message_obj.message if isinstance(seg, At)), None)
+        if mention is not None:
+            player_id = str(mention.qq)
+            name = getattr(mention, "name", "") or player_id
+        elif target:
+            player_id = name = target.lstrip("@")
+        # 先写完缓冲中的行
+        await self.persistence.flush()
+        try:
+            st = await asyncio.get_running_loop().run_in_executor(
+                None, self.stats.player_stats, player_id, self.get_group_id(event))
+        except Exception as e:
+            print("查询玩家统计失败:", e)
+            yield event.plain_result("查询玩家统计失败，请稍后再试。")
+            return
+        hands = st["hands"]
+        if not hands:
+            yield event.plain_result(f"{name} 在本群还没有已结算的牌局。")
+            return
+        showdowns = st["showdowns"]
+        lines = [
+            f"{name} 的本群统计（{hands} 局）：",
+            f"VPIP（翻牌前主动入池）：{st['vpip'] / hands:.1%}",
+            f"胜率：{st['wins'] / hands:.1%}（{st['wins']} 局分得彩池）",
+            f"净赢筹码：{st['net']:+d}",
+            f"看到翻牌：{st['flops'] / hands:.1%}",
+            f"摊牌率：{showdowns / hands:.1%}" + (f"，摊牌胜率 {st['showdown_wins'] / showdowns:.1%}" if showdowns else ""),
+        ]
+        yield event.plain_result("\n".join(lines))
+
+    @permission_type(PermissionType.ADMIN)
+    @poker.command("tables")
+    @timed
+    async def hot_tables(self, event: AstrMessageEvent, n: int = 10):
+        '''牌桌队列：查看指令排队最多、等待最久的群（管理员）'''
+        tables = self.tables.hot_tables(max(1, min(n, 50)))
+        if not tables:
+            yield event.plain_result("还没有牌桌处理过指令。")
+            return
+        lines = [f"常驻牌局 {self.games.resident}，已淘汰到磁盘 {self.games.spilled}"
+                 f"（累计淘汰 {self.games.evictions} 次，恢复 {self.games.rehydrations} 次）",
+                 "牌桌指令队列："]
+        for group_id, depth, stats in tables:
+            lines.append(f"{group_id}：排队 {depth}，已处理 {stats.processed}，"
+                         f"平均等待 {stats.avg_wait * 1000:.1f}ms，最长等待 {stats.max_wait * 1000:.1f}ms，"
+                         f"累计执行 {stats.total_busy:.2f}s")
+        yield event.plain_result("\n".join(lines))
+
+    @permission_type(PermissionType.ADMIN)
+    @poker.command("perf")
+    async def perf(self, event: AstrMessageEvent):
+        '''性能指标：指令耗时分布、牌型评价、保存耗时和常驻牌局数（管理员）'''
+        if not self.metrics.enabled:
+            yield event.plain_result("性能指标未开启（metrics_enabled）。")
+            return
+        yield event.plain_result("性能指标：\n" + "\n".join(self.metrics.report()))
+
+    @permission_type(PermissionType.ADMIN)
+    @poker.command("profile")
+    async def profile(self, event: AstrMessageEvent, action: str = "status", mode: str = "sample", alloc: str = ""):
+        '''性能剖析：/poker profile start [sample|cprofile] [alloc]、/poker profile stop（管理员）'''
+        if not self.config.get("profiling_enabled", False):
+            yield event.plain_result("性能剖析未开启（profiling_enabled）。")
+            return
+        if action == "start":
+            if mode not in PROFILE_MODES:
+                yield event.plain_result(f"剖析模式只能是 {'、'.join(PROFILE_MODES)}。")
+                return
+            self.profiler.start(mode, alloc == "alloc")
+            yield event.plain_result("已开启性能剖析：\n" + "\n".join(self.profiler.status()))
+        elif action == "stop":
+            if not self.profiler.running:
+                yield event.plain_result("性能剖析未在运行。")
+                return
+            written = self.profiler.stop()
+            await self.persistence.flush()
+            yield event.plain_result("已停止性能剖析。" +
+                                     (f"写出文件：{'、'.join(written)}" if written else "没有剖析到任何指令。"))
+        else:
+            yield event.plain_result("\n".join(self.profiler.status()))
+
     @poker.command("tokens")
+    @timed
     async def my_tokens(self, event: AstrMessageEvent):
         group_id = self.get_group_id(event)
         if group_id not in self.tokens:
@@ -643,138 +1576,98 @@ class TexasHoldemPoker(Star):
         yield event.plain_result(f"你的代币余额: {balance} 代币")
 
     @poker.command("reset")
+    @table_command
     async def reset_game(self, event: AstrMessageEvent):
         group_id = self.get_group_id(event)
         if group_id in self.games:
-            del self.games[group_id]
+            self.end_table(group_id)
             yield event.plain_result("当前游戏已重置。")
         else:
             yield event.plain_result("当前群聊没有进行中的游戏。")
     
     @poker.command("allin")
+    @table_command
     async def allin(self, event: AstrMessageEvent):
         '''全压：将你的剩余代币全部投入当前投注'''
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
-        sender_id = event.get_sender_id()
-        # 判断是否轮到你操作
-        if game.players[game.current_turn_index]["id"] != sender_id:
-            yield event.plain_result("请等待轮到你操作。")
+        try:
+            # 轮到该玩家、余额等检查都在 PokerGame.act 中完成，行动后轮转到下一位活跃玩家
+            paid = self.game_act(group_id, game, event.get_sender_id(), "allin", self.stacks(group_id))
+        except GameError as e:
+            yield event.plain_result(str(e))
             return
-        player = None
-        for p in game.players:
-            if p["id"] == sender_id and p["active"]:
-                player = p
-                break
-        if not player:
-            yield event.plain_result("你不在当前游戏中或已弃牌。")
-            return
-        group_tokens = self.tokens[group_id]
-        balance = group_tokens.get(sender_id, 0)
-        if balance == 0:
-            yield event.plain_result("你已经没有剩余代币，全压失败。")
-            return
-        allin_amount = balance
-        group_tokens[sender_id] = 0
-        player["round_bet"] += allin_amount
-        game.pot += allin_amount
-        if player["round_bet"] > game.current_bet:
-            game.current_bet = player["round_bet"]
-        self.save_tokens()
-        game.advance_turn()
-        yield event.plain_result(f"你全压了 {allin_amount} 代币。当前彩池: {game.pot} 代币。")
+        self.save_stacks(group_id)
+        yield event.plain_result(f"你全压了 {paid} 代币。当前彩池: {game.pot} 代币。")
+        async for result in self.play_bots(event, group_id):
+            yield result
 
     @poker.command("check")
+    @table_command
     async def check(self, event: AstrMessageEvent):
         '''看牌：当你已经跟满当前注额时，可选择看牌'''
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
             return
         game = self.games[group_id]
-        sender_id = event.get_sender_id()
-        # 判断是否轮到你操作
-        if game.players[game.current_turn_index]["id"] != sender_id:
-            yield event.plain_result("请等待轮到你操作。")
-            return
-        player = None
-        for p in game.players:
-            if p["id"] == sender_id and p["active"]:
-                player = p
-                break
-        if not player:
-            yield event.plain_result("你不在当前游戏中或已弃牌。")
-            return
-        if player["round_bet"] < game.current_bet:
-            yield event.plain_result("你当前还未跟满注，无法看牌。")
+        try:
+            # 轮到该玩家、余额等检查都在 PokerGame.act 中完成，行动后轮转到下一位活跃玩家
+            paid = self.game_act(group_id, game, event.get_sender_id(), "check", self.stacks(group_id))
+        except GameError as e:
+            yield event.plain_result(str(e))
             return
-        # 看牌操作后，轮转到下一位
-        game.advance_turn()
         yield event.plain_result("你选择看牌，等待下一轮行动。")
+        async for result in self.play_bots(event, group_id):
+            yield result
 
     @poker.command("continue")
+    @table_command
     async def continue_game(self, event: AstrMessageEvent):
         '''继续下一局游戏：重置牌局状态、更新盲注位置，并扣除新盲注'''
-        group_id = self.get_group_id(event)
+        group_id = self.table_id(event)
         if group_id not in self.games:
             yield event.plain_result("没有正在进行的游戏，请先使用 `/poker start` 开始游戏。")
             return
         game = self.games[group_id]
-        if not hasattr(game, "finished") or not game.finished:
-            yield event.plain_result("当前局还未结束，请先摊牌后再决定是否继续。")
-            return
-        # 重置牌局状态但保留玩家列表和余额
-        game.deck = game.create_deck()
-        game.community_cards = []
-        game.phase = "waiting"
-        game.pot = 0
-        game.current_bet = 0
-        for p in game.players:
-            p["round_bet"] = 0
-        # 更新盲注位置：顺时针移动一位（例如，将玩家列表左移1位）
-        game.players = game.players[1:] + game.players[:1]
-        # 扣除新盲注
-        group_tokens = self.tokens[group_id]
-        small_blind_player = game.players[0]
-        big_blind_player = game.players[1] if len(game.players) >= 2 else None
-        sb = game.small_blind
-        bb = game.big_blind
-        if group_tokens.get(small_blind_player["id"], 0) < sb:
-            yield event.plain_result(f"新小盲 {small_blind_player['name']} 余额不足。")
-            return
-        group_tokens[small_blind_player["id"]] -= sb
-        small_blind_player["round_bet"] = sb
-        game.pot += sb
-        if big_blind_player:
-            if group_tokens.get(big_blind_player["id"], 0) < bb:
-                yield event.plain_result(f"新大盲 {big_blind_player['name']} 余额不足。")
+        tournament = self.tournament_of(group_id)
+        if tournament is not None and game.finished:
+            if len(game.players) < 2:
+                yield event.plain_result("本桌只剩你一人，请等待其他牌桌结束本局后换桌。")
                 return
-            group_tokens[big_blind_player["id"]] -= bb
-            big_blind_player["round_bet"] = bb
-            game.pot += bb
-        self.save_tokens()
-        # 设置当前行动玩家：通常从大盲之后开始（若人数>=3，则索引为2，否则为0）
-        if len(game.players) >= 3:
-            game.current_turn_index = 2
-        else:
-            game.current_turn_index = 0
-        # 重置结束标志
-        game.finished = False
+            # 升盲在下一局开始时生效，之后每条街的注额与大盲相同
+            game.small_blind, game.big_blind = tournament.blinds()
+            game.bet_amount = game.big_blind
+        # 机器人筹码不足一个大盲时补回初始筹码
+        for p in game.players:
+            if p.bot_level and self.tokens[group_id].get(p.id, 0) < game.big_blind:
+                self.tokens[group_id][p.id] = self.config.get("initial_token", 1000)
+        try:
+            # 重置牌局状态但保留玩家列表和余额，庄位顺时针移动一位后扣除新盲注；
+            # 锦标赛中筹码不足盲注的玩家付到全部筹码为止
+            blinds = game.next_hand(self.stacks(group_id), strict=tournament is None)
+        except GameError as e:
+            # 收盲失败时牌局保持不变，补足余额后可以再次 continue
+            yield event.plain_result(str(e))
+            return
+        self.actions.record(group_id, game, "next")
+        self.save_stacks(group_id)
         yield event.plain_result(
-            f"新局开始！新小盲：{small_blind_player['name']} 付 {sb} 代币，" +
-            (f"新大盲：{big_blind_player['name']} 付 {bb} 代币，" if big_blind_player else "") +
+            f"新局开始！新小盲：{blinds.small_player.name} 付 {blinds.small} 代币，" +
+            (f"新大盲：{blinds.big_player.name} 付 {blinds.big} 代币，" if blinds.big_player else "") +
             f"当前彩池: {game.pot} 代币。\n请使用 `/poker deal` 发牌。"
         )
 
     @poker.command("end")
+    @table_command
     async def end_game(self, event: AstrMessageEvent):
         '''结束当前游戏，清除游戏状态'''
         group_id = self.get_group_id(event)
         if group_id in self.games:
-            del self.games[group_id]
+            self.end_table(group_id)
             yield event.plain_result("游戏已结束。")
         else:
             yield event.plain_result("当前群聊没有进行中的游戏。")